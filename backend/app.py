@@ -10,6 +10,7 @@ import random
 import string
 from twilio.rest import Client
 from utils.json_utils import configure_json_encoding
+from utils.http_cache import init_http_cache
 
 # Load environment variables
 load_dotenv()
@@ -38,14 +39,32 @@ print(f"Allowing CORS for origins: {frontend_urls}")
 CORS(app, 
      origins=frontend_urls,
      supports_credentials=True,
-     allow_headers=["Content-Type", "Authorization"],
-     methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
+     allow_headers=["Content-Type", "Authorization", "If-Match", "If-None-Match", "Idempotency-Key", "Last-Event-ID"],
+     expose_headers=["X-Next-Cursor", "X-Sync-Watermark", "ETag", "Idempotent-Replayed"],
+     methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+     # Browsers reuse a preflight for this long instead of sending OPTIONS before
+     # every call (Chromium caps it at 2 hours)
+     max_age=int(os.getenv("CORS_MAX_AGE", "7200")))
+
+# Weak ETags / 304s for complaint reads and compression of large responses
+init_http_cache(app)
 
 # Configure MongoDB
 # Use MongoDB Atlas URI from environment variable, with a clear fallback
 app.config["MONGO_URI"] = os.getenv("MONGODB_URI", "mongodb://localhost:27017/saarthi")
 mongo = PyMongo(app)
 
+# Create the indexes the routes rely on. Index builds are idempotent, so every
+# worker can safely run this at boot; set ENSURE_INDEXES_ON_BOOT=false to skip
+# it and use `python manage.py ensure-indexes` instead.
+if os.getenv("ENSURE_INDEXES_ON_BOOT", "true").lower() == "true":
+    try:
+        from utils.indexes import ensure_indexes
+        ensure_indexes(mongo.db)
+        print("MongoDB indexes verified")
+    except Exception as e:
+        print(f"Error ensuring MongoDB indexes: {e}")
+
 # Configure JWT
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "".join(random.choices(string.ascii_letters + string.digits, k=32)))
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=24)
@@ -0,0 +1,108 @@
+"""
+Bytes on the wire and latency for the HTTP caching layer in utils/http_cache.py
+
+Serves complaint-shaped listings from a Flask app with the caching layer
+installed and measures, per request type:
+
+- identity (no compression, no validator),
+- gzip and, when the brotli package is installed, brotli,
+- a conditional revalidation with a matching If-None-Match (304),
+- a CORS preflight with and without Access-Control-Max-Age reuse.
+
+Server time is measured in-process with the test client. Transfer time is
+estimated from the body size at --mbps, and every request that needs a
+preflight pays one extra --rtt-ms round trip.
+
+Usage:
+    python benchmarks/http_cache_bench.py [--complaints 200] [--repeat 50] [--mbps 10] [--rtt-ms 80]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import datetime
+
+from flask import Flask
+from flask_cors import CORS
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.json_provider_bench import make_complaint
+from utils.bson_json import json_response
+from utils.http_cache import init_http_cache, brotli
+from utils.json_utils import select_json_provider
+
+ORIGIN = "https://example.vercel.app"
+
+
+def make_app(payload):
+    app = Flask(__name__)
+    app.json = select_json_provider()(app)
+    CORS(app, origins=[ORIGIN], allow_headers=["Authorization", "If-None-Match"], max_age=7200)
+    init_http_cache(app)
+
+    @app.route("/api/complaints")
+    def listing():
+        return json_response(payload)
+
+    return app
+
+
+def measure(client, repeat, headers, method="get"):
+    call = getattr(client, method)
+    response = call("/api/complaints", headers=headers)
+    seconds = min(timeit.repeat(lambda: call("/api/complaints", headers=headers), number=1, repeat=repeat))
+    return response, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--complaints", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--mbps", type=float, default=10.0, help="Link speed used to estimate transfer time")
+    parser.add_argument("--rtt-ms", type=float, default=80.0, help="Round trip time paid by each preflight")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    payload = [make_complaint(rng, now) for _ in range(args.complaints)]
+    client = make_app(payload).test_client()
+
+    base = {"Origin": ORIGIN, "Authorization": "Bearer token"}
+    cases = [("identity", dict(base, **{"Accept-Encoding": "identity"}))]
+    cases.append(("gzip", dict(base, **{"Accept-Encoding": "gzip"})))
+    if brotli is not None:
+        cases.append(("brotli", dict(base, **{"Accept-Encoding": "br, gzip"})))
+    else:
+        print("brotli is not installed; only gzip is measured")
+
+    etag = client.get("/api/complaints", headers=base).headers["ETag"]
+    cases.append(("304 revalidation", dict(base, **{"Accept-Encoding": "gzip", "If-None-Match": etag})))
+
+    print(f"{args.complaints} complaints, best of {args.repeat} runs, {args.mbps:g} Mbit/s")
+    print(f"{'request':<18} {'status':>6} {'bytes':>10} {'server ms':>10} {'transfer ms':>12}")
+    identity_size = None
+    for name, headers in cases:
+        response, seconds = measure(client, args.repeat, headers)
+        size = len(response.get_data())
+        identity_size = identity_size or size
+        transfer_ms = size * 8 / (args.mbps * 1000)
+        saving = f"  {identity_size / size:.1f}x smaller" if 0 < size < identity_size else ""
+        print(f"{name:<18} {response.status_code:>6} {size:>10} {seconds * 1000:>10.2f} {transfer_ms:>12.2f}{saving}")
+
+    preflight_headers = {
+        "Origin": ORIGIN,
+        "Access-Control-Request-Method": "GET",
+        "Access-Control-Request-Headers": "authorization, if-none-match"
+    }
+    response, seconds = measure(client, args.repeat, preflight_headers, method="options")
+    max_age = int(response.headers.get("Access-Control-Max-Age", 0))
+    print(f"\npreflight: {seconds * 1000:.2f} ms server time, Access-Control-Max-Age {max_age}s")
+    print(f"without it every cross-origin call waits {args.rtt_ms:g} ms longer for OPTIONS; "
+          f"with it a browser sends one preflight per URL every {max_age // 60} minutes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Microbenchmark for the JSON providers in utils/json_utils.py
+
+Builds complaint documents the way `POST /api/complaints` stores them (string
+ids and ISO timestamps, `filedBy`, an `analysisResult` from the real
+classifier, MinHash signatures), reads them back through the listing
+projections in routes/complaints.py and the raw-batch decode path, and times
+`app.json.response()` for the stdlib and orjson providers on each payload.
+
+Usage:
+    python benchmarks/json_provider_bench.py [--complaints 200] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+import bson
+from bson import ObjectId
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routes.complaints import (
+    POLICE_LISTING_PROJECTION, FULL_LISTING_PROJECTION, VICTIM_LISTING_PROJECTION, truncate_listing_text
+)
+from utils.bson_json import decode_batch
+from utils.classifier import ComplaintClassifier, load_seed_sections
+from utils.json_utils import MongoJSONProvider, OrjsonMongoJSONProvider, orjson
+from utils.near_duplicates import signature_fields
+
+STATUSES = ["pending", "investigating", "filed", "resolved"]
+STAGES = ["FIR registered", "Statements recorded", "Investigation", "Chargesheet filed"]
+TEXTS = [
+    ("en", "Two men on a motorcycle snatched my gold chain near the bus stand on MG Road at around "
+           "8 pm yesterday and drove away towards the railway station. I could not see the number plate."),
+    ("en", "My neighbour threatened me with a knife after an argument about parking and said he would "
+           "kill my family if I complained to the police. He has done this before."),
+    ("en", "Someone called pretending to be from my bank, asked for the OTP and withdrew 45,000 rupees "
+           "from my savings account within minutes."),
+    ("en", "My husband and his mother beat me regularly and demand more dowry from my parents. Last week "
+           "they locked me out of the house at night."),
+    ("hi", "कल रात मेरे घर का ताला तोड़कर चोर गहने और नकदी ले गए। पड़ोसियों ने दो लोगों को भागते देखा।"),
+    ("hi", "बाजार में एक आदमी ने मेरा मोबाइल फोन छीन लिया और भाग गया।"),
+]
+
+
+def make_complaint(rng, now, classifier):
+    language, text = rng.choice(TEXTS)
+    filed_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+    analysis_result = classifier.classify(text, language)
+    complaint = {
+        "_id": ObjectId(),
+        "text": text,
+        "language": language,
+        "status": rng.choice(STATUSES),
+        "complainantId": str(ObjectId()),
+        "complainantName": f"Complainant {rng.randint(1, 10000)}",
+        "complainantPhone": f"+9198{rng.randint(10000000, 99999999)}",
+        "filedAt": filed_at.isoformat(),
+        "updatedAt": (filed_at + timedelta(hours=rng.randint(0, 72))).isoformat(),
+        "version": rng.randint(1, 6),
+        "filedBy": {"id": str(ObjectId()), "name": f"Officer {rng.randint(1, 300)}", "role": "police"},
+        "analysisResult": analysis_result,
+        "explanation": analysis_result["explanation"],
+    }
+    if analysis_result["isCognizable"] and analysis_result["sections"]:
+        complaint["suggestedSections"] = [section["section"] for section in analysis_result["sections"]]
+    if complaint["status"] in ("filed", "resolved"):
+        complaint["firNumber"] = f"FIR/{filed_at.year}/{rng.randint(1, 9999):04d}"
+        complaint["appliedSections"] = complaint.get("suggestedSections", [])[:2]
+        complaint["currentStage"] = rng.choice(STAGES)
+    complaint.update(signature_fields(text, language))
+    return complaint
+
+
+def project(document, projection):
+    """Apply an inclusion or exclusion projection the way MongoDB does"""
+    if any(value for field, value in projection.items() if field != "_id"):
+        return {field: value for field, value in document.items() if projection.get(field)}
+    return {field: value for field, value in document.items() if field not in projection}
+
+
+def read_back(documents, projection):
+    """Documents as the listing routes hand them to the JSON provider"""
+    batch = b"".join(bson.encode(project(document, projection)) for document in documents)
+    return decode_batch(batch)
+
+
+def bench(provider_class, payload, repeat):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    with app.app_context():
+        body = app.json.response(payload).get_data()
+        seconds = min(timeit.repeat(lambda: app.json.response(payload), number=1, repeat=repeat))
+    return seconds, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--complaints", type=int, default=200, help="Complaints per payload (MAX_PAGE_SIZE is 200)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    classifier = ComplaintClassifier(load_seed_sections())
+    stored = [make_complaint(rng, now, classifier) for _ in range(args.complaints)]
+
+    victim_listing = read_back(stored, VICTIM_LISTING_PROJECTION)
+    truncate_listing_text(victim_listing)
+    payloads = [
+        ("police listing", read_back(stored, POLICE_LISTING_PROJECTION)),
+        ("police listing fields=full", read_back(stored, FULL_LISTING_PROJECTION)),
+        ("victim listing", victim_listing),
+    ]
+
+    providers = [MongoJSONProvider]
+    if orjson is not None:
+        providers.append(OrjsonMongoJSONProvider)
+    else:
+        print("orjson is not installed; only the stdlib provider is measured")
+
+    print(f"{args.complaints} complaints per payload, best of {args.repeat} runs")
+    for name, payload in payloads:
+        print(name)
+        baseline = None
+        for provider_class in providers:
+            seconds, size = bench(provider_class, payload, args.repeat)
+            baseline = baseline or seconds
+            print(
+                f"  {provider_class.__name__:<26} {seconds * 1000:8.2f} ms  "
+                f"{size / 1024:8.1f} KiB  {baseline / seconds:5.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
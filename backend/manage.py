@@ -0,0 +1,287 @@
+"""
+Management commands for the SAARTHI backend
+
+Usage:
+    python manage.py ensure-indexes
+    python manage.py check-indexes
+    python manage.py check-query-plans
+    python manage.py notification-worker [--once] [--fake-twilio]
+    python manage.py reload-reference-data [collection ...]
+    python manage.py seed-ipc-sections
+    python manage.py import-complaints FILE --officer-id ID --officer-name NAME
+    python manage.py rebuild-search-index
+    python manage.py sync-search-index
+    python manage.py backfill-duplicate-signatures [--all]
+    python manage.py anchor-integrity [--backfill] [--backend NAME]
+    python manage.py verify-integrity [--backend NAME]
+"""
+import argparse
+import os
+import sys
+
+# Commands manage indexes explicitly, so skip the automatic build at import
+os.environ.setdefault("ENSURE_INDEXES_ON_BOOT", "false")
+
+
+def ensure_indexes_command(args):
+    from app import mongo
+    from utils.indexes import ensure_indexes
+
+    created = ensure_indexes(mongo.db)
+    for collection_name, names in created.items():
+        print(f"{collection_name}: {', '.join(names)}")
+    return 0
+
+
+def check_indexes_command(args):
+    from app import mongo
+    from utils.indexes import index_drift
+
+    drift = index_drift(mongo.db)
+    for collection_name, name in drift["missing"]:
+        print(f"MISSING     {collection_name}.{name}")
+    for collection_name, name, info in drift["mismatched"]:
+        print(f"MISMATCHED  {collection_name}.{name}: {info}")
+    for collection_name, name in drift["unexpected"]:
+        print(f"UNEXPECTED  {collection_name}.{name}")
+
+    has_drift = drift["missing"] or drift["mismatched"] or (args.strict and drift["unexpected"])
+    if not has_drift:
+        print("Indexes match the registry")
+    return 1 if has_drift else 0
+
+
+def check_query_plans_command(args):
+    from app import mongo
+    from utils.indexes import check_query_plans
+
+    failures = check_query_plans(mongo.db)
+    for collection_name, description, stages in failures:
+        print(f"COLLSCAN  {collection_name}: {description} ({' -> '.join(stages)})")
+
+    if not failures:
+        print("All route query shapes are served by an index")
+    return 1 if failures else 0
+
+
+def notification_worker_command(args):
+    from app import mongo, twilio_client, TWILIO_PHONE_NUMBER
+    from utils.outbox import run_worker
+
+    client, from_number = twilio_client, TWILIO_PHONE_NUMBER
+    if args.fake_twilio:
+        from utils.fake_twilio import FakeTwilioClient
+        client = FakeTwilioClient(failure_rate=args.fake_failure_rate)
+        from_number = from_number or "+15005550006"
+
+    if not client or not from_number:
+        print("Twilio is not configured; set the TWILIO_* variables or pass --fake-twilio")
+        return 1
+
+    print("Notification worker started")
+    try:
+        counts = run_worker(
+            mongo.db,
+            client,
+            from_number,
+            poll_interval=args.poll_interval,
+            once=args.once,
+            max_attempts=args.max_attempts
+        )
+        print(f"Outbox drained: {counts}")
+    except KeyboardInterrupt:
+        print("Notification worker stopped")
+    return 0
+
+
+def reload_reference_data_command(args):
+    from app import mongo
+    from utils.reference_cache import REFERENCE_CACHES, bump_reference_version
+
+    names = args.collections or list(REFERENCE_CACHES)
+    for name in names:
+        if name not in REFERENCE_CACHES:
+            print(f"Unknown reference collection: {name}")
+            return 1
+
+    for name in names:
+        print(f"{name}: version {bump_reference_version(mongo.db, name)}")
+    return 0
+
+
+def seed_ipc_sections_command(args):
+    from pymongo import UpdateOne
+    from app import mongo
+    from utils.classifier import load_seed_sections
+    from utils.reference_cache import bump_reference_version
+
+    sections = load_seed_sections()
+    result = mongo.db.ipc_sections.bulk_write([
+        UpdateOne({"number": section["number"]}, {"$set": section}, upsert=True)
+        for section in sections
+    ])
+    print(f"ipc_sections: {result.upserted_count} inserted, {result.modified_count} updated")
+    print(f"ipc_sections: version {bump_reference_version(mongo.db, 'ipc_sections')}")
+    return 0
+
+
+def import_complaints_command(args):
+    from app import mongo
+    from utils.complaint_import import import_complaints, detect_format
+
+    fmt = args.format or detect_format(args.file)
+    if not fmt:
+        print("Cannot tell the file format from its name; pass --format csv or --format ndjson")
+        return 1
+
+    officer = {"id": args.officer_id, "name": args.officer_name}
+    summary = None
+    with open(args.file, "rb") as f:
+        for event in import_complaints(mongo.db, f, fmt, officer, args.chunk_size):
+            if event["event"] == "error":
+                print(f"line {event['row']}: {event['error']}")
+            elif event["event"] == "progress":
+                print(f"{event['rows']} rows read, {event['inserted']} inserted, {event['failed']} failed")
+            else:
+                summary = event
+
+    print(f"Import finished: {summary['inserted']} of {summary['rows']} rows inserted, {summary['failed']} failed")
+    return 1 if summary["failed"] else 0
+
+
+def rebuild_search_index_command(args):
+    from app import mongo
+    from utils.complaint_search import rebuild_index
+
+    count = rebuild_index(mongo.db, batch_size=args.batch_size)
+    print(f"Search index rebuilt: {count} complaints indexed")
+    return 0
+
+
+def sync_search_index_command(args):
+    from app import mongo
+    from utils.complaint_search import sync_pending
+
+    count = sync_pending(mongo.db, batch_size=args.batch_size)
+    print(f"Search index synced: {count} pending complaints processed")
+    return 0
+
+
+def backfill_duplicate_signatures_command(args):
+    from app import mongo
+    from utils.near_duplicates import backfill_signatures
+
+    count = backfill_signatures(mongo.db, recompute=args.all, batch_size=args.batch_size)
+    print(f"Duplicate detection signatures stored on {count} complaints")
+    return 0
+
+
+def anchor_integrity_command(args):
+    from app import mongo
+    from utils.integrity import anchor_pending, backfill_leaves, get_anchor_backend, INTEGRITY_BATCH_SIZE
+
+    if args.backfill:
+        print(f"Recorded integrity hashes for {backfill_leaves(mongo.db)} older complaints")
+
+    backend = get_anchor_backend(args.backend)
+    counts = anchor_pending(mongo.db, mongo.cx, backend, batch_size=args.batch_size or INTEGRITY_BATCH_SIZE)
+    print(f"Anchored {counts['leaves']} complaints in {counts['batches']} batches ({backend.name})")
+    return 0
+
+
+def verify_integrity_command(args):
+    from app import mongo
+    from utils.integrity import verify_all, get_anchor_backend
+
+    report = verify_all(mongo.db, get_anchor_backend(args.backend))
+    print(f"Checked {report['complaints']} complaints in {report['batches']} batches")
+    problems = 0
+    for key, label in [
+        ("altered", "Complaints changed since they were hashed"),
+        ("missing", "Hashed complaints that no longer exist"),
+        ("badRoots", "Batches whose leaves do not match their root"),
+        ("unanchored", "Batches whose root is not in the anchor backend"),
+    ]:
+        if report[key]:
+            problems += len(report[key])
+            print(f"{label}: {', '.join(report[key])}")
+    if not problems:
+        print("Every complaint matches its anchored hash")
+    return 1 if problems else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SAARTHI backend management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("ensure-indexes", help="Create all declared MongoDB indexes").set_defaults(
+        func=ensure_indexes_command)
+
+    check_parser = subparsers.add_parser("check-indexes", help="Report drift between declared and existing indexes")
+    check_parser.add_argument("--strict", action="store_true", help="Also fail on undeclared indexes")
+    check_parser.set_defaults(func=check_indexes_command)
+
+    subparsers.add_parser("check-query-plans", help="Fail if any route query shape does a COLLSCAN").set_defaults(
+        func=check_query_plans_command)
+
+    worker_parser = subparsers.add_parser("notification-worker", help="Deliver queued SMS notifications")
+    worker_parser.add_argument("--once", action="store_true", help="Exit when no notification is due")
+    worker_parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between polls when idle")
+    worker_parser.add_argument("--max-attempts", type=int, default=5, help="Attempts before dead-lettering")
+    worker_parser.add_argument("--fake-twilio", action="store_true", help="Record messages instead of sending them")
+    worker_parser.add_argument("--fake-failure-rate", type=float, default=0.0,
+                               help="Probability that the fake client fails a send")
+    worker_parser.set_defaults(func=notification_worker_command)
+
+    reload_parser = subparsers.add_parser("reload-reference-data",
+                                          help="Invalidate cached IPC sections / legal rights in every worker")
+    reload_parser.add_argument("collections", nargs="*", help="Collections to reload (default: all)")
+    reload_parser.set_defaults(func=reload_reference_data_command)
+
+    subparsers.add_parser("seed-ipc-sections", help="Load the bundled IPC sections into MongoDB").set_defaults(
+        func=seed_ipc_sections_command)
+
+    import_parser = subparsers.add_parser("import-complaints", help="Bulk import complaints from a CSV or NDJSON file")
+    import_parser.add_argument("file", help="CSV (with header row) or NDJSON file")
+    import_parser.add_argument("--format", choices=["csv", "ndjson"], help="Default: guessed from the file extension")
+    import_parser.add_argument("--officer-id", required=True, help="Police officer recorded as filing the complaints")
+    import_parser.add_argument("--officer-name", required=True)
+    import_parser.add_argument("--chunk-size", type=int, default=500, help="Rows written per batch")
+    import_parser.set_defaults(func=import_complaints_command)
+
+    search_parser = subparsers.add_parser("rebuild-search-index",
+                                          help="Rebuild the complaint full-text search index from scratch")
+    search_parser.add_argument("--batch-size", type=int, default=1000, help="Complaints written per batch")
+    search_parser.set_defaults(func=rebuild_search_index_command)
+
+    sync_parser = subparsers.add_parser("sync-search-index",
+                                        help="Index complaints whose search index update did not complete")
+    sync_parser.add_argument("--batch-size", type=int, default=500, help="Complaints indexed per transaction")
+    sync_parser.set_defaults(func=sync_search_index_command)
+
+    signatures_parser = subparsers.add_parser("backfill-duplicate-signatures",
+                                              help="Store MinHash signatures on complaints that lack them")
+    signatures_parser.add_argument("--all", action="store_true",
+                                   help="Recompute every signature, e.g. after changing the MinHash settings")
+    signatures_parser.add_argument("--batch-size", type=int, default=1000, help="Complaints updated per batch")
+    signatures_parser.set_defaults(func=backfill_duplicate_signatures_command)
+
+    anchor_parser = subparsers.add_parser("anchor-integrity",
+                                          help="Batch pending complaint hashes into Merkle trees and anchor the roots")
+    anchor_parser.add_argument("--backfill", action="store_true",
+                               help="First record hashes for complaints filed before integrity records existed")
+    anchor_parser.add_argument("--backend", help="Anchor backend (default: INTEGRITY_ANCHOR_BACKEND)")
+    anchor_parser.add_argument("--batch-size", type=int, default=None, help="Complaints per Merkle tree")
+    anchor_parser.set_defaults(func=anchor_integrity_command)
+
+    verify_parser = subparsers.add_parser("verify-integrity",
+                                          help="Re-hash every complaint and check the batch roots and anchors")
+    verify_parser.add_argument("--backend", help="Anchor backend (default: INTEGRITY_ANCHOR_BACKEND)")
+    verify_parser.set_defaults(func=verify_integrity_command)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
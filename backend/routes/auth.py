@@ -1,60 +1,27 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from werkzeug.security import generate_password_hash, check_password_hash
-import random
-import time
 from datetime import datetime, timezone, timedelta
-import re
 from twilio.base.exceptions import TwilioRestException
 import os
+from utils.otp_store import get_otp_store
+from utils.identity import normalize_phone, is_valid_phone, victim_resolver
+from utils.session_bootstrap import fetch_victim_bootstrap, parse_last_seen
+from routes.complaints import parse_identity
+from utils.db_utils import run_in_transaction
+from utils.integrity import relink_complaints
 
 auth_routes = Blueprint('auth', __name__)
 
-# Helper function to validate phone number
-def is_valid_phone(phone):
-    pattern = r"^(\+91[\-\s]?)?[0]?(91)?[789]\d{9}$"
-    return bool(re.match(pattern, phone))
-
-# New: In-memory OTP storage (would use Redis or database in production)
-otp_storage = {}
-
 def generate_otp(phone):
     """Generate a 6-digit OTP and store it with expiration time"""
-    otp = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-    expiry = time.time() + 600  # OTP valid for 10 minutes
-    otp_storage[phone] = {
-        'otp': otp,
-        'expiry': expiry,
-        'attempts': 0
-    }
-    return otp
+    from app import mongo
+    return get_otp_store(mongo.db).generate(phone)
 
 def verify_otp(phone, entered_otp):
     """Verify the OTP for a phone number"""
-    if phone not in otp_storage:
-        return False, "OTP expired or not sent"
-    
-    otp_data = otp_storage[phone]
-    
-    # Check if OTP has expired
-    if time.time() > otp_data['expiry']:
-        del otp_storage[phone]
-        return False, "OTP has expired"
-    
-    # Check if too many attempts
-    if otp_data['attempts'] >= 3:
-        del otp_storage[phone]
-        return False, "Too many failed attempts. Please request a new OTP."
-    
-    # Increment attempt counter
-    otp_data['attempts'] += 1
-    
-    # Check if OTP matches
-    if otp_data['otp'] == entered_otp:
-        del otp_storage[phone]  # Remove after successful verification
-        return True, "OTP verified"
-    
-    return False, "Invalid OTP"
+    from app import mongo
+    return get_otp_store(mongo.db).verify(phone, entered_otp)
 
 @auth_routes.route('/api/auth/send-otp', methods=['POST'])
 def send_otp():
@@ -67,12 +34,7 @@ def send_otp():
         return jsonify({"error": "Phone number is required"}), 400
     
     # Format phone number to E.164 format for Twilio
-    formatted_phone = phone
-    if not formatted_phone.startswith('+'):
-        if formatted_phone.startswith('91'):
-            formatted_phone = '+' + formatted_phone
-        else:
-            formatted_phone = '+91' + formatted_phone
+    formatted_phone = normalize_phone(phone)
     
     print(f"Sending OTP to formatted phone: {formatted_phone}")
     
@@ -81,11 +43,10 @@ def send_otp():
         return jsonify({"error": "Invalid phone number format"}), 400
     
     try:
-        # Check if user exists in victims collection
-        existing_user = mongo.db.victims.find_one({"phone": formatted_phone})
-        
-        # Check if user exists in pre-registered victims (filed by police)
-        pre_registered = mongo.db.pre_registered_victims.find_one({"phone": formatted_phone})
+        # Check victims and pre-registered victims (filed by police) in one lookup
+        identity = victim_resolver.resolve(mongo.db, formatted_phone)
+        existing_user = identity.victim
+        pre_registered = identity.pre_registered
         
         # Generate a new OTP
         otp = generate_otp(formatted_phone)
@@ -171,21 +132,16 @@ def verify_otp_route():
         return jsonify({"error": "Phone and verification code are required"}), 400
     
     # Format phone number
-    formatted_phone = phone
-    if not formatted_phone.startswith('+'):
-        if formatted_phone.startswith('91'):
-            formatted_phone = '+' + formatted_phone
-        else:
-            formatted_phone = '+91' + formatted_phone
+    formatted_phone = normalize_phone(phone)
     
     print(f"Verifying OTP for phone: {formatted_phone}, code: {code}")
     
     try:
-        # Check if user exists in victims collection
-        user = mongo.db.victims.find_one({"phone": formatted_phone})
-        
-        # Check if user exists in pre-registered victims
-        pre_registered = mongo.db.pre_registered_victims.find_one({"phone": formatted_phone})
+        # Check victims and pre-registered victims in one lookup; bypass the
+        # cache since a victim may be created from the answer
+        identity = victim_resolver.resolve(mongo.db, formatted_phone, fresh=True)
+        user = identity.victim
+        pre_registered = identity.pre_registered
         
         # Verify OTP
         is_valid, message = verify_otp(formatted_phone, code)
@@ -219,12 +175,24 @@ def verify_otp_route():
                         user_data.update(additional_info)
                     
                     user_id = mongo.db.victims.insert_one(user_data).inserted_id
+                    victim_resolver.invalidate(formatted_phone)
                     
-                    # Update any complaints with this phone number to link to the new user ID
-                    mongo.db.complaints.update_many(
-                        {"complainantPhone": formatted_phone},
-                        {"$set": {"complainantId": str(user_id)}}
-                    )
+                    # Update any complaints with this phone number to link to the new user ID.
+                    # Their integrity hashes cover complainantId, so they are re-recorded
+                    # in the same transaction.
+                    def relink(session):
+                        linked = mongo.db.complaints.find({"complainantPhone": formatted_phone}, session=session)
+                        relink_complaints(mongo.db, linked, str(user_id), session=session)
+                        mongo.db.complaints.update_many(
+                            {"complainantPhone": formatted_phone},
+                            {
+                                "$set": {"complainantId": str(user_id), "updatedAt": datetime.now(timezone.utc).isoformat()},
+                                "$inc": {"version": 1}
+                            },
+                            session=session
+                        )
+                    
+                    run_in_transaction(mongo.cx, relink)
                     
                     # Optionally, remove from pre-registered collection
                     # mongo.db.pre_registered_victims.delete_one({"phone": phone})
@@ -248,6 +216,7 @@ def verify_otp_route():
                         user_data.update(additional_info)
                     
                     user_id = mongo.db.victims.insert_one(user_data).inserted_id
+                    victim_resolver.invalidate(formatted_phone)
                     user = mongo.db.victims.find_one({"_id": user_id})
             else:
                 # Update existing user with any new information
@@ -258,6 +227,7 @@ def verify_otp_route():
                     update_data["$set"].update(additional_info)
                 
                 mongo.db.victims.update_one({"_id": user["_id"]}, update_data)
+                victim_resolver.invalidate(formatted_phone)
             
             # Create a simple string identifier for the identity (subject)
             identity_string = f"{str(user['_id'])}:{user['role']}:{user['name']}"
@@ -279,28 +249,16 @@ def verify_otp_route():
                 if field in user:
                     user_data[field] = user[field]
             
-            # Get associated complaints
-            complaints = list(mongo.db.complaints.find(
-                {"$or": [{"complainantId": str(user["_id"])}, {"complainantPhone": phone}]},
-                # Only return necessary fields for listing
-                {"_id": 1, "status": 1, "filedAt": 1}
-            ))
-            
-            # Convert ObjectId to string in complaints and truncate text
-            for complaint in complaints:
-                if "_id" in complaint:
-                    complaint["id"] = str(complaint.pop("_id"))
-                
-                # Include a truncated version of the text for privacy
-                if "text" in complaint and len(complaint["text"]) > 50:
-                    complaint["text"] = complaint["text"][:50] + "..."
-            
-            user_data["complaints"] = complaints
+            # Get associated complaints. Complaints filed before registration were
+            # linked to this ID on promotion, so the indexed complainantId is enough.
+            bootstrap = fetch_victim_bootstrap(mongo.db, str(user["_id"]))
+            user_data["complaints"] = bootstrap["complaints"] if bootstrap else []
             
             return jsonify({
                 "message": "Verification successful",
                 "token": access_token,
-                "user": user_data
+                "user": user_data,
+                "serverTime": bootstrap["serverTime"] if bootstrap else None
             }), 200
         else:
             return jsonify({"error": message}), 400
@@ -414,16 +372,45 @@ def get_user():
         print(f"Error parsing user identity: {e}")
         return jsonify({"error": "Invalid user identity"}), 400
 
+# Everything the victim dashboard shows on load, in one request
+@auth_routes.route('/api/auth/bootstrap', methods=['GET'])
+@jwt_required()
+def session_bootstrap():
+    from app import mongo
+    
+    current_user = parse_identity(get_jwt_identity())
+    
+    if not current_user:
+        return jsonify({"error": "Invalid user identity"}), 400
+    
+    if current_user["role"] != "victim":
+        return jsonify({"error": "Session bootstrap is only available to victims"}), 403
+    
+    try:
+        last_seen = parse_last_seen(request.args.get('last_seen'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        bootstrap = fetch_victim_bootstrap(mongo.db, current_user["id"], last_seen)
+        if not bootstrap:
+            return jsonify({"error": "User not found"}), 404
+        
+        return jsonify(bootstrap), 200
+    except Exception as e:
+        print(f"Error loading session bootstrap: {e}")
+        return jsonify({"error": str(e)}), 400
+
 # New route for police to pre-register victims
 @auth_routes.route('/api/auth/police/register-victim', methods=['POST'])
 @jwt_required()
 def register_victim():
     from app import mongo
     
-    current_user = get_jwt_identity()
+    current_user = parse_identity(get_jwt_identity())
     
     # Only police officers can pre-register victims
-    if current_user["role"] != "police":
+    if not current_user or current_user["role"] != "police":
         return jsonify({"error": "Unauthorized access"}), 403
     
     data = request.get_json()
@@ -436,17 +423,16 @@ def register_victim():
         return jsonify({"error": "Name and phone number are required"}), 400
     
     # Format phone number
-    if not phone.startswith('+'):
-        if phone.startswith('91'):
-            phone = '+' + phone
-        else:
-            phone = '+91' + phone
+    phone = normalize_phone(phone)
     
     if not is_valid_phone(phone):
         return jsonify({"error": "Invalid phone number format"}), 400
     
+    # Check registration and pre-registration in one lookup
+    identity = victim_resolver.resolve(mongo.db, phone, fresh=True)
+    
     # Check if already registered
-    existing_victim = mongo.db.victims.find_one({"phone": phone})
+    existing_victim = identity.victim
     if existing_victim:
         return jsonify({
             "message": "Victim already registered",
@@ -458,7 +444,7 @@ def register_victim():
         }), 200
     
     # Check if already pre-registered
-    pre_registered = mongo.db.pre_registered_victims.find_one({"phone": phone})
+    pre_registered = identity.pre_registered
     if pre_registered:
         # Update existing pre-registration
         mongo.db.pre_registered_victims.update_one(
@@ -492,6 +478,8 @@ def register_victim():
         result = mongo.db.pre_registered_victims.insert_one(victim_data)
         victim_id = result.inserted_id
     
+    victim_resolver.invalidate(phone)
+    
     # Retrieve the updated/created pre-registration
     victim = mongo.db.pre_registered_victims.find_one({"_id": victim_id})
     
@@ -1,16 +1,90 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
+import queue
+import time
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson.objectid import ObjectId
 from datetime import datetime, timezone
-import re
-from utils.notifications import send_complaint_confirmation_sms, send_status_update_sms
+from pymongo import ReturnDocument
+from utils.outbox import enqueue_notification
+from utils.db_utils import run_in_transaction
+from utils.reference_cache import ipc_sections_cache
+from utils.classifier import get_classifier, load_seed_sections
+from utils.batch_analysis import batch_analyzer, MAX_BATCH_ITEMS
+from utils.pagination import fetch_page, parse_limit, InvalidCursorError
+from utils.delta_sync import fetch_changes, sync_watermark, ACTIVE_FILTER
+from utils.bson_json import decode_batches, json_response
+from utils.http_cache import documents_etag, not_modified
+from utils.near_duplicates import signature_fields, find_duplicates, SIGNATURE_FIELDS
+from utils.integrity import record_complaints, inclusion_proof, get_anchor_backend
+from utils.complaint_search import search as search_complaint_index, index_complaint, remove_complaint, mark_pending, MAX_SEARCH_RESULTS
+from utils.complaint_enrichment import fetch_complaint_with_victim, attach_victim_details
+from utils.idempotency import idempotent
+from utils.identity import normalize_phone, is_valid_phone, victim_resolver
+from utils.versioning import parse_expected_version, version_filter, version_etag, representation_etag, InvalidVersionError
+from utils.complaint_batch import apply_batch, MAX_BATCH_OPERATIONS, RESULT_APPLIED
+from utils.complaint_import import (
+    import_complaints, detect_format, IMPORT_FORMATS, DEFAULT_IMPORT_CHUNK_SIZE, MAX_IMPORT_CHUNK_SIZE
+)
+from utils.change_feed import (
+    complaint_feed, ChangeStreamUnavailable, format_sse, HEARTBEAT_FRAME, EVENT_RESYNC,
+    STREAM_HEARTBEAT_SECONDS, STREAM_MAX_SECONDS
+)
+from utils.export import iter_complaint_export, DEFAULT_EXPORT_BATCH_SIZE, MAX_EXPORT_BATCH_SIZE
 
 complaint_routes = Blueprint('complaints', __name__)
 
-# Helper function to validate phone number
-def is_valid_phone(phone):
-    pattern = r"^(\+91[\-\s]?)?[0]?(91)?[789]\d{9}$"
-    return bool(re.match(pattern, phone))
+# Fields returned in the police complaint listing unless full documents are requested
+POLICE_LISTING_PROJECTION = {
+    "text": 1, "language": 1, "status": 1, "filedAt": 1, "updatedAt": 1,
+    "firNumber": 1, "appliedSections": 1, "complainantId": 1,
+    "complainantName": 1, "complainantPhone": 1, "currentStage": 1,
+    "summary": 1, "filedBy": 1, "version": 1, "_id": 1
+}
+
+# Full documents (fields=full) leave out the duplicate detection signatures
+FULL_LISTING_PROJECTION = {field: 0 for field in SIGNATURE_FIELDS}
+
+# Fields returned in the victim complaint listing. Listing ETags are built
+# from updatedAt and version, so both must be projected.
+VICTIM_LISTING_PROJECTION = {
+    "text": 1, "status": 1, "filedAt": 1, "firNumber": 1,
+    "complainantName": 1, "currentStage": 1, "updatedAt": 1, "version": 1, "_id": 1
+}
+
+# Helper function to truncate complaint text in victim listings
+def truncate_listing_text(complaints):
+    for complaint in complaints:
+        if "text" in complaint:
+            # Store the length of the original text
+            complaint["textLength"] = len(complaint["text"])
+            # Truncate text for the listing to preserve privacy
+            if len(complaint["text"]) > 100:
+                complaint["text"] = complaint["text"][:100] + "..."
+
+# Helper function to return the complaints changed since a sync watermark
+def get_complaint_changes(db, current_user, since):
+    limit = parse_limit(request.args.get('limit'))
+    
+    if current_user["role"] == "victim":
+        query = {"complainantId": current_user["id"]}
+        projection = VICTIM_LISTING_PROJECTION
+    else:
+        query = {}
+        projection = FULL_LISTING_PROJECTION if request.args.get('fields') == 'full' else POLICE_LISTING_PROJECTION
+    
+    complaints, tombstones, watermark, has_more = fetch_changes(db.complaints, query, projection, since, limit)
+    
+    if current_user["role"] == "victim":
+        truncate_listing_text(complaints)
+    elif request.args.get('enrich') == 'victim':
+        attach_victim_details(db, complaints)
+    
+    return json_response({
+        "complaints": complaints,
+        "tombstones": tombstones,
+        "watermark": watermark,
+        "hasMore": has_more
+    })
 
 # Helper function to parse the JWT identity string
 def parse_identity(identity_string):
@@ -25,8 +99,9 @@ def parse_identity(identity_string):
 
 @complaint_routes.route('/api/complaints', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_complaint():
-    from app import mongo, twilio_client, TWILIO_PHONE_NUMBER
+    from app import mongo
     
     # Fix the identity handling
     current_user_identity = get_jwt_identity()
@@ -58,11 +133,7 @@ def create_complaint():
     # Handle complaint creation by police on behalf of victim
     if current_user["role"] == "police" and victim_phone:
         # Format phone number
-        if not victim_phone.startswith('+'):
-            if victim_phone.startswith('91'):
-                victim_phone = '+' + victim_phone
-            else:
-                victim_phone = '+91' + victim_phone
+        victim_phone = normalize_phone(victim_phone)
         
         if not is_valid_phone(victim_phone):
             return jsonify({"error": "Invalid victim phone number format"}), 400
@@ -70,12 +141,14 @@ def create_complaint():
         if not victim_name:
             return jsonify({"error": "Victim name is required"}), 400
         
-        # Check if victim exists
-        victim = mongo.db.victims.find_one({"phone": victim_phone})
+        # Check victims and pre-registered victims in one lookup; bypass the
+        # cache since a pre-registration may be created from the answer
+        identity = victim_resolver.resolve(mongo.db, victim_phone, fresh=True)
+        victim = identity.victim
         
         # If victim doesn't exist, check pre-registered victims
         if not victim:
-            pre_registered = mongo.db.pre_registered_victims.find_one({"phone": victim_phone})
+            pre_registered = identity.pre_registered
             
             if pre_registered:
                 # Use pre-registered data
@@ -98,6 +171,7 @@ def create_complaint():
                     victim_data.update(victim_details)
                 
                 result = mongo.db.pre_registered_victims.insert_one(victim_data)
+                victim_resolver.invalidate(victim_phone)
                 complainant_id = str(result.inserted_id)
                 complainant_name = victim_name
         else:
@@ -114,6 +188,7 @@ def create_complaint():
             "complainantName": complainant_name,
             "complainantPhone": victim_phone,
             "filedAt": datetime.now(timezone.utc).isoformat(),
+            "version": 1,
             "filedBy": {
                 "id": current_user["id"],
                 "name": current_user["name"],
@@ -157,6 +232,7 @@ def create_complaint():
             "complainantName": current_user["name"],
             "complainantPhone": current_user.get("phone"),
             "filedAt": datetime.now(timezone.utc).isoformat(),
+            "version": 1,
         }
         
         # Add additional data
@@ -177,61 +253,58 @@ def create_complaint():
                     section["section"] for section in analysis_result["sections"]
                 ]
     
-    result = mongo.db.complaints.insert_one(complaint)
+    # New complaints are picked up by delta sync like any other change
+    complaint["updatedAt"] = complaint["filedAt"]
+    
+    # MinHash signature and LSH band keys for near-duplicate detection
+    complaint.update(signature_fields(complaint["text"], complaint.get("language")))
+    
+    # Flag earlier reports of the same incident before this one is stored
+    possible_duplicates = find_duplicates(mongo.db, complaint)
+    
+    # Queue the confirmation SMS in the same transaction as the complaint so the
+    # request never waits on Twilio; the notification worker delivers it
+    recipient_phone = complaint.get("complainantPhone")
+    
+    def write_complaint(session):
+        result = mongo.db.complaints.insert_one(complaint, session=session)
+        # Indexed after commit; the marker lets `sync-search-index` finish the job if that fails
+        mark_pending(mongo.db, [result.inserted_id], session=session)
+        # The canonical hash is recorded with the complaint and anchored in a later batch
+        record_complaints(mongo.db, [complaint], session=session)
+        if recipient_phone:
+            is_cognizable = None
+            if complaint.get("analysisResult"):
+                is_cognizable = complaint["analysisResult"].get("isCognizable")
+            enqueue_notification(
+                mongo.db,
+                "complaint_confirmation",
+                recipient_phone,
+                str(result.inserted_id),
+                {"is_cognizable": is_cognizable},
+                session=session
+            )
+        return result
+    
+    result = run_in_transaction(mongo.cx, write_complaint)
     complaint_id = str(result.inserted_id)
+    index_complaint(mongo.db, dict(complaint, _id=result.inserted_id))
     complaint["id"] = complaint_id
     
     # Remove _id from the response to avoid serialization error
     if '_id' in complaint:
         del complaint['_id']
+    for field in SIGNATURE_FIELDS:
+        complaint.pop(field, None)
     
-    # Send SMS notification to victim
-    try:
-        victim_phone = victim_phone if 'victim_phone' in locals() else complaint.get("complainantPhone")
-        
-        if twilio_client and TWILIO_PHONE_NUMBER and victim_phone:
-            is_cognizable = None
-            if "analysisResult" in complaint and complaint.get("analysisResult"):
-                is_cognizable = complaint["analysisResult"].get("isCognizable")
-                
-            notification_result = send_complaint_confirmation_sms(
-                twilio_client, 
-                TWILIO_PHONE_NUMBER,
-                victim_phone,
-                complaint_id,
-                is_cognizable
-            )
-            
-            if notification_result["success"]:
-                print(f"SMS notification sent: {notification_result['sid']}")
-                # Store notification history in database
-                mongo.db.notifications.insert_one({
-                    "complaintId": complaint_id,
-                    "recipientPhone": victim_phone,
-                    "type": "complaint_confirmation",
-                    "message": notification_result["message"],
-                    "status": "sent",
-                    "sentAt": datetime.now(timezone.utc).isoformat(),
-                    "twilioSid": notification_result.get("sid")
-                })
-            else:
-                print(f"Failed to send SMS notification: {notification_result['error']}")
-                # Log the failure
-                mongo.db.notifications.insert_one({
-                    "complaintId": complaint_id,
-                    "recipientPhone": victim_phone,
-                    "type": "complaint_confirmation",
-                    "status": "failed",
-                    "error": notification_result["error"],
-                    "attemptedAt": datetime.now(timezone.utc).isoformat()
-                })
-    except Exception as e:
-        print(f"Error in notification process: {str(e)}")
-    
-    return jsonify({
+    response = {
         "message": "Complaint filed successfully",
         "complaint": complaint
-    }),201
+    }
+    # Only police may see other people's complaints
+    if current_user["role"] == "police":
+        response["possibleDuplicates"] = possible_duplicates
+    return jsonify(response),201
 
 @complaint_routes.route('/api/complaints', methods=['GET'])
 @jwt_required()
@@ -245,35 +318,238 @@ def get_complaints():
         return jsonify({"error": "Invalid user identity"}), 400
     
     try:
+        next_cursor = None
+        since = request.args.get('since')
+        
+        if since:
+            return get_complaint_changes(mongo.db, current_user, since)
+        
+        # Taken before the listing is read so changes made while it runs are
+        # still returned by the first delta sync
+        watermark = sync_watermark()
+        
         if current_user["role"] == "victim":
             # Return only complaints filed by this victim
             # Don't include full text for privacy in the listing
-            complaints = list(mongo.db.complaints.find(
-                {"complainantId": current_user["id"]},
-                {"text": 1, "status": 1, "filedAt": 1, "firNumber": 1, 
-                 "complainantName": 1, "currentStage": 1, "_id": 1}
+            complaints = decode_batches(mongo.db.complaints.find_raw_batches(
+                {"complainantId": current_user["id"], **ACTIVE_FILTER},
+                VICTIM_LISTING_PROJECTION
             ))
         else:
-            # For police officers, return all complaints with full details
-            complaints = list(mongo.db.complaints.find())
-        
-        # Convert ObjectId to string
-        for complaint in complaints:
-            complaint["id"] = str(complaint.pop("_id"))
+            # For police officers, return one page of complaints ordered by
+            # filing time. Full documents are only returned when asked for.
+            limit = parse_limit(request.args.get('limit'))
+            projection = FULL_LISTING_PROJECTION if request.args.get('fields') == 'full' else POLICE_LISTING_PROJECTION
+            complaints, next_cursor = fetch_page(
+                mongo.db.complaints,
+                ACTIVE_FILTER,
+                projection,
+                "filedAt",
+                limit,
+                request.args.get('cursor')
+            )
             
-            # For victims, only return a truncated version of the text for privacy
-            if current_user["role"] == "victim" and "text" in complaint:
-                # Store the length of the original text
-                complaint["textLength"] = len(complaint["text"])
-                # Truncate text for the listing to preserve privacy
-                if len(complaint["text"]) > 100:
-                    complaint["text"] = complaint["text"][:100] + "..."
-        
-        return jsonify(complaints), 200
+            # Optionally join complainant address and ID proof for the whole page
+            if request.args.get('enrich') == 'victim':
+                attach_victim_details(mongo.db, complaints)
+        
+        # For victims, only return a truncated version of the text for privacy
+        if current_user["role"] == "victim":
+            truncate_listing_text(complaints)
+        
+        # Unchanged pages are answered with 304 before serializing anything. Joined
+        # victim details carry no version, so enriched pages get a body-hash ETag.
+        etag = None
+        if request.args.get('enrich') != 'victim':
+            etag = documents_etag(complaints, current_user["role"], request.query_string.decode())
+        response = not_modified(etag) if etag else None
+        if response is None:
+            response = json_response(complaints)
+            if etag:
+                response.set_etag(etag, weak=True)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["X-Sync-Watermark"] = watermark
+        return response
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error processing complaints request: {e}")
         return jsonify({"error": "Error retrieving complaints"}), 400
 
+@complaint_routes.route('/api/complaints/export', methods=['GET'])
+@jwt_required()
+def export_complaints():
+    from app import mongo
+    
+    current_user_identity = get_jwt_identity()
+    current_user = parse_identity(current_user_identity)
+    
+    if not current_user:
+        return jsonify({"error": "Invalid user identity"}), 400
+    
+    # Only police can export the complaint register
+    if current_user["role"] != "police":
+        return jsonify({"error": "Only police officers can export complaints"}), 403
+    
+    try:
+        batch_size = int(request.args.get('batch_size', DEFAULT_EXPORT_BATCH_SIZE))
+    except ValueError:
+        return jsonify({"error": "batch_size must be an integer"}), 400
+    batch_size = max(1, min(batch_size, MAX_EXPORT_BATCH_SIZE))
+    include_notes = request.args.get('include_notes', '1') != '0'
+    
+    # Stream newline-delimited JSON so memory stays flat regardless of collection size
+    filename = f"complaints-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.ndjson"
+    return Response(
+        stream_with_context(iter_complaint_export(mongo.db, batch_size, include_notes)),
+        mimetype='application/x-ndjson',
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+# EventSource cannot set headers, so the token may also be sent as ?jwt=
+@complaint_routes.route('/api/complaints/stream', methods=['GET'])
+@jwt_required(locations=["headers", "query_string"])
+def stream_complaints():
+    from app import mongo
+    
+    current_user = parse_identity(get_jwt_identity())
+    
+    if not current_user:
+        return jsonify({"error": "Invalid user identity"}), 400
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    
+    try:
+        subscriber, replay, resync = complaint_feed.subscribe(
+            current_app._get_current_object(), mongo.db, current_user, last_event_id
+        )
+    except ChangeStreamUnavailable as e:
+        print(f"Complaint stream unavailable: {e}")
+        return jsonify({"error": "Live updates are not available; poll GET /api/complaints?since= instead"}), 503
+    
+    def generate():
+        try:
+            # Reconnect quickly after the server closes the stream
+            yield b"retry: 3000\n\n"
+            if resync:
+                # Missed events are no longer buffered: catch up with ?since= delta sync
+                yield format_sse(b"{}", EVENT_RESYNC)
+            for frame in replay:
+                yield frame
+            
+            deadline = time.monotonic() + STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                if subscriber.overflowed and subscriber.queue.empty():
+                    # Fell behind and was dropped; the client resumes from its last event
+                    return
+                try:
+                    yield subscriber.queue.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield HEARTBEAT_FRAME
+        finally:
+            complaint_feed.unsubscribe(subscriber)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@complaint_routes.route('/api/complaints/search', methods=['GET'])
+@jwt_required()
+def search_complaints():
+    from app import mongo
+    
+    current_user = parse_identity(get_jwt_identity())
+    
+    if not current_user:
+        return jsonify({"error": "Invalid user identity"}), 400
+    
+    # Only police can search across all complaints
+    if current_user["role"] != "police":
+        return jsonify({"error": "Only police officers can search complaints"}), 403
+    
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({"error": "Search query (q) is required"}), 400
+    
+    try:
+        limit = parse_limit(request.args.get('limit'), default=20)
+        offset = int(request.args.get('offset', 0))
+    except (InvalidCursorError, ValueError):
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    if offset < 0:
+        return jsonify({"error": "offset must not be negative"}), 400
+    
+    try:
+        ranked, total = search_complaint_index(mongo.db, query, request.args.get('language'), offset, limit)
+        
+        # Load the page's complaints in one query and keep the ranking order
+        scores = dict(ranked)
+        complaints = {
+            complaint["id"]: complaint
+            for complaint in decode_batches(mongo.db.complaints.find_raw_batches(
+                {"_id": {"$in": list(scores)}, **ACTIVE_FILTER}, POLICE_LISTING_PROJECTION
+            ))
+        }
+        results = []
+        for complaint_oid, score in ranked:
+            complaint = complaints.get(str(complaint_oid))
+            if complaint:
+                complaint["score"] = round(score, 4)
+                results.append(complaint)
+        
+        next_offset = offset + limit if offset + limit < total else None
+        return json_response({
+            "results": results,
+            "total": total,
+            "nextOffset": next_offset,
+            "maxResults": MAX_SEARCH_RESULTS
+        })
+    except Exception as e:
+        print(f"Error searching complaints: {e}")
+        return jsonify({"error": str(e)}), 400
+
+@complaint_routes.route('/api/complaints/import', methods=['POST'])
+@jwt_required()
+def import_complaints_route():
+    from app import mongo
+    
+    current_user = parse_identity(get_jwt_identity())
+    
+    if not current_user:
+        return jsonify({"error": "Invalid user identity"}), 400
+    
+    # Only police can import complaint registers
+    if current_user["role"] != "police":
+        return jsonify({"error": "Only police officers can import complaints"}), 403
+    
+    try:
+        chunk_size = int(request.args.get('chunk_size', DEFAULT_IMPORT_CHUNK_SIZE))
+    except ValueError:
+        return jsonify({"error": "chunk_size must be an integer"}), 400
+    chunk_size = max(1, min(chunk_size, MAX_IMPORT_CHUNK_SIZE))
+    
+    # Accept a multipart upload in `file`, or the file as the raw request body
+    upload = request.files.get('file')
+    if upload:
+        stream = upload.stream
+        fmt = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+    else:
+        stream = request.stream
+        fmt = request.args.get('format') or detect_format(content_type=request.mimetype)
+    
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({"error": "format must be 'csv' or 'ndjson'"}), 400
+    
+    def generate():
+        for event in import_complaints(mongo.db, stream, fmt, current_user, chunk_size):
+            yield current_app.json.dumps(event) + "\n"
+    
+    # Row errors and progress stream back as newline-delimited JSON while the upload is processed
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @complaint_routes.route('/api/complaints/<complaint_id>', methods=['GET'])
 @jwt_required()
 def get_complaint(complaint_id):
@@ -286,8 +562,12 @@ def get_complaint(complaint_id):
         return jsonify({"error": "Invalid user identity"}), 400
     
     try:
-        # Always fetch the complete complaint with full text
-        complaint = mongo.db.complaints.find_one({"_id": ObjectId(complaint_id)})
+        # Always fetch the complete complaint with full text. Police also get the
+        # complainant's address and ID proof, joined in the same aggregation.
+        if current_user["role"] == "police":
+            complaint = fetch_complaint_with_victim(mongo.db, complaint_id)
+        else:
+            complaint = mongo.db.complaints.find_one({"_id": ObjectId(complaint_id)})
         
         if not complaint:
             return jsonify({"error": "Complaint not found"}), 404
@@ -296,35 +576,29 @@ def get_complaint(complaint_id):
         if current_user["role"] == "victim" and complaint["complainantId"] != current_user["id"]:
             return jsonify({"error": "Unauthorized access"}), 403
         
+        for field in SIGNATURE_FIELDS:
+            complaint.pop(field, None)
+        
         # Add ID
         complaint["id"] = str(complaint.pop("_id"))
         
-        # If the user is a police officer, fetch additional victim information
-        if current_user["role"] == "police" and "complainantId" in complaint:
-            victim_id = complaint["complainantId"]
-            
-            # Try to find the victim in the victims collection
-            victim = mongo.db.victims.find_one({"_id": ObjectId(victim_id)})
-            
-            # If not found, try in pre-registered victims
-            if not victim and "complainantPhone" in complaint:
-                victim = mongo.db.pre_registered_victims.find_one({"phone": complaint["complainantPhone"]})
-            
-            # If we found victim info, add address and ID proof to the complaint
-            if victim:
-                complaint["complainantAddress"] = victim.get("address", "Not available")
-                complaint["complainantIdProof"] = victim.get("id_proof", "Not available")
-        
         # Ensure we're always sending the full text in GET single complaint endpoint
         # No text truncation here
         
-        return jsonify(complaint), 200
+        # The weak ETag covers the whole body (the joined complainant details change
+        # without a version bump) and starts with the version a later PATCH can send
+        # in If-Match
+        response = jsonify(complaint)
+        response.set_etag(representation_etag(complaint.get("version"), response.get_data()), weak=True)
+        return response, 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 @complaint_routes.route('/api/complaints/analyze', methods=['POST'])
 @jwt_required()
 def analyze_complaint():
+    from app import mongo
+    
     data = request.get_json()
     text = data.get('text')
     language = data.get('language')
@@ -332,50 +606,84 @@ def analyze_complaint():
     if not text or not language:
         return jsonify({"error": "Text and language are required"}), 400
     
-    # Mock analysis result
-    analysis_result = {
-        "suggestions": [
-            {
-                "section": "IPC 354",
-                "description": "Assault or criminal force to woman with intent to outrage her modesty",
-                "act": "Indian Penal Code",
-                "isCognizable": True,
-                "isBailable": False,
-                "punishment": "Imprisonment up to 5 years and fine"
-            },
-            {
-                "section": "IPC 509",
-                "description": "Word, gesture or act intended to insult the modesty of a woman",
-                "act": "Indian Penal Code",
-                "isCognizable": True,
-                "isBailable": True,
-                "punishment": "Imprisonment up to 3 years and fine"
-            }
-        ],
-        "judgments": [
-            {
-                "title": "Vishaka vs State of Rajasthan",
-                "year": 1997,
-                "summary": "Landmark case that defined sexual harassment at workplace",
-                "fullText": "The Supreme Court of India laid down guidelines for preventing sexual harassment at workplace...",
-                "citation": "AIR 1997 SC 3011"
-            }
-        ],
-        "proceduralSteps": [
-            "File a written complaint at the police station",
-            "Get a medical examination if there was physical contact",
-            "Record your statement before a Magistrate under Section 164 CrPC",
-            "Cooperate with the police investigation",
-            "Identify the accused in an identification parade if required"
-        ]
-    }
+    # Score the complaint against the cached IPC sections; no external API call
+    snapshot = ipc_sections_cache.get(mongo.db)
+    analysis_result = get_classifier(snapshot).classify(text, language)
     
     return jsonify(analysis_result), 200
 
+@complaint_routes.route('/api/complaints/analyze/batch', methods=['POST'])
+@jwt_required()
+def analyze_complaints_batch():
+    from app import mongo
+    
+    current_user = parse_identity(get_jwt_identity())
+    
+    if not current_user:
+        return jsonify({"error": "Invalid user identity"}), 400
+    
+    if current_user["role"] != "police":
+        return jsonify({"error": "Only police officers can run batch analysis"}), 403
+    
+    data = request.get_json()
+    items = data.get('items') if isinstance(data, dict) else data
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "A non-empty list of items is required"}), 400
+    
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({"error": f"At most {MAX_BATCH_ITEMS} items can be analyzed per request"}), 400
+    
+    snapshot = ipc_sections_cache.get(mongo.db)
+    sections = snapshot.documents or load_seed_sections()
+    
+    def generate():
+        for result in batch_analyzer.analyze(snapshot, sections, items):
+            yield current_app.json.dumps(result) + "\n"
+    
+    # Results stream back in input order as the pool completes them
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@complaint_routes.route('/api/complaints/batch', methods=['POST'])
+@jwt_required()
+@idempotent
+def batch_update_complaints():
+    from app import mongo
+    
+    current_user = parse_identity(get_jwt_identity())
+    
+    if not current_user:
+        return jsonify({"error": "Invalid user identity"}), 400
+    
+    if current_user["role"] != "police":
+        return jsonify({"error": "Only police officers can update complaints"}), 403
+    
+    data = request.get_json()
+    operations = data.get('operations') if isinstance(data, dict) else data
+    
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "A non-empty list of operations is required"}), 400
+    
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({"error": f"At most {MAX_BATCH_OPERATIONS} operations can be applied per request"}), 400
+    
+    try:
+        # Operations fail or succeed individually; see each result's status
+        results = apply_batch(mongo.db, mongo.cx, operations, current_user)
+        applied = sum(1 for result in results if result["status"] == RESULT_APPLIED)
+        return jsonify({
+            "results": results,
+            "applied": applied,
+            "failed": len(results) - applied
+        }), 200
+    except Exception as e:
+        print(f"Error applying complaint batch: {e}")
+        return jsonify({"error": str(e)}), 400
+
 @complaint_routes.route('/api/complaints/<complaint_id>', methods=['PATCH'])
 @jwt_required()
 def update_complaint(complaint_id):
-    from app import mongo, twilio_client, TWILIO_PHONE_NUMBER
+    from app import mongo
     
     current_user_identity = get_jwt_identity()
     current_user = parse_identity(current_user_identity)
@@ -389,10 +697,8 @@ def update_complaint(complaint_id):
     data = request.get_json()  # Get the request data
     
     try:
-        complaint = mongo.db.complaints.find_one({"_id": ObjectId(complaint_id)})
-        
-        if not complaint:
-            return jsonify({"error": "Complaint not found"}), 404
+        complaint_oid = ObjectId(complaint_id)
+        expected_version = parse_expected_version(request.if_match, data.get('version'))
         
         # Update allowed fields
         updates = {}
@@ -409,55 +715,193 @@ def update_complaint(complaint_id):
         
         if updates:
             updates["updatedAt"] = datetime.now(timezone.utc).isoformat()
-            mongo.db.complaints.update_one(
-                {"_id": ObjectId(complaint_id)}, 
-                {"$set": updates}
-            )
             
-            # Send notification if status was changed
-            if 'status' in updates and twilio_client and TWILIO_PHONE_NUMBER:
-                try:
-                    # Get the complaint with victim contact info
-                    updated_complaint = mongo.db.complaints.find_one({"_id": ObjectId(complaint_id)})
-                    victim_phone = updated_complaint.get("complainantPhone")
+            def write_update(session):
+                # Apply the update and read back the result in one round-trip; the
+                # version filter makes a concurrent edit fail instead of being lost
+                updated = mongo.db.complaints.find_one_and_update(
+                    {"_id": complaint_oid, **version_filter(expected_version)},
+                    {"$set": updates, "$inc": {"version": 1}},
+                    projection=FULL_LISTING_PROJECTION,
+                    return_document=ReturnDocument.AFTER,
+                    session=session
+                )
+                # The analysis result carries the summary and explanation that are searched
+                if updated and 'analysisResult' in updates:
+                    mark_pending(mongo.db, [complaint_oid], session=session)
+                
+                # Queue a notification if status was changed
+                victim_phone = updated.get("complainantPhone") if updated else None
+                if 'status' in updates and victim_phone:
+                    # Get additional details for the message
+                    details = None
+                    if updates["status"] == "filed" and "firNumber" in updates:
+                        details = f"FIR Number: {updates['firNumber']}"
                     
-                    if victim_phone:
-                        # Get additional details for the message
-                        details = None
-                        if updates["status"] == "filed" and "firNumber" in updates:
-                            details = f"FIR Number: {updates['firNumber']}"
-                        
-                        notification_result = send_status_update_sms(
-                            twilio_client,
-                            TWILIO_PHONE_NUMBER,
-                            victim_phone,
-                            complaint_id,
-                            updates["status"],
-                            details
-                        )
-                        
-                        if notification_result["success"]:
-                            print(f"Status update SMS sent: {notification_result['sid']}")
-                            # Store notification history
-                            mongo.db.notifications.insert_one({
-                                "complaintId": complaint_id,
-                                "recipientPhone": victim_phone,
-                                "type": "status_update",
-                                "message": notification_result["message"],
-                                "status": "sent",
-                                "sentAt": datetime.now(timezone.utc).isoformat(),
-                                "twilioSid": notification_result.get("sid")
-                            })
-                        else:
-                            print(f"Failed to send status update SMS: {notification_result['error']}")
-                except Exception as e:
-                    print(f"Error sending status update notification: {str(e)}")
-        
-        # Get updated complaint to return
-        updated_complaint = mongo.db.complaints.find_one({"_id": ObjectId(complaint_id)})
+                    enqueue_notification(
+                        mongo.db,
+                        "status_update",
+                        victim_phone,
+                        complaint_id,
+                        {"status": updates["status"], "details": details},
+                        session=session
+                    )
+                return updated
+            
+            updated_complaint = run_in_transaction(mongo.cx, write_update)
+        else:
+            updated_complaint = mongo.db.complaints.find_one(
+                {"_id": complaint_oid, **version_filter(expected_version)},
+                FULL_LISTING_PROJECTION
+            )
+        
+        if not updated_complaint:
+            # Only reached on failure: tell a missing complaint from a stale version
+            current = mongo.db.complaints.find_one({"_id": complaint_oid}, {"version": 1})
+            if not current:
+                return jsonify({"error": "Complaint not found"}), 404
+            response = jsonify({
+                "error": "Complaint was modified by someone else; reload it and try again",
+                "currentVersion": current.get("version", 0)
+            })
+            response.set_etag(version_etag(current.get("version")))
+            return response, 409
+        
+        if 'analysisResult' in updates:
+            index_complaint(mongo.db, updated_complaint)
+        
         updated_complaint["id"] = str(updated_complaint.pop("_id"))
-        return jsonify(updated_complaint), 200
+        response = jsonify(updated_complaint)
+        response.set_etag(version_etag(updated_complaint.get("version")))
+        return response, 200
+    
+    except InvalidVersionError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@complaint_routes.route('/api/complaints/<complaint_id>/archive', methods=['POST'])
+@jwt_required()
+def archive_complaint(complaint_id):
+    from app import mongo
+    
+    current_user = parse_identity(get_jwt_identity())
+    
+    if not current_user:
+        return jsonify({"error": "Invalid user identity"}), 400
+    
+    if current_user["role"] != "police":
+        return jsonify({"error": "Only police officers can archive complaints"}), 403
+    
+    try:
+        complaint_oid = ObjectId(complaint_id)
+        expected_version = parse_expected_version(request.if_match, None)
+        now = datetime.now(timezone.utc).isoformat()
+        
+        # Marked first so a crash before `remove_complaint` is repaired by
+        # `sync-search-index`; a marker on a complaint left unarchived is harmless
+        mark_pending(mongo.db, [complaint_oid])
+        
+        # Archived complaints leave the listings and reach syncing clients as
+        # tombstones; the document itself is kept
+        archived = mongo.db.complaints.find_one_and_update(
+            {"_id": complaint_oid, "archived": {"$ne": True}, **version_filter(expected_version)},
+            {
+                "$set": {
+                    "archived": True,
+                    "archivedAt": now,
+                    "archivedBy": {"id": current_user["id"], "name": current_user["name"]},
+                    "updatedAt": now
+                },
+                "$inc": {"version": 1}
+            },
+            projection={"archived": 1, "archivedAt": 1, "version": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        
+        if not archived:
+            current = mongo.db.complaints.find_one(
+                {"_id": complaint_oid}, {"archived": 1, "archivedAt": 1, "version": 1}
+            )
+            if not current:
+                return jsonify({"error": "Complaint not found"}), 404
+            if not current.get("archived"):
+                response = jsonify({
+                    "error": "Complaint was modified by someone else; reload it and try again",
+                    "currentVersion": current.get("version", 0)
+                })
+                response.set_etag(version_etag(current.get("version")))
+                return response, 409
+            # Already archived: archiving again is a no-op
+            archived = current
+        
+        remove_complaint(mongo.db, complaint_id)
+        
+        archived["id"] = str(archived.pop("_id"))
+        response = jsonify(archived)
+        response.set_etag(version_etag(archived.get("version")))
+        return response, 200
+    
+    except InvalidVersionError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@complaint_routes.route('/api/complaints/<complaint_id>/proof', methods=['GET'])
+@jwt_required()
+def get_complaint_proof(complaint_id):
+    from app import mongo
+    
+    current_user = parse_identity(get_jwt_identity())
+    
+    if not current_user:
+        return jsonify({"error": "Invalid user identity"}), 400
+    
+    try:
+        complaint = mongo.db.complaints.find_one({"_id": ObjectId(complaint_id)})
+        
+        if not complaint:
+            return jsonify({"error": "Complaint not found"}), 404
+        
+        # Victims can only check their own complaints
+        if current_user["role"] == "victim" and complaint.get("complainantId") != current_user["id"]:
+            return jsonify({"error": "Unauthorized access"}), 403
+        
+        # Re-hashes the stored complaint and returns the Merkle path to its batch root
+        proof = inclusion_proof(mongo.db, complaint, get_anchor_backend())
+        if proof is None:
+            return jsonify({"error": "No integrity record for this complaint yet"}), 404
+        
+        return jsonify(proof), 200
+    except Exception as e:
+        print(f"Error building integrity proof: {e}")
+        return jsonify({"error": str(e)}), 400
+
+@complaint_routes.route('/api/complaints/<complaint_id>/duplicates', methods=['GET'])
+@jwt_required()
+def get_complaint_duplicates(complaint_id):
+    from app import mongo
+    
+    current_user = parse_identity(get_jwt_identity())
+    
+    if not current_user:
+        return jsonify({"error": "Invalid user identity"}), 400
     
+    # Only police may see other people's complaints
+    if current_user["role"] != "police":
+        return jsonify({"error": "Only police officers can view possible duplicates"}), 403
+    
+    try:
+        complaint = mongo.db.complaints.find_one(
+            {"_id": ObjectId(complaint_id)}, {field: 1 for field in SIGNATURE_FIELDS}
+        )
+        
+        if not complaint:
+            return jsonify({"error": "Complaint not found"}), 404
+        
+        # Kept off the detail read: this is one indexed $in over every band key
+        possible_duplicates = find_duplicates(mongo.db, complaint, exclude_id=complaint["_id"])
+        return jsonify({"possibleDuplicates": possible_duplicates}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -489,14 +933,16 @@ def get_complaint_notes(complaint_id):
         if current_user["role"] == "victim":
             query["visibility"] = "public"
         
-        notes = list(mongo.db.case_notes.find(query).sort("created_at", -1))
+        # Decoded straight from raw batches with `_id` already renamed to `id`
+        notes = decode_batches(mongo.db.case_notes.find_raw_batches(query).sort("created_at", -1))
         
-        # Convert ObjectId to string
-        for note in notes:
-            if "_id" in note:
-                note["id"] = str(note.pop("_id"))
-        
-        return jsonify(notes), 200
+        # Notes are never edited, so their IDs identify the list
+        etag = documents_etag(notes, current_user["role"])
+        response = not_modified(etag)
+        if response is None:
+            response = json_response(notes)
+            response.set_etag(etag, weak=True)
+        return response
     
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -534,6 +980,8 @@ def add_complaint_note(complaint_id):
         if not complaint:
             return jsonify({"error": "Complaint not found"}), 404
         
+        now = datetime.now(timezone.utc).isoformat()
+        
         # Create note
         note = {
             "complaint_id": complaint_id,
@@ -542,18 +990,26 @@ def add_complaint_note(complaint_id):
             "content": content,
             "stage": stage,
             "visibility": visibility,
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": now
         }
         
-        result = mongo.db.case_notes.insert_one(note)
-        note_id = str(result.inserted_id)
-        
-        # Update complaint with the latest stage if provided
+        # Every note changes what the complaint shows, so it bumps the version and
+        # updatedAt (picked up by delta sync and ETags); the stage too if provided
+        changes = {"updatedAt": now}
         if stage:
+            changes["currentStage"] = stage
+        
+        def write_note(session):
+            result = mongo.db.case_notes.insert_one(note, session=session)
             mongo.db.complaints.update_one(
                 {"_id": ObjectId(complaint_id)},
-                {"$set": {"currentStage": stage, "updatedAt": datetime.now(timezone.utc).isoformat()}}
+                {"$set": changes, "$inc": {"version": 1}},
+                session=session
             )
+            return result
+        
+        result = run_in_transaction(mongo.cx, write_note)
+        note_id = str(result.inserted_id)
             
         # Return success response with the created note
         note["id"] = note_id
@@ -1,62 +1,121 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson.objectid import ObjectId
+from routes.complaints import parse_identity
+from utils.reference_cache import ipc_sections_cache, legal_rights_cache, REFERENCE_CACHES, bump_reference_version
+from utils.ipc_search import ipc_search_index
+from utils.geo import station_directory
+from utils.http_cache import negotiate_encoding
 
 police_routes = Blueprint('police', __name__)
 
 @police_routes.route('/api/police/stations', methods=['GET'])
 def get_police_stations():
-    # Mock data for police stations
-    stations = [
-        {
-            "id": "1",
-            "name": "Central Police Station",
-            "address": "123 Main Street, City Center",
-            "phone": "+91 1234567890",
-            "location": {"lat": 19.0760, "lng": 72.8777}
-        },
-        {
-            "id": "2",
-            "name": "North Police Station",
-            "address": "456 North Avenue, North District",
-            "phone": "+91 2345678901",
-            "location": {"lat": 19.1136, "lng": 72.8697}
-        },
-        {
-            "id": "3",
-            "name": "South Police Station",
-            "address": "789 South Road, South District",
-            "phone": "+91 3456789012",
-            "location": {"lat": 19.0330, "lng": 72.8353}
-        }
-    ]
+    from app import mongo
     
+    stations = station_directory.get(mongo.db).stations
     return jsonify(stations), 200
 
+@police_routes.route('/api/police/stations/nearest', methods=['GET'])
+def get_nearest_police_stations():
+    from app import mongo
+    
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+    except KeyError:
+        return jsonify({"error": "Query parameters 'lat' and 'lng' are required"}), 400
+    except ValueError:
+        return jsonify({"error": "lat and lng must be numbers"}), 400
+    
+    if not -90 <= lat <= 90 or not -180 <= lng <= 180:
+        return jsonify({"error": "lat must be within [-90, 90] and lng within [-180, 180]"}), 400
+    
+    try:
+        k = max(1, min(int(request.args.get('k', 5)), 50))
+        radius = request.args.get('radius_km')
+        radius_km = float(radius) if radius else None
+    except ValueError:
+        return jsonify({"error": "k must be an integer and radius_km a number"}), 400
+    
+    if radius_km is not None and radius_km <= 0:
+        return jsonify({"error": "radius_km must be positive"}), 400
+    
+    matches = station_directory.get(mongo.db).nearest(lat, lng, k, radius_km)
+    
+    return jsonify([
+        dict(station, distanceKm=round(distance, 3)) for distance, station in matches
+    ]), 200
+
+def reference_data_response(cache):
+    """Serve a cached reference collection, answering If-None-Match with 304"""
+    from app import mongo
+    
+    snapshot = cache.get(mongo.db)
+    
+    # Each encoding is a different set of bytes with its own strong ETag, and is
+    # compressed once per snapshot rather than on every request
+    encoding = negotiate_encoding(len(snapshot.body))
+    body, etag = snapshot.variant(encoding)
+    
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype="application/json")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    
+    response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    # Clients must revalidate, which costs a 304 with no body when unchanged
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
 @police_routes.route('/api/police/ipc-sections', methods=['GET'])
 def get_ipc_sections():
+    return reference_data_response(ipc_sections_cache)
+
+@police_routes.route('/api/police/ipc-sections/search', methods=['GET'])
+def search_ipc_sections():
     from app import mongo
     
-    # Get IPC sections from database
-    sections = list(mongo.db.ipc_sections.find())
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), 50))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
     
-    # Convert ObjectId to string
-    for section in sections:
-        if "_id" in section:
-            section["id"] = str(section.pop("_id"))
+    # Re-index only the sections that changed since the cached snapshot moved
+    ipc_search_index.sync(ipc_sections_cache.get(mongo.db))
     
-    return jsonify(sections), 200
+    return jsonify({
+        "query": query,
+        "results": ipc_search_index.search(query, limit)
+    }), 200
 
 @police_routes.route('/api/police/legal-rights', methods=['GET'])
 def get_legal_rights():
+    return reference_data_response(legal_rights_cache)
+
+@police_routes.route('/api/police/reference-data/reload', methods=['POST'])
+@jwt_required()
+def reload_reference_data():
     from app import mongo
     
-    # Get legal rights from database
-    rights = list(mongo.db.legal_rights.find())
+    current_user = parse_identity(get_jwt_identity())
+    
+    if not current_user or current_user["role"] != "police":
+        return jsonify({"error": "Only police officers can reload reference data"}), 403
+    
+    data = request.get_json(silent=True) or {}
+    names = data.get("collections") or list(REFERENCE_CACHES)
     
-    # Convert ObjectId to string
-    for right in rights:
-        if "_id" in right:
-            right["id"] = str(right.pop("_id"))
+    unknown = [name for name in names if name not in REFERENCE_CACHES]
+    if unknown:
+        return jsonify({"error": f"Unknown reference collections: {', '.join(unknown)}"}), 400
     
-    return jsonify(rights), 200
+    versions = {name: bump_reference_version(mongo.db, name) for name in names}
+    return jsonify({"message": "Reference data reloaded", "versions": versions}), 200
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class RawBatchCursor:
+    """find_raw_batches() cursor over a mongomock cursor (mongomock has no raw batches)"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self.cursor = self.cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, count):
+        self.cursor = self.cursor.limit(count)
+        return self
+
+    def __iter__(self):
+        import bson
+        documents = [bson.encode(document) for document in self.cursor]
+        if documents:
+            yield b"".join(documents)
+
+
+@pytest.fixture
+def db():
+    mongomock = pytest.importorskip("mongomock")
+
+    def find_raw_batches(collection, filter=None, projection=None, **kwargs):
+        return RawBatchCursor(collection.find(filter, projection, **kwargs))
+
+    patch = pytest.MonkeyPatch()
+    patch.setattr(mongomock.Collection, "find_raw_batches", find_raw_batches, raising=False)
+    yield mongomock.MongoClient().saarthi
+    patch.undo()
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from utils.complaint_import import parse_row, RowError
+
+OFFICER = {"id": "64b000000000000000000001", "name": "Officer"}
+IMPORTED_AT = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _row(**fields):
+    row = {"text": "Chain snatched near the bus stand", "victim_phone": "+919876543210", "victim_name": "Ravi"}
+    row.update(fields)
+    return row
+
+
+def test_filed_at_with_offset_is_stored_in_utc():
+    complaint, _ = parse_row(_row(filed_at="2024-03-12T10:30:00+05:30"), OFFICER, IMPORTED_AT)
+
+    assert complaint["filedAt"] == "2024-03-12T05:00:00+00:00"
+
+
+def test_naive_filed_at_is_treated_as_utc():
+    complaint, _ = parse_row(_row(filed_at="2024-03-12T10:30:00"), OFFICER, IMPORTED_AT)
+
+    assert complaint["filedAt"] == "2024-03-12T10:30:00+00:00"
+
+
+def test_offset_timestamps_sort_in_time_order():
+    # 09:00 in India is before 05:00 UTC; as stored strings they must sort that way
+    india, _ = parse_row(_row(filed_at="2024-03-12T09:00:00+05:30"), OFFICER, IMPORTED_AT)
+    utc, _ = parse_row(_row(filed_at="2024-03-12T05:00:00+00:00"), OFFICER, IMPORTED_AT)
+
+    assert india["filedAt"] < utc["filedAt"]
+
+
+def test_invalid_filed_at_is_rejected():
+    with pytest.raises(RowError):
+        parse_row(_row(filed_at="12/03/2024"), OFFICER, IMPORTED_AT)
+
+
+def test_delta_sync_between_chunks_sees_later_chunks(db, monkeypatch):
+    import io
+    import json
+    from utils import db_utils, delta_sync
+    from utils.complaint_import import import_complaints
+    from utils.delta_sync import fetch_changes, sync_watermark
+
+    monkeypatch.setattr(db_utils, "_transactions_supported", False)
+    # No overlap, so only the updatedAt stamps decide what a poll sees
+    monkeypatch.setattr(delta_sync, "DELTA_SYNC_OVERLAP", timedelta(0))
+
+    rows = [_row(text=f"Phone stolen at stop {number}", victim_phone=f"+91987654321{number}") for number in range(3)]
+    upload = io.BytesIO("\n".join(json.dumps(row) for row in rows).encode("utf-8"))
+    events = import_complaints(db, upload, "ndjson", OFFICER, chunk_size=1)
+
+    watermark = sync_watermark(datetime.now(timezone.utc) - timedelta(minutes=1))
+    seen = []
+    for event in events:
+        if event["event"] == "progress":
+            # A client polling while the import is still running
+            changed, _, watermark, _ = fetch_changes(db.complaints, {}, {"text": 1}, watermark, 10)
+            seen.extend(complaint["text"] for complaint in changed)
+
+    assert sorted(seen) == sorted(row["text"] for row in rows)
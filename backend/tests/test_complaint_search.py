@@ -0,0 +1,52 @@
+import pytest
+
+from utils import db_utils
+from utils.complaint_search import (
+    DOCS_COLLECTION, PENDING_COLLECTION, POSTINGS_COLLECTION, STATS_COLLECTION, STATS_ID,
+    index_complaints, mark_pending, search, sync_pending
+)
+
+
+@pytest.fixture(autouse=True)
+def no_transactions(monkeypatch):
+    # mongomock has no sessions; run_in_transaction falls back to plain writes
+    monkeypatch.setattr(db_utils, "_transactions_supported", False)
+
+
+def _assert_stats_match_index(db):
+    stats = db[STATS_COLLECTION].find_one({"_id": STATS_ID})
+    docs = list(db[DOCS_COLLECTION].find())
+    assert stats["docCount"] == len(docs)
+    assert stats["totalLength"] == sum(doc["length"] for doc in docs)
+    indexed = {posting["complaintId"] for posting in db[POSTINGS_COLLECTION].find()}
+    assert indexed == {doc["_id"] for doc in docs}
+
+
+def test_index_update_clears_pending_marker(db):
+    complaint_id = db.complaints.insert_one({"text": "My phone was stolen at the market"}).inserted_id
+    mark_pending(db, [complaint_id])
+
+    index_complaints(db, [db.complaints.find_one({"_id": complaint_id})])
+
+    assert db[PENDING_COLLECTION].count_documents({}) == 0
+    _assert_stats_match_index(db)
+
+
+def test_sync_pending_repairs_interrupted_updates(db):
+    kept = db.complaints.insert_one({"text": "My phone was stolen at the market"}).inserted_id
+    archived = db.complaints.insert_one({"text": "Someone stole my bicycle"}).inserted_id
+    index_complaints(db, db.complaints.find())
+
+    # Writes whose index update never ran: a new complaint, an archive, a deletion
+    added = db.complaints.insert_one({"text": "A thief took my phone on the bus"}).inserted_id
+    db.complaints.update_one({"_id": archived}, {"$set": {"archived": True}})
+    db.complaints.delete_one({"_id": kept})
+    mark_pending(db, [added, archived, kept])
+
+    assert sync_pending(db, batch_size=2) == 3
+
+    assert db[PENDING_COLLECTION].count_documents({}) == 0
+    assert {doc["_id"] for doc in db[DOCS_COLLECTION].find()} == {added}
+    _assert_stats_match_index(db)
+    results, _ = search(db, "phone")
+    assert [complaint_id for complaint_id, _ in results] == [added]
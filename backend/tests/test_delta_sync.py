@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+
+from utils.delta_sync import fetch_changes, sync_watermark
+from utils.near_duplicates import SIGNATURE_FIELDS
+
+
+def _complaint(updated_at, **fields):
+    complaint = {
+        "text": "My phone was stolen", "status": "pending", "version": 1,
+        "updatedAt": updated_at.isoformat(), "minhash": [1, 2, 3], "lshBuckets": ["0:ab"]
+    }
+    complaint.update(fields)
+    return complaint
+
+
+def test_full_fields_delta_excludes_signatures(db):
+    from routes.complaints import FULL_LISTING_PROJECTION
+
+    now = datetime.now(timezone.utc)
+    db.complaints.insert_many([
+        _complaint(now),
+        _complaint(now, archived=True, archivedAt=now.isoformat(), version=2),
+    ])
+
+    changed, tombstones, watermark, has_more = fetch_changes(
+        db.complaints, {}, FULL_LISTING_PROJECTION, sync_watermark(now - timedelta(minutes=1)), 10
+    )
+
+    assert len(changed) == 1 and len(tombstones) == 1 and not has_more
+    assert changed[0]["text"] == "My phone was stolen"
+    assert changed[0]["version"] == 1 and changed[0]["updatedAt"]
+    assert not any(field in changed[0] for field in SIGNATURE_FIELDS)
+    assert tombstones[0]["version"] == 2
+
+
+def test_inclusion_projection_gets_sync_fields(db):
+    now = datetime.now(timezone.utc)
+    db.complaints.insert_one(_complaint(now))
+
+    changed, _, _, _ = fetch_changes(
+        db.complaints, {}, {"text": 1}, sync_watermark(now - timedelta(minutes=1)), 10
+    )
+
+    assert set(changed[0]) == {"id", "text", "updatedAt", "version"}
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from utils.geo import StationIndex, haversine_km
+
+
+def _stations(rng, count):
+    stations = [
+        {"name": f"Station {number}", "location": {"lat": rng.uniform(-80, 80), "lng": rng.uniform(-180, 180)}}
+        for number in range(count)
+    ]
+    # A cluster straddling the antimeridian
+    for number, lng in enumerate([179.95, -179.95, 179.5, -179.5, 178.0, -178.0]):
+        stations.append({"name": f"Dateline {number}", "location": {"lat": -17.5 + number * 0.1, "lng": lng}})
+    return stations
+
+
+def _brute_force(stations, lat, lng, k, radius_km=None):
+    distances = sorted(
+        (haversine_km(lat, lng, station["location"]["lat"], station["location"]["lng"]), station["name"])
+        for station in stations
+    )
+    if radius_km is not None:
+        distances = [item for item in distances if item[0] <= radius_km]
+    return distances[:k]
+
+
+def _names(results):
+    return [(round(distance, 6), station["name"]) for distance, station in results]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_nearest_matches_brute_force(seed):
+    rng = random.Random(seed)
+    stations = _stations(rng, 300)
+    index = StationIndex(stations)
+
+    for _ in range(50):
+        lat, lng, k = rng.uniform(-85, 85), rng.uniform(-180, 180), rng.randint(1, 8)
+        expected = [(round(distance, 6), name) for distance, name in _brute_force(stations, lat, lng, k)]
+        assert _names(index.nearest(lat, lng, k)) == expected
+
+
+@pytest.mark.parametrize("lng", [179.99, -179.99, 180.0, -180.0])
+def test_nearest_across_the_antimeridian(lng):
+    stations = _stations(random.Random(1), 50)
+    index = StationIndex(stations)
+
+    results = index.nearest(-17.3, lng, k=4)
+
+    expected = [(round(distance, 6), name) for distance, name in _brute_force(stations, -17.3, lng, 4)]
+    assert _names(results) == expected
+    # Both sides of the dateline are found, not only the side of the query
+    assert {station["location"]["lng"] > 0 for _, station in results} == {True, False}
+
+
+def test_radius_limits_results():
+    stations = _stations(random.Random(2), 200)
+    index = StationIndex(stations)
+
+    results = index.nearest(-17.5, 179.9, k=10, radius_km=100)
+
+    expected = [(round(distance, 6), name) for distance, name in _brute_force(stations, -17.5, 179.9, 10, 100)]
+    assert _names(results) == expected
+    assert all(distance <= 100 for distance, _ in results)
+
+
+def test_stations_without_location_are_skipped():
+    index = StationIndex([{"name": "No location"}, {"name": "Bad", "location": {"lat": "x", "lng": 1}},
+                          {"name": "Good", "location": {"lat": 12.97, "lng": 77.59}}])
+
+    assert len(index) == 1
+    assert index.nearest(12.9, 77.6, k=0) == []
+    assert [station["name"] for _, station in index.nearest(12.9, 77.6, k=3)] == ["Good"]
@@ -0,0 +1,47 @@
+import gzip
+
+from flask import Flask, Response
+
+from utils.http_cache import init_http_cache
+from utils.reference_cache import CachedReferenceData
+
+BODY = b'[' + b",".join(b'{"section":"%d","title":"Theft"}' % number for number in range(200)) + b']'
+
+
+def _client(etag):
+    app = Flask(__name__)
+    init_http_cache(app)
+
+    @app.route("/api/police/ipc-sections")
+    def body():
+        response = Response(BODY, mimetype="application/json")
+        response.set_etag(etag)
+        return response
+
+    return app.test_client()
+
+
+def test_compressing_weakens_a_strong_etag():
+    response = _client("abc").get("/api/police/ipc-sections", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == 'W/"abc"'
+    assert gzip.decompress(response.data) == BODY
+
+
+def test_uncompressed_response_keeps_its_strong_etag():
+    response = _client("abc").get("/api/police/ipc-sections", headers={"Accept-Encoding": "identity"})
+
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] == '"abc"'
+
+
+def test_reference_variants_are_compressed_once_with_their_own_etag():
+    snapshot = CachedReferenceData((1, 200, None), [], BODY)
+
+    body, etag = snapshot.variant("gzip")
+
+    assert gzip.decompress(body) == BODY
+    assert etag == snapshot.etag + "-gzip"
+    assert snapshot.variant("gzip")[0] is body
+    assert snapshot.variant(None) == (BODY, snapshot.etag)
@@ -0,0 +1,140 @@
+import sys
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, jsonify
+from pymongo.errors import DuplicateKeyError
+
+from utils import idempotency
+from utils.idempotency import (
+    IDEMPOTENCY_COLLECTION, IDEMPOTENCY_HEADER, IDEMPOTENCY_LOCK, REPLAYED_HEADER, STATUS_IN_PROGRESS,
+    _claim, idempotent
+)
+
+USER_ID = "5f0000000000000000000001"
+
+
+@pytest.fixture
+def collection(db):
+    collection = db[IDEMPOTENCY_COLLECTION]
+    collection.create_index([("userId", 1), ("key", 1)], unique=True)
+    return collection
+
+
+@pytest.fixture
+def client(db, collection, monkeypatch):
+    # The decorator imports `mongo` from app and reads the caller from the JWT
+    monkeypatch.setitem(sys.modules, "app", SimpleNamespace(mongo=SimpleNamespace(db=db)))
+    monkeypatch.setattr(idempotency, "get_jwt_identity", lambda: f"{USER_ID}:victim")
+
+    app = Flask(__name__)
+    app.calls = []
+
+    @app.route("/complaints", methods=["POST"])
+    @idempotent
+    def create():
+        app.calls.append(1)
+        return jsonify({"complaintId": len(app.calls)}), 201
+
+    @app.route("/failing", methods=["POST"])
+    @idempotent
+    def failing():
+        app.calls.append(1)
+        return jsonify({"error": "database unavailable"}), 503
+
+    test_client = app.test_client()
+    test_client.calls = app.calls
+    return test_client
+
+
+def _post(client, path="/complaints", body=None, key="retry-key"):
+    return client.post(path, json=body or {"text": "My phone was stolen"}, headers={IDEMPOTENCY_HEADER: key})
+
+
+def test_retry_replays_stored_response(client):
+    first = _post(client)
+    retry = _post(client)
+
+    assert len(client.calls) == 1
+    assert first.status_code == retry.status_code == 201
+    assert retry.get_json() == first.get_json()
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert REPLAYED_HEADER not in first.headers
+
+
+def test_requests_without_key_always_run(client):
+    client.post("/complaints", json={"text": "a"})
+    client.post("/complaints", json={"text": "a"})
+
+    assert len(client.calls) == 2
+
+
+def test_key_reused_for_different_body_is_rejected(client):
+    _post(client, body={"text": "My phone was stolen"})
+    response = _post(client, body={"text": "My bicycle was stolen"})
+
+    assert response.status_code == 422
+    assert len(client.calls) == 1
+
+
+def test_retry_while_in_progress_gets_409(client, collection):
+    _post(client)
+    collection.update_one({}, {"$set": {"status": STATUS_IN_PROGRESS, "lockedAt": datetime.now(timezone.utc)}})
+
+    response = _post(client)
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert len(client.calls) == 1
+
+
+def test_stale_lock_is_taken_over(client, collection):
+    _post(client)
+    # A worker died mid-request long enough ago for its lock to lapse
+    stale = datetime.now(timezone.utc) - IDEMPOTENCY_LOCK - timedelta(seconds=1)
+    collection.update_one({}, {"$set": {"status": STATUS_IN_PROGRESS, "lockedAt": stale}, "$unset": {"response": ""}})
+
+    response = _post(client)
+
+    assert response.status_code == 201
+    assert len(client.calls) == 2
+    assert collection.find_one()["status"] == "completed"
+
+
+def test_server_error_releases_key(client, collection):
+    assert _post(client, path="/failing").status_code == 503
+    assert collection.count_documents({}) == 0
+
+    assert _post(client, path="/failing").status_code == 503
+    assert len(client.calls) == 2
+
+
+class VanishingCollection:
+    """Reports a duplicate on the first insert, but the record is gone by the time it is read"""
+
+    def __init__(self, collection, duplicates=1):
+        self.collection = collection
+        self.duplicates = duplicates
+
+    def insert_one(self, document):
+        if self.duplicates:
+            self.duplicates -= 1
+            raise DuplicateKeyError("E11000 duplicate key error")
+        return self.collection.insert_one(document)
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+def test_claim_retries_when_record_vanishes(collection):
+    assert _claim(VanishingCollection(collection), USER_ID, "retry-key", "abc") is None
+    assert collection.find_one()["fingerprint"] == "abc"
+
+
+def test_claim_reports_in_progress_when_record_keeps_vanishing(collection):
+    existing = _claim(VanishingCollection(collection, duplicates=10), USER_ID, "retry-key", "abc")
+
+    # Treated as a running request (409), not as a different request (422)
+    assert existing == {"fingerprint": "abc", "status": STATUS_IN_PROGRESS}
+    assert collection.count_documents({}) == 0
@@ -0,0 +1,104 @@
+import pytest
+from bson import ObjectId
+
+from utils import db_utils
+from utils.integrity import (
+    SqliteAnchorBackend, anchor_pending, complaint_hash, inclusion_proof, keccak256,
+    merkle_levels, merkle_proof, record_complaints, relink_complaints, verify_all, verify_proof
+)
+
+
+def _hashes(count):
+    return ["0x" + keccak256(str(number).encode("ascii")).hex() for number in range(count)]
+
+
+def _root(levels):
+    return "0x" + levels[-1][0].hex()
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 7, 8, 9])
+def test_every_leaf_proof_round_trips(count):
+    hashes = _hashes(count)
+    levels = merkle_levels(hashes)
+
+    for index, leaf_hash in enumerate(hashes):
+        assert verify_proof(leaf_hash, merkle_proof(levels, index), _root(levels))
+
+
+def test_odd_leaf_is_carried_up_unchanged():
+    levels = merkle_levels(_hashes(3))
+
+    assert [len(level) for level in levels] == [3, 2, 1]
+    assert levels[1][1] == levels[0][2]
+    # The carried leaf has no sibling on the first level
+    assert len(merkle_proof(levels, 2)) == 1
+
+
+def test_tampered_leaf_proof_or_root_fails():
+    hashes = _hashes(5)
+    levels = merkle_levels(hashes)
+    proof = merkle_proof(levels, 1)
+    root = _root(levels)
+
+    assert not verify_proof(hashes[2], proof, root)
+    assert not verify_proof(hashes[1], proof, _root(merkle_levels(_hashes(4))))
+    flipped = [dict(step, position="left" if step["position"] == "right" else "right") for step in proof]
+    assert not verify_proof(hashes[1], flipped, root)
+    assert not verify_proof(hashes[1], [{"hash": "not hex"}], root)
+
+
+@pytest.fixture
+def anchored(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(db_utils, "_transactions_supported", False)
+    complaints = [
+        {"_id": ObjectId(), "text": f"Complaint {number}", "complainantId": "pre-1",
+         "complainantName": "Ravi", "complainantPhone": "+919876543210", "filedAt": "2024-06-01T10:00:00+00:00"}
+        for number in range(3)
+    ]
+    db.complaints.insert_many(complaints)
+    record_complaints(db, complaints)
+    backend = SqliteAnchorBackend(str(tmp_path / "anchors.sqlite3"))
+    assert anchor_pending(db, db.client, backend, batch_size=2) == {"batches": 2, "leaves": 3}
+    return db, backend, complaints
+
+
+def test_anchored_complaint_proof_verifies(anchored):
+    db, backend, complaints = anchored
+
+    for complaint in complaints:
+        proof = inclusion_proof(db, complaint, backend)
+        assert proof["intact"] and proof["verified"] and proof["anchorConfirmed"]
+        assert proof["hash"] == complaint_hash(complaint)
+
+    report = verify_all(db, backend)
+    assert report["complaints"] == 3 and report["batches"] == 2
+    assert not report["altered"] and not report["badRoots"] and not report["unanchored"]
+
+
+def test_edited_complaint_is_reported_altered(anchored):
+    db, backend, complaints = anchored
+    db.complaints.update_one({"_id": complaints[0]["_id"]}, {"$set": {"text": "Rewritten"}})
+
+    proof = inclusion_proof(db, db.complaints.find_one({"_id": complaints[0]["_id"]}), backend)
+
+    assert not proof["intact"] and proof["verified"]
+    assert verify_all(db, backend)["altered"] == [str(complaints[0]["_id"])]
+
+
+def test_victim_promotion_keeps_complaints_intact(anchored):
+    db, backend, complaints = anchored
+    relink_complaints(db, db.complaints.find(), "victim-1")
+    db.complaints.update_many({}, {"$set": {"complainantId": "victim-1"}})
+
+    complaint = db.complaints.find_one({"_id": complaints[0]["_id"]})
+    proof = inclusion_proof(db, complaint, backend)
+    assert proof["intact"] and proof["status"] == "pending"
+    assert proof["previous"][0]["intact"] and proof["previous"][0]["verified"]
+    assert proof["previous"][0]["complainantId"] == "pre-1"
+
+    report = verify_all(db, backend)
+    assert not report["altered"] and not report["missing"] and not report["badRoots"]
+
+    # The re-hashed leaves go into a new batch like any other pending leaf
+    assert anchor_pending(db, db.client, backend) == {"batches": 1, "leaves": 3}
+    assert inclusion_proof(db, complaint, backend)["verified"]
@@ -0,0 +1,56 @@
+from utils.near_duplicates import (
+    BANDS, NUM_PERM, estimate_similarity, find_duplicates, lsh_buckets, minhash_signature, signature_fields
+)
+
+REPORT = ("Two men on a motorcycle snatched my gold chain near the bus stand on MG Road "
+          "at around 8 pm yesterday and drove away towards the railway station")
+# The same incident reported again by police, a few words changed
+RETOLD = ("Two men on a motorcycle snatched her gold chain near the bus stand on MG Road "
+          "at around 8 pm yesterday and drove off towards the railway station")
+UNRELATED = ("My landlord refuses to return the security deposit for the flat I vacated "
+             "last month and threatens me when I ask for it")
+
+
+def _complaint(text, **fields):
+    return dict(signature_fields(text, "en"), text=text, status="pending", **fields)
+
+
+def test_signature_shape_and_identical_texts():
+    signature = minhash_signature(REPORT, "en")
+
+    assert len(signature) == NUM_PERM
+    assert len(lsh_buckets(signature)) == BANDS
+    assert minhash_signature(REPORT, "en") == signature
+    assert estimate_similarity(signature, signature) == 1.0
+
+
+def test_text_without_tokens_has_no_signature():
+    assert signature_fields("", "en") == {}
+    assert minhash_signature("the and of", "en") is None
+
+
+def test_retold_report_is_similar_and_unrelated_is_not():
+    report = minhash_signature(REPORT, "en")
+
+    assert estimate_similarity(report, minhash_signature(RETOLD, "en")) >= 0.5
+    assert estimate_similarity(report, minhash_signature(UNRELATED, "en")) < 0.2
+    assert set(lsh_buckets(report)) & set(lsh_buckets(minhash_signature(RETOLD, "en")))
+
+
+def test_find_duplicates_finds_similar_and_skips_unrelated(db):
+    original = db.complaints.insert_one(_complaint(REPORT)).inserted_id
+    db.complaints.insert_one(_complaint(UNRELATED))
+
+    duplicates = find_duplicates(db, _complaint(RETOLD))
+
+    assert [duplicate["id"] for duplicate in duplicates] == [str(original)]
+    assert duplicates[0]["similarity"] >= 0.5
+    assert "minhash" not in duplicates[0]
+    assert find_duplicates(db, _complaint("Someone hacked my email account and sent messages to my contacts")) == []
+
+
+def test_find_duplicates_skips_itself_and_archived(db):
+    stored = db.complaints.insert_one(_complaint(REPORT)).inserted_id
+    db.complaints.insert_one(_complaint(RETOLD, archived=True))
+
+    assert find_duplicates(db, db.complaints.find_one({"_id": stored}), exclude_id=stored) == []
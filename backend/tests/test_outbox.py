@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+
+from utils import outbox
+from utils.fake_twilio import FakeTwilioClient
+from utils.outbox import (
+    OUTBOX_COLLECTION, STATUS_DEAD, STATUS_LEASE_LOST, STATUS_PENDING, STATUS_PROCESSING, STATUS_SENT,
+    backoff_delay, claim_next, enqueue_notification, process_entry, run_worker
+)
+
+FROM = "+15550000000"
+
+
+def _enqueue(db):
+    return enqueue_notification(db, "status_update", "+919876543210", "64b0000000000000000000aa", {"status": "filed"})
+
+
+def _expire_lease(db, outbox_id):
+    db[OUTBOX_COLLECTION].update_one(
+        {"_id": outbox_id}, {"$set": {"nextAttemptAt": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+    )
+
+
+def test_backoff_grows_exponentially_and_is_capped():
+    for attempts, ceiling in [(1, 5), (2, 10), (3, 20), (20, 900)]:
+        for _ in range(20):
+            assert ceiling * 0.5 <= backoff_delay(attempts, base_delay=5, max_delay=900) <= ceiling
+
+
+def test_failed_send_is_retried_after_backoff_then_sent(db):
+    outbox_id = _enqueue(db)
+    client = FakeTwilioClient(fail_first=1)
+
+    assert process_entry(db, claim_next(db), client, FROM, base_delay=60) == STATUS_PENDING
+    entry = db[OUTBOX_COLLECTION].find_one({"_id": outbox_id})
+    assert entry["attempts"] == 1 and "leaseToken" not in entry
+    retry_at = entry["nextAttemptAt"].replace(tzinfo=timezone.utc)
+    assert retry_at >= datetime.now(timezone.utc) + timedelta(seconds=25)
+    # Not due yet
+    assert claim_next(db) is None
+
+    _expire_lease(db, outbox_id)
+    assert process_entry(db, claim_next(db), client, FROM) == STATUS_SENT
+    assert db[OUTBOX_COLLECTION].find_one({"_id": outbox_id})["attempts"] == 2
+    assert len(client.sent) == 1
+    assert db.notifications.find_one({"outboxId": outbox_id})["status"] == "sent"
+
+
+def test_entry_is_dead_lettered_after_max_attempts(db):
+    outbox_id = _enqueue(db)
+    client = FakeTwilioClient(fail_first=10)
+
+    counts = run_worker(db, client, FROM, once=True, max_attempts=3, base_delay=0)
+
+    assert counts[STATUS_PENDING] == 2 and counts[STATUS_DEAD] == 1
+    entry = db[OUTBOX_COLLECTION].find_one({"_id": outbox_id})
+    assert entry["status"] == STATUS_DEAD and entry["attempts"] == 3
+    assert db.notifications.find_one({"outboxId": outbox_id})["status"] == "failed"
+    assert client.sent == []
+
+
+def test_worker_whose_lease_was_taken_over_does_not_send(db):
+    outbox_id = _enqueue(db)
+    stale = claim_next(db)
+    _expire_lease(db, outbox_id)
+    current = claim_next(db)
+    client = FakeTwilioClient()
+
+    assert process_entry(db, stale, client, FROM) == STATUS_LEASE_LOST
+    assert client.sent == []
+    assert process_entry(db, current, client, FROM) == STATUS_SENT
+    assert len(client.sent) == 1
+
+
+def test_outcome_of_a_taken_over_entry_is_not_overwritten(db, monkeypatch):
+    outbox_id = _enqueue(db)
+    stale = claim_next(db)
+    original_deliver = outbox.deliver
+
+    def slow_deliver(entry, twilio_client, from_number):
+        # The lease runs out mid-send and another worker claims the entry
+        _expire_lease(db, outbox_id)
+        claim_next(db)
+        return original_deliver(entry, twilio_client, from_number)
+
+    monkeypatch.setattr(outbox, "deliver", slow_deliver)
+
+    assert process_entry(db, stale, FakeTwilioClient(), FROM) == STATUS_LEASE_LOST
+    entry = db[OUTBOX_COLLECTION].find_one({"_id": outbox_id})
+    assert entry["status"] == STATUS_PROCESSING and entry["leaseToken"] != stale["leaseToken"]
+    assert db.notifications.find_one({"outboxId": outbox_id}) is None
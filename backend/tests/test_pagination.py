@@ -0,0 +1,57 @@
+import pytest
+from bson import ObjectId
+
+from utils.pagination import (
+    InvalidCursorError, decode_cursor, encode_cursor, fetch_page, keyset_filter, parse_limit
+)
+
+
+def test_cursor_round_trips_without_padding():
+    object_id = ObjectId()
+
+    cursor = encode_cursor({"_id": object_id, "filedAt": "2024-06-01T10:00:00+00:00"}, "filedAt")
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("2024-06-01T10:00:00+00:00", object_id)
+    assert decode_cursor(encode_cursor({"id": str(object_id)}, "filedAt")) == (None, object_id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "eyJ2IjoxfQ", "eyJ2IjoxLCJpZCI6Inh5eiJ9", "W10", "ünïcode"])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        keyset_filter(cursor, "filedAt")
+
+
+@pytest.mark.parametrize("raw, expected", [(None, 50), ("", 50), ("10", 10), ("0", 1), ("-5", 1), ("1000", 200)])
+def test_parse_limit_clamps(raw, expected):
+    assert parse_limit(raw) == expected
+
+
+def test_parse_limit_rejects_non_integers():
+    with pytest.raises(InvalidCursorError):
+        parse_limit("ten")
+
+
+def test_pages_cover_every_document_once_with_nulls_last(db):
+    values = ["2024-01-03", "2024-01-01", None, "2024-01-02", "2024-01-02", None, "2024-01-03", "2024-01-01", None]
+    for value in values:
+        document = {"status": "pending"}
+        if value is not None:
+            document["filedAt"] = value
+        db.complaints.insert_one(document)
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = fetch_page(db.complaints, {"status": "pending"}, None, "filedAt", 2, cursor)
+        assert len(page) <= 2
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    assert len({document["id"] for document in seen}) == len(values)
+    expected = sorted(
+        db.complaints.find(),
+        key=lambda document: (document.get("filedAt") is not None, document.get("filedAt") or "", document["_id"]),
+        reverse=True
+    )
+    assert [document["id"] for document in seen] == [str(document["_id"]) for document in expected]
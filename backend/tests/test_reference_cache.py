@@ -0,0 +1,118 @@
+import pytest
+from flask import Flask
+from pymongo.errors import AutoReconnect, OperationFailure
+
+from utils.json_utils import select_json_provider
+from utils.reference_cache import ReferenceDataCache, bump_reference_version
+
+
+class FakeChangeStream:
+    """Change stream handing out the events queued on its cache"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.resume_token = {"_data": len(cache.events)}
+
+    def try_next(self):
+        if self.cache.failure:
+            failure, self.cache.failure = self.cache.failure, None
+            raise failure
+        if not self.cache.events:
+            return None
+        event = self.cache.events.pop(0)
+        self.resume_token = {"_data": event}
+        return event
+
+    def close(self):
+        pass
+
+
+class WatchedCache(ReferenceDataCache):
+    """mongomock has no change streams; writes are reported through `events`"""
+
+    def __init__(self, collection_name, open_error=None):
+        super().__init__(collection_name, check_interval=0)
+        self.events, self.failure, self.open_error = [], None, open_error
+        self.opened_with = []
+
+    def _open_stream(self, db):
+        self.opened_with.append(self._resume_token)
+        if self.open_error:
+            raise self.open_error
+        return FakeChangeStream(self)
+
+
+def _app():
+    app = Flask(__name__)
+    app.json = select_json_provider()(app)
+    return app
+
+
+@pytest.fixture
+def ipc_sections(db):
+    db.ipc_sections.insert_many([{"section": "379", "title": "Theft"}, {"section": "302", "title": "Murder"}])
+    return db
+
+
+def test_steady_state_checks_do_not_read_the_collection(ipc_sections, monkeypatch):
+    cache = WatchedCache("ipc_sections")
+    with _app().app_context():
+        first = cache.get(ipc_sections)
+        monkeypatch.setattr(type(ipc_sections.ipc_sections), "find_raw_batches",
+                            lambda *args, **kwargs: pytest.fail("collection was read again"))
+        assert cache.get(ipc_sections) is first
+        assert cache.get(ipc_sections) is first
+
+
+def test_in_place_edit_reported_by_change_stream_reloads(ipc_sections):
+    cache = WatchedCache("ipc_sections")
+    with _app().app_context():
+        first = cache.get(ipc_sections)
+
+        # Edited in place, as from the mongo shell: same count, same _ids
+        ipc_sections.ipc_sections.update_one({"section": "379"}, {"$set": {"title": "Theft (amended)"}})
+        cache.events.append("update")
+        edited = cache.get(ipc_sections)
+
+        assert edited is not first
+        assert edited.etag != first.etag
+        assert {"Theft (amended)", "Murder"} == {section["title"] for section in edited.documents}
+
+
+def test_inserts_are_picked_up_without_change_streams(ipc_sections):
+    cache = WatchedCache("ipc_sections", open_error=OperationFailure("not a replica set", code=40573))
+    with _app().app_context():
+        first = cache.get(ipc_sections)
+        assert cache.get(ipc_sections) is first
+        assert len(cache.opened_with) == 1
+
+        ipc_sections.ipc_sections.insert_one({"section": "420", "title": "Cheating"})
+        assert len(cache.get(ipc_sections).documents) == 3
+
+
+def test_transient_stream_failure_resumes_instead_of_disabling(ipc_sections):
+    cache = WatchedCache("ipc_sections")
+    with _app().app_context():
+        cache.get(ipc_sections)
+        cache.events.append("update")
+        cache.get(ipc_sections)
+        token = cache._resume_token
+
+        cache.failure = AutoReconnect("connection reset")
+        snapshot = cache.get(ipc_sections)
+        assert cache._watch_supported
+
+        # The edit made while the stream was down is reported once it resumes
+        cache.events.append("update")
+        assert cache.get(ipc_sections) is not snapshot
+        assert cache.opened_with == [None, token]
+
+
+def test_version_bump_still_reloads(db):
+    db.legal_rights.insert_one({"title": "Right to free legal aid"})
+    cache = WatchedCache("legal_rights")
+
+    with _app().app_context():
+        first = cache.get(db)
+        bump_reference_version(db, "legal_rights")
+        assert cache.get(db) is not first
@@ -0,0 +1,154 @@
+"""
+Process-pool execution for bulk complaint analysis
+
+BM25 scoring is CPU-bound, so a batch of complaints is fanned out across a
+pool of worker processes (ANALYSIS_POOL_SIZE, by default one per core up to
+MAX_DEFAULT_POOL_SIZE). Each pool process builds its own classifier once,
+from the section documents passed to its initializer, and results are
+yielded in input order as soon as they are ready. A failure on one item is
+reported for that item only; a pool process dying takes down the pool, whose
+unfinished items are retried once on a fresh one.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.classifier import ComplaintClassifier
+
+MAX_BATCH_ITEMS = 10000
+
+# Processes per pool. Every web worker owns a pool, so the default is capped
+# rather than one per core.
+ANALYSIS_POOL_SIZE = int(os.getenv("ANALYSIS_POOL_SIZE", "0"))
+MAX_DEFAULT_POOL_SIZE = 4
+# Runs of a batch's unfinished items before they are failed: the first, plus
+# one on a fresh pool after a pool process died
+ANALYSIS_POOL_ATTEMPTS = 2
+
+# Classifier owned by a pool process, built by _init_worker
+_worker_classifier = None
+
+
+def _init_worker(sections):
+    global _worker_classifier
+    _worker_classifier = ComplaintClassifier(sections)
+
+
+def _classify_item(item):
+    """Runs in a pool process; never raises so one bad item cannot sink the batch"""
+    index, text, language = item
+    try:
+        return {"index": index, "result": _worker_classifier.classify(text, language)}
+    except Exception as e:
+        return {"index": index, "error": str(e)}
+
+
+def validate_items(items):
+    """
+    Check the request payload and normalise it to (index, text, language) tuples
+
+    Returns:
+        tuple: (list of valid work items, list of per-item error results)
+    """
+    work, errors = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({"index": index, "error": "Each item must be an object with text and language"})
+            continue
+        text, language = item.get("text"), item.get("language")
+        if not text or not language:
+            errors.append({"index": index, "error": "Text and language are required"})
+            continue
+        work.append((index, text, language))
+    return work, errors
+
+
+class BatchAnalyzer:
+    """Owns a process pool tied to one version of the IPC section corpus"""
+
+    def __init__(self, pool_size=None):
+        self.pool_size = pool_size or ANALYSIS_POOL_SIZE or min(os.cpu_count() or 1, MAX_DEFAULT_POOL_SIZE)
+        self._executor = None
+        self._etag = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self, snapshot, sections):
+        with self._lock:
+            if self._executor is None or self._etag != snapshot.etag:
+                if self._executor is not None:
+                    # Let in-flight batches on the old corpus finish on their own
+                    self._executor.shutdown(wait=False)
+                # spawn, not fork: the parent holds MongoDB sockets and threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.pool_size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(sections,)
+                )
+                self._etag = snapshot.etag
+                print(f"Analysis pool started with {self.pool_size} processes")
+            return self._executor
+
+    def _reset(self, executor):
+        # Another request may already have replaced the broken pool
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self._etag = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def analyze(self, snapshot, sections, items):
+        """
+        Yield one result per item, in input order
+
+        If a pool process dies, the pool is replaced and the items that had
+        not finished are resubmitted once; only items still unfinished after
+        that are reported as failed.
+
+        Args:
+            snapshot: ipc_sections cache snapshot the results are computed against
+            sections: Section documents used to build the classifier
+            items: Raw request items ({"text", "language"} objects)
+
+        Yields:
+            dict: {"index": i, "result": {...}} or {"index": i, "error": "..."}
+        """
+        work, errors = validate_items(items)
+        error_by_index = {error["index"]: error for error in errors}
+        next_index = 0
+
+        def errors_before(index):
+            nonlocal next_index
+            while next_index < index:
+                yield error_by_index[next_index]
+                next_index += 1
+
+        remaining = work
+        for attempt in range(ANALYSIS_POOL_ATTEMPTS):
+            if not remaining:
+                break
+            executor = self._get_executor(snapshot, sections)
+            chunksize = max(1, min(64, len(remaining) // (self.pool_size * 4)))
+            finished = 0
+            try:
+                for result in executor.map(_classify_item, remaining, chunksize=chunksize):
+                    yield from errors_before(result["index"])
+                    yield result
+                    next_index = result["index"] + 1
+                    finished += 1
+                remaining = []
+            except BrokenProcessPool:
+                self._reset(executor)
+                remaining = remaining[finished:]
+                print(f"Analysis pool broke with {len(remaining)} items unfinished (attempt {attempt + 1})")
+
+        for index, _, _ in remaining:
+            yield from errors_before(index)
+            yield {"index": index, "error": "Analysis worker crashed"}
+            next_index = index + 1
+
+        yield from errors_before(len(items))
+
+
+batch_analyzer = BatchAnalyzer()
@@ -0,0 +1,49 @@
+"""
+Raw-batch read path for BSON to JSON responses
+
+`find_raw_batches()` returns each server reply as undecoded BSON bytes. A
+whole batch is decoded with a single call into the bson C extension, `_id`
+is renamed to `id` (as a string) in the same pass, and the result is encoded
+straight to bytes by the app's JSON provider. This replaces per-document
+cursor iteration, the separate `_id` loops in the routes, and the str ->
+bytes round trip of `jsonify`.
+"""
+from bson import decode_all
+from flask import current_app
+
+
+def decode_batch(batch, rename_id=True):
+    """
+    Decode one raw BSON batch
+
+    Args:
+        batch: Bytes of concatenated BSON documents from a raw batch cursor
+        rename_id: Whether `_id` is replaced by a string `id`
+
+    Returns:
+        list: Decoded documents
+    """
+    documents = decode_all(batch)
+    if rename_id:
+        for document in documents:
+            if "_id" in document:
+                document["id"] = str(document.pop("_id"))
+    return documents
+
+
+def decode_batches(batches, rename_id=True):
+    """Decode every batch from a raw batch cursor into one list of documents"""
+    documents = []
+    for batch in batches:
+        documents.extend(decode_batch(batch, rename_id))
+    return documents
+
+
+def dumps_bytes(obj):
+    """Encode `obj` to UTF-8 JSON with the current app's JSON provider"""
+    return current_app.json.dumps_bytes(obj)
+
+
+def json_response(obj, status=200):
+    """Build a JSON response without going through an intermediate str"""
+    return current_app.response_class(dumps_bytes(obj) + b"\n", status=status, mimetype="application/json")
@@ -0,0 +1,302 @@
+"""
+Server-Sent Events feed of complaint and case note changes
+
+Each worker runs one background thread with a single MongoDB change stream
+on the `complaints` and `case_notes` collections (change streams need a
+replica set; a single-node one is enough). Every change is turned into an
+SSE frame once and then fanned out to the connected clients:
+
+- police officers receive every change,
+- victims receive changes to their own complaints and public notes on them.
+
+Each client has a bounded queue. A client that falls so far behind that its
+queue fills up is disconnected instead of holding memory; the browser's
+EventSource reconnects on its own with `Last-Event-ID`. Event IDs are
+change stream resume tokens, and the last STREAM_BUFFER_SIZE events are kept
+in a ring buffer, so a reconnecting client is replayed what it missed. If
+its last event is no longer in the buffer, the client gets a `resync` event
+and should catch up with the `?since=` delta sync of the complaint listing.
+
+The watcher itself resumes from its last token after a dropped connection.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import OperationFailure, PyMongoError
+
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "256"))
+STREAM_BUFFER_SIZE = int(os.getenv("STREAM_BUFFER_SIZE", "1000"))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+# Streams are closed after this long so workers are freed and tokens re-checked;
+# clients reconnect and resume from their last event
+STREAM_MAX_SECONDS = float(os.getenv("STREAM_MAX_SECONDS", "300"))
+
+WATCHED_COLLECTIONS = ["complaints", "case_notes"]
+
+# How long a new subscriber waits for the watcher to open its change stream
+_READY_TIMEOUT = 5.0
+# Pause before reopening the change stream after an error
+_RETRY_DELAY = 1.0
+
+EVENT_COMPLAINT = "complaint"
+EVENT_NOTE = "note"
+EVENT_TOMBSTONE = "tombstone"
+EVENT_RESYNC = "resync"
+
+
+class ChangeStreamUnavailable(RuntimeError):
+    """Raised when the deployment cannot serve change streams"""
+
+
+def format_sse(data, event=None, event_id=None):
+    """
+    Encode one Server-Sent Events frame
+
+    Args:
+        data: Serialized JSON payload (bytes)
+        event: Event name, if not the default "message"
+        event_id: ID the client sends back as Last-Event-ID
+
+    Returns:
+        bytes
+    """
+    lines = []
+    if event_id:
+        lines.append(b"id: " + event_id.encode("ascii"))
+    if event:
+        lines.append(b"event: " + event.encode("ascii"))
+    lines.append(b"data: " + data)
+    return b"\n".join(lines) + b"\n\n"
+
+
+HEARTBEAT_FRAME = b": heartbeat\n\n"
+
+
+class FeedEvent:
+    """One change, pre-rendered for each audience"""
+
+    __slots__ = ("token", "complainant_id", "police_frame", "victim_frame")
+
+    def __init__(self, token, complainant_id, police_frame, victim_frame):
+        self.token = token
+        self.complainant_id = complainant_id
+        self.police_frame = police_frame
+        self.victim_frame = victim_frame
+
+
+class Subscriber:
+    """A connected client and its bounded queue of frames"""
+
+    def __init__(self, user, queue_size=STREAM_QUEUE_SIZE):
+        self.user = user
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def frame_for(self, event):
+        if self.user["role"] == "police":
+            return event.police_frame
+        if event.victim_frame and event.complainant_id == self.user["id"]:
+            return event.victim_frame
+        return None
+
+    def offer(self, event):
+        """Queue an event without blocking; returns False once the client has fallen behind"""
+        frame = self.frame_for(event)
+        if frame is None:
+            return True
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            self.overflowed = True
+            return False
+
+
+def _pick(document, projection):
+    return {field: document[field] for field in projection if field in document and field != "_id"}
+
+
+def build_event(app, db, change):
+    """
+    Render a change stream event for police and victim subscribers
+
+    Returns:
+        FeedEvent or None if the change is not of interest
+    """
+    from routes.complaints import POLICE_LISTING_PROJECTION, VICTIM_LISTING_PROJECTION, truncate_listing_text
+
+    document = change.get("fullDocument")
+    if not document:
+        # Deleted before the update could be looked up
+        return None
+
+    token = change["_id"]["_data"]
+    dumps = app.json.dumps_bytes
+
+    if change["ns"]["coll"] == "case_notes":
+        note = dict(document)
+        note["id"] = str(note.pop("_id"))
+        frame = format_sse(dumps(note), EVENT_NOTE, token)
+        victim_frame = None
+        complainant_id = None
+        if note.get("visibility") == "public":
+            try:
+                complaint = db.complaints.find_one({"_id": ObjectId(note.get("complaint_id"))}, {"complainantId": 1})
+            except (InvalidId, TypeError):
+                complaint = None
+            if complaint:
+                complainant_id = complaint.get("complainantId")
+                victim_frame = frame
+        return FeedEvent(token, complainant_id, frame, victim_frame)
+
+    complaint_id = str(document["_id"])
+    complainant_id = document.get("complainantId")
+
+    if document.get("archived"):
+        tombstone = {"id": complaint_id, "archivedAt": document.get("archivedAt"), "version": document.get("version", 0)}
+        frame = format_sse(dumps(tombstone), EVENT_TOMBSTONE, token)
+        return FeedEvent(token, complainant_id, frame, frame)
+
+    police_view = _pick(document, POLICE_LISTING_PROJECTION)
+    victim_view = _pick(document, VICTIM_LISTING_PROJECTION)
+    for view in (police_view, victim_view):
+        view.update(id=complaint_id, version=document.get("version", 0), updatedAt=document.get("updatedAt"))
+    truncate_listing_text([victim_view])
+
+    return FeedEvent(
+        token,
+        complainant_id,
+        format_sse(dumps(police_view), EVENT_COMPLAINT, token),
+        format_sse(dumps(victim_view), EVENT_COMPLAINT, token)
+    )
+
+
+class ChangeFeed:
+    """
+    Per-worker change stream watcher with fan-out to SSE subscribers
+
+    Args:
+        buffer_size: Recent events kept for Last-Event-ID replay
+        queue_size: Frames buffered per subscriber before it is disconnected
+    """
+
+    def __init__(self, buffer_size=STREAM_BUFFER_SIZE, queue_size=STREAM_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._buffer = deque(maxlen=buffer_size)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+        self._resume_token = None
+
+    def _pipeline(self):
+        return [{"$match": {
+            "ns.coll": {"$in": WATCHED_COLLECTIONS},
+            "operationType": {"$in": ["insert", "update", "replace"]}
+        }}]
+
+    def _ensure_started(self, app, db):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._error = None
+            self._thread = threading.Thread(target=self._run, args=(app, db), name="change-feed", daemon=True)
+            self._thread.start()
+
+    def _run(self, app, db):
+        while True:
+            try:
+                with db.watch(
+                    self._pipeline(),
+                    full_document="updateLookup",
+                    resume_after=self._resume_token
+                ) as stream:
+                    self._ready.set()
+                    for change in stream:
+                        self._resume_token = change["_id"]
+                        self.publish(build_event(app, db, change))
+            except OperationFailure as e:
+                if self._ready.is_set() and self._resume_token is not None:
+                    # The token may have aged out of the oplog: start from now.
+                    # Clients whose last event is gone from the buffer get a resync.
+                    print(f"Change stream could not resume, restarting from now: {e}")
+                    self._resume_token = None
+                    continue
+                print(f"Change stream unavailable: {e}")
+                self._error = str(e)
+                self._ready.set()
+                return
+            except PyMongoError as e:
+                print(f"Change stream interrupted, resuming: {e}")
+                time.sleep(_RETRY_DELAY)
+            except Exception as e:
+                print(f"Change feed stopped: {e}")
+                self._error = str(e)
+                self._ready.set()
+                return
+
+    def publish(self, event):
+        """Add an event to the replay buffer and every matching subscriber's queue"""
+        if event is None:
+            return
+        with self._lock:
+            self._buffer.append(event)
+            for subscriber in list(self._subscribers):
+                if not subscriber.offer(event):
+                    # Stop feeding a client that fell behind; it resumes from the buffer
+                    self._subscribers.discard(subscriber)
+
+    def subscribe(self, app, db, user, last_event_id=None):
+        """
+        Register a client, starting the watcher on first use
+
+        Args:
+            app: Flask app, used to serialize events off the request thread
+            db: PyMongo database handle
+            user: Parsed identity of the client
+            last_event_id: Last-Event-ID sent by a reconnecting client
+
+        Returns:
+            tuple: (Subscriber, frames to replay first, whether the client must resync)
+
+        Raises:
+            ChangeStreamUnavailable: If the change stream cannot be opened
+        """
+        self._ensure_started(app, db)
+        if not self._ready.wait(_READY_TIMEOUT):
+            raise ChangeStreamUnavailable("Change stream did not start in time")
+        if self._error:
+            raise ChangeStreamUnavailable(self._error)
+
+        subscriber = Subscriber(user, self.queue_size)
+        replay, resync = [], False
+
+        # Registering and reading the buffer under the publish lock means
+        # every event is either replayed or queued, never both or neither
+        with self._lock:
+            if last_event_id:
+                tokens = [event.token for event in self._buffer]
+                if last_event_id in tokens:
+                    for event in list(self._buffer)[tokens.index(last_event_id) + 1:]:
+                        frame = subscriber.frame_for(event)
+                        if frame:
+                            replay.append(frame)
+                else:
+                    resync = True
+            self._subscribers.add(subscriber)
+
+        return subscriber, replay, resync
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+
+# Shared by every request handled by this worker
+complaint_feed = ChangeFeed()
@@ -0,0 +1,237 @@
+"""
+Offline complaint classification against the IPC section corpus
+
+Complaint text is scored against every section with BM25. The corpus is
+compiled once into a compressed sparse column layout (term -> postings of
+section index and precomputed BM25 weight), so scoring a complaint is a
+gather over the query terms' postings followed by a single `np.bincount`.
+There is no per-request network call, and the same text always produces the
+same ranking.
+"""
+import json
+import math
+import os
+import threading
+import numpy as np
+from utils.text_analysis import tokenize, expand_cross_lingual
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Field -> how many times its terms are counted when building the corpus
+FIELD_BOOSTS = {
+    "number": 1,
+    "title": 3,
+    "keywords": 3,
+    "keywords_hi": 3,
+    "title_hi": 3,
+    "description": 1,
+    "description_hi": 1,
+}
+
+# Sections scoring below this fraction of the best match are not suggested
+RELATIVE_SCORE_CUTOFF = 0.35
+
+SEED_SECTIONS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "ipc_sections.json")
+
+COGNIZABLE_STEPS = [
+    "File a First Information Report (FIR) at the nearest police station; police must register it for cognizable offences",
+    "Collect a free copy of the FIR",
+    "Get a medical examination done if there was physical harm",
+    "Preserve evidence such as messages, photos, documents and witness details",
+    "Cooperate with the police investigation and record your statement",
+]
+
+NON_COGNIZABLE_STEPS = [
+    "Report the incident at the police station; it will be recorded as a Non-Cognizable Report (NCR)",
+    "Police need a Magistrate's permission before investigating a non-cognizable offence",
+    "You can file a private complaint before the Magistrate under Section 200 CrPC",
+    "Preserve evidence such as messages, photos, documents and witness details",
+]
+
+
+def _field_text(section, field):
+    value = section.get(field)
+    if field == "number" and not value:
+        value = section.get("section")
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(item) for item in value)
+    return value or ""
+
+
+def _section_label(section):
+    label = str(section.get("number") or section.get("section") or "")
+    if label and not label.upper().startswith(("IPC", "SECTION")):
+        label = f"IPC {label}"
+    return label
+
+
+class ComplaintClassifier:
+    """
+    BM25 ranker over IPC sections
+
+    Args:
+        sections: Section documents with number, title, description,
+                  punishment, isCognizable, isBailable and optional keywords
+    """
+
+    def __init__(self, sections, k1=BM25_K1, b=BM25_B):
+        self.sections = list(sections)
+        self.vocabulary = {}
+
+        term_counts = []
+        for section in self.sections:
+            counts = {}
+            for field, boost in FIELD_BOOSTS.items():
+                for term in tokenize(_field_text(section, field)):
+                    counts[term] = counts.get(term, 0) + boost
+            term_counts.append(counts)
+            for term in counts:
+                self.vocabulary.setdefault(term, len(self.vocabulary))
+
+        n_docs = len(self.sections)
+        doc_lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float64)
+        avg_length = doc_lengths.mean() if n_docs else 0.0
+
+        # Build (term, doc, tf) triples and sort them by term to get CSC order
+        rows, cols, tfs = [], [], []
+        for doc_index, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                rows.append(self.vocabulary[term])
+                cols.append(doc_index)
+                tfs.append(tf)
+
+        rows = np.array(rows, dtype=np.int64)
+        cols = np.array(cols, dtype=np.int64)
+        tfs = np.array(tfs, dtype=np.float64)
+        order = np.argsort(rows, kind="stable")
+        rows, cols, tfs = rows[order], cols[order], tfs[order]
+
+        n_terms = len(self.vocabulary)
+        doc_freq = np.bincount(rows, minlength=n_terms).astype(np.float64)
+        idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        if n_docs:
+            norm = k1 * (1 - b + b * doc_lengths[cols] / avg_length)
+            weights = idf[rows] * tfs * (k1 + 1) / (tfs + norm)
+        else:
+            weights = tfs
+
+        self.indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(doc_freq.astype(np.int64), out=self.indptr[1:])
+        self.indices = cols
+        self.weights = weights
+
+    def __len__(self):
+        return len(self.sections)
+
+    def score(self, text, language=None):
+        """
+        Score `text` against every section
+
+        Returns:
+            tuple: (numpy array of scores per section, matched terms per section index)
+        """
+        terms = expand_cross_lingual(tokenize(text, language))
+        query_counts = {}
+        for term in terms:
+            term_id = self.vocabulary.get(term)
+            if term_id is not None:
+                query_counts[term_id] = query_counts.get(term_id, 0) + 1
+
+        if not query_counts or not self.sections:
+            return np.zeros(len(self.sections)), query_counts
+
+        term_ids = np.fromiter(query_counts.keys(), dtype=np.int64)
+        multiplicity = np.fromiter(query_counts.values(), dtype=np.float64)
+        starts = self.indptr[term_ids]
+        lengths = self.indptr[term_ids + 1] - starts
+
+        # Gather every posting of every query term in one vectorised step
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        posting_weights = self.weights[offsets] * np.repeat(multiplicity, lengths)
+        scores = np.bincount(self.indices[offsets], weights=posting_weights, minlength=len(self.sections))
+        return scores, query_counts
+
+    def classify(self, text, language=None, top_k=5):
+        """
+        Rank the sections most relevant to a complaint
+
+        Returns:
+            dict: Analysis result with `suggestions`, `isCognizable`,
+                  `sections`, `explanation`, `judgments` and `proceduralSteps`
+        """
+        scores, matched = self.score(text, language)
+        suggestions = []
+
+        if len(scores) and scores.max() > 0:
+            top = np.argsort(-scores, kind="stable")[:top_k]
+            best = scores[top[0]]
+            for index in top:
+                if scores[index] <= 0 or scores[index] < best * RELATIVE_SCORE_CUTOFF:
+                    break
+                section = self.sections[index]
+                suggestions.append({
+                    "section": _section_label(section),
+                    "description": section.get("title") or section.get("description", ""),
+                    "act": section.get("act", "Indian Penal Code"),
+                    "isCognizable": bool(section.get("isCognizable")),
+                    "isBailable": bool(section.get("isBailable")),
+                    "punishment": section.get("punishment", ""),
+                    "score": round(float(scores[index]), 4),
+                    "confidence": round(float(scores[index] / best), 4)
+                })
+
+        is_cognizable = any(suggestion["isCognizable"] for suggestion in suggestions) if suggestions else None
+
+        if suggestions:
+            explanation = (
+                f"Matched {len(matched)} legal terms in the complaint against {len(self.sections)} sections. "
+                f"Closest match: {suggestions[0]['section']} ({suggestions[0]['description']})."
+            )
+        else:
+            explanation = "No IPC section matched the complaint text. More details about the incident are needed."
+
+        return {
+            "suggestions": suggestions,
+            "isCognizable": is_cognizable,
+            "sections": [
+                {"section": suggestion["section"], "description": suggestion["description"]}
+                for suggestion in suggestions
+            ],
+            "explanation": explanation,
+            "judgments": [],
+            "proceduralSteps": COGNIZABLE_STEPS if is_cognizable else NON_COGNIZABLE_STEPS
+        }
+
+
+def load_seed_sections(path=SEED_SECTIONS_PATH):
+    """Load the IPC sections bundled with the backend"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+_classifier = None
+_classifier_etag = None
+_classifier_lock = threading.Lock()
+
+
+def get_classifier(snapshot):
+    """
+    Return a classifier for the cached ipc_sections snapshot, rebuilding it
+    when the snapshot changes. Falls back to the bundled sections when the
+    collection is empty.
+    """
+    global _classifier, _classifier_etag
+
+    if _classifier is not None and _classifier_etag == snapshot.etag:
+        return _classifier
+
+    with _classifier_lock:
+        if _classifier is None or _classifier_etag != snapshot.etag:
+            sections = snapshot.documents or load_seed_sections()
+            _classifier = ComplaintClassifier(sections)
+            _classifier_etag = snapshot.etag
+            print(f"Complaint classifier built over {len(_classifier)} sections")
+
+    return _classifier
@@ -0,0 +1,242 @@
+"""
+Apply a batch of queued complaint changes in a few round-trips
+
+Officers working offline queue status changes, FIR numbers, applied sections
+and case notes, then sync them in one request. Operations are grouped by
+complaint and written with one unordered `bulk_write` per collection
+(complaints, then case notes), and status-change SMS notifications are added
+to the outbox with a single `insert_many`.
+
+Operations on the same complaint are merged into one update in the order
+they were queued, since an unordered bulk write does not keep them in order.
+Each merged update is pinned to the version read at the start of the batch.
+A version sent by the client that is already stale, or a concurrent write
+that lands mid-batch, fails every operation on that complaint with
+"conflict"; other complaints are unaffected.
+"""
+from datetime import datetime, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import InsertOne, UpdateOne
+from utils.db_utils import run_in_transaction
+from utils.outbox import build_outbox_entry, enqueue_notifications
+from utils.versioning import version_filter
+from utils.complaint_search import index_complaints, mark_pending
+
+MAX_BATCH_OPERATIONS = 500
+
+# Complaint fields an "update" operation may set
+UPDATE_FIELDS = ["status", "firNumber", "appliedSections", "assignedOfficer", "analysisResult"]
+
+NOTE_VISIBILITIES = ["internal", "public"]
+
+RESULT_APPLIED = "applied"
+RESULT_CONFLICT = "conflict"
+RESULT_NOT_FOUND = "not_found"
+RESULT_ERROR = "error"
+
+
+class InvalidOperationError(ValueError):
+    """Raised when a queued operation is malformed"""
+
+
+def parse_operation(operation, officer, now):
+    """
+    Validate one operation and turn it into the writes it needs
+
+    Args:
+        operation: {"op": "update" | "add_note", "complaintId": ..., ...}
+        officer: Parsed identity of the officer syncing the batch
+        now: Timestamp string shared by the whole batch
+
+    Returns:
+        dict: complaint_id, object_id, version, set (complaint fields) and note
+    """
+    if not isinstance(operation, dict):
+        raise InvalidOperationError("Each operation must be an object")
+
+    complaint_id = operation.get("complaintId")
+    try:
+        object_id = ObjectId(complaint_id) if isinstance(complaint_id, str) else None
+    except InvalidId:
+        object_id = None
+    if object_id is None:
+        raise InvalidOperationError("complaintId must be a valid complaint ID")
+
+    version = operation.get("version")
+    if version is not None and (isinstance(version, bool) or not isinstance(version, int) or version < 0):
+        raise InvalidOperationError("version must be a non-negative integer")
+
+    parsed = {"complaint_id": complaint_id, "object_id": object_id, "version": version, "set": {}, "note": None}
+
+    op_type = operation.get("op")
+    if op_type == "update":
+        parsed["set"] = {field: operation[field] for field in UPDATE_FIELDS if field in operation}
+        if not parsed["set"]:
+            raise InvalidOperationError(f"update needs at least one of: {', '.join(UPDATE_FIELDS)}")
+    elif op_type == "add_note":
+        content = operation.get("content")
+        visibility = operation.get("visibility", "internal")
+        stage = operation.get("stage")
+        if not content:
+            raise InvalidOperationError("Note content is required")
+        if visibility not in NOTE_VISIBILITIES:
+            raise InvalidOperationError("Visibility must be either 'internal' or 'public'")
+        parsed["note"] = {
+            "_id": ObjectId(),
+            "complaint_id": complaint_id,
+            "author_id": officer["id"],
+            "author_name": officer["name"],
+            "content": content,
+            "stage": stage,
+            "visibility": visibility,
+            "created_at": now
+        }
+        if stage:
+            parsed["set"] = {"currentStage": stage}
+    else:
+        raise InvalidOperationError("op must be 'update' or 'add_note'")
+
+    return parsed
+
+
+def _status_notification(complaint_id, phone, fields):
+    details = None
+    if fields["status"] == "filed" and "firNumber" in fields:
+        details = f"FIR Number: {fields['firNumber']}"
+    return build_outbox_entry("status_update", phone, complaint_id, {"status": fields["status"], "details": details})
+
+
+def apply_batch(db, client, operations, officer):
+    """
+    Apply queued operations and report the outcome of each one
+
+    Args:
+        db: PyMongo database handle
+        client: MongoClient, used to run the writes in a transaction when supported
+        operations: List of raw operations from the request
+        officer: Parsed identity of the officer syncing the batch
+
+    Returns:
+        list: One result per operation, in request order
+    """
+    now = datetime.now(timezone.utc).isoformat()
+
+    parsed = []
+    for index, operation in enumerate(operations):
+        try:
+            parsed.append((index, parse_operation(operation, officer, now)))
+        except InvalidOperationError as e:
+            parsed.append((index, e))
+
+    def write_batch(session):
+        results = [None] * len(operations)
+        groups = {}
+        for index, operation in parsed:
+            if isinstance(operation, InvalidOperationError):
+                results[index] = {"index": index, "status": RESULT_ERROR, "error": str(operation)}
+            else:
+                groups.setdefault(operation["complaint_id"], []).append((index, operation))
+
+        existing = {
+            str(doc["_id"]): doc
+            for doc in db.complaints.find(
+                {"_id": {"$in": [ops[0][1]["object_id"] for ops in groups.values()]}},
+                {"version": 1, "complainantPhone": 1},
+                session=session
+            )
+        }
+
+        def fail(ops, status, error):
+            for index, _ in ops:
+                results[index] = {"index": index, "status": status, "error": error}
+
+        complaint_writes = []
+        new_versions = {}
+        for complaint_id, ops in groups.items():
+            complaint = existing.get(complaint_id)
+            if not complaint:
+                fail(ops, RESULT_NOT_FOUND, "Complaint not found")
+                continue
+
+            current_version = complaint.get("version", 0)
+            expected = next((op["version"] for _, op in ops if op["version"] is not None), None)
+            if expected is not None and expected != current_version:
+                fail(ops, RESULT_CONFLICT, "Complaint was modified by someone else")
+                continue
+
+            merged = {}
+            mutations = 0
+            for _, op in ops:
+                # Notes bump the version and updatedAt too, so syncing clients see them
+                if op["set"] or op["note"]:
+                    merged.update(op["set"])
+                    mutations += 1
+            new_versions[complaint_id] = current_version + mutations
+
+            if mutations:
+                merged["updatedAt"] = now
+                complaint_writes.append(UpdateOne(
+                    {"_id": complaint["_id"], **version_filter(current_version)},
+                    {"$set": merged, "$inc": {"version": mutations}}
+                ))
+
+        if complaint_writes:
+            outcome = db.complaints.bulk_write(complaint_writes, ordered=False, session=session)
+            if outcome.matched_count < len(complaint_writes):
+                # Bulk results are aggregate only. Every update in this batch set
+                # updatedAt to `now`, so complaints without it were not written.
+                written = [ObjectId(complaint_id) for complaint_id in new_versions]
+                stamped = {
+                    str(doc["_id"])
+                    for doc in db.complaints.find(
+                        {"_id": {"$in": written}, "updatedAt": now}, {"_id": 1}, session=session
+                    )
+                }
+                for complaint_id in list(new_versions):
+                    if complaint_id not in stamped and any(op["set"] or op["note"] for _, op in groups[complaint_id]):
+                        fail(groups[complaint_id], RESULT_CONFLICT, "Complaint was modified by someone else")
+                        del new_versions[complaint_id]
+
+        note_writes = []
+        notifications = []
+        reindex = []
+        for complaint_id, version in new_versions.items():
+            phone = existing[complaint_id].get("complainantPhone")
+            for index, op in groups[complaint_id]:
+                result = {"index": index, "status": RESULT_APPLIED, "complaintId": complaint_id, "version": version}
+                if op["note"]:
+                    note_writes.append(InsertOne(op["note"]))
+                    result["noteId"] = str(op["note"]["_id"])
+                if "status" in op["set"] and phone:
+                    notifications.append(_status_notification(complaint_id, phone, op["set"]))
+                if "analysisResult" in op["set"]:
+                    reindex.append(op["object_id"])
+                results[index] = result
+
+        if note_writes:
+            db.case_notes.bulk_write(note_writes, ordered=False, session=session)
+        enqueue_notifications(db, notifications, session=session)
+        mark_pending(db, set(reindex), session=session)
+
+        return results
+
+    results = run_in_transaction(client, write_batch)
+
+    # Keep the search index in step with changed analysis results (summary
+    # and explanation are searched); the pending markers written above let
+    # `sync-search-index` catch up if this fails
+    reindex = {
+        op["object_id"]
+        for index, op in parsed
+        if not isinstance(op, InvalidOperationError)
+        and "analysisResult" in op["set"]
+        and results[index]["status"] == RESULT_APPLIED
+    }
+    if reindex:
+        try:
+            index_complaints(db, db.complaints.find({"_id": {"$in": list(reindex)}}))
+        except Exception as e:
+            print(f"Error indexing batch-updated complaints for search: {e}")
+
+    return results
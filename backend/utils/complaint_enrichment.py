@@ -0,0 +1,124 @@
+"""
+Attach complainant details (address, ID proof) to complaints for police views
+
+A complainant is either a registered victim, referenced by `complainantId`,
+or a pre-registered victim, matched on `complainantPhone`. The registered
+victim wins when both exist.
+"""
+from bson import ObjectId
+from bson.errors import InvalidId
+
+NOT_AVAILABLE = "Not available"
+
+# Victim fields copied onto a complaint, as (victim field, complaint field)
+VICTIM_DETAIL_FIELDS = [
+    ("address", "complainantAddress"),
+    ("id_proof", "complainantIdProof"),
+]
+
+
+def victim_lookup_stages():
+    """
+    Aggregation stages that join both victim collections onto each complaint
+    as `_victim` and `_preRegisteredVictim` (first match or missing)
+    """
+    return [
+        {"$addFields": {
+            # complainantId is stored as a string; invalid ids simply do not match
+            "_complainantObjectId": {"$convert": {
+                "input": "$complainantId", "to": "objectId", "onError": None, "onNull": None
+            }}
+        }},
+        {"$lookup": {
+            "from": "victims",
+            "localField": "_complainantObjectId",
+            "foreignField": "_id",
+            "as": "_victim"
+        }},
+        {"$lookup": {
+            "from": "pre_registered_victims",
+            "localField": "complainantPhone",
+            "foreignField": "phone",
+            "as": "_preRegisteredVictim"
+        }},
+        {"$addFields": {
+            "_victim": {"$arrayElemAt": ["$_victim", 0]},
+            "_preRegisteredVictim": {"$arrayElemAt": ["$_preRegisteredVictim", 0]}
+        }},
+        {"$project": {"_complainantObjectId": 0}}
+    ]
+
+
+def apply_victim_details(complaint, victim):
+    """Copy the victim's address and ID proof onto the complaint"""
+    if not victim:
+        return
+    for victim_field, complaint_field in VICTIM_DETAIL_FIELDS:
+        complaint[complaint_field] = victim.get(victim_field, NOT_AVAILABLE)
+
+
+def fetch_complaint_with_victim(db, complaint_id):
+    """
+    Fetch one complaint with its complainant details in a single round-trip
+
+    Returns:
+        dict: The complaint (with `_id`), or None if it does not exist
+    """
+    pipeline = [{"$match": {"_id": ObjectId(complaint_id)}}, {"$limit": 1}] + victim_lookup_stages()
+    complaint = next(db.complaints.aggregate(pipeline), None)
+    if complaint is None:
+        return None
+
+    victim = complaint.pop("_victim", None)
+    pre_registered = complaint.pop("_preRegisteredVictim", None)
+    if "complainantId" in complaint:
+        if not victim and complaint.get("complainantPhone"):
+            victim = pre_registered
+        apply_victim_details(complaint, victim)
+    return complaint
+
+
+def attach_victim_details(db, complaints):
+    """
+    Enrich a page of complaints with two queries in total: registered victims
+    by `$in` on their ids, then pre-registered victims by `$in` on phone for
+    the complaints still unmatched
+
+    Args:
+        db: PyMongo database handle
+        complaints: Complaints with `complainantId` and `complainantPhone`
+    """
+    projection = {field: 1 for field, _ in VICTIM_DETAIL_FIELDS}
+
+    victim_ids = set()
+    for complaint in complaints:
+        if not complaint.get("complainantId"):
+            continue
+        try:
+            victim_ids.add(ObjectId(complaint["complainantId"]))
+        except (InvalidId, TypeError):
+            continue
+
+    victims = {}
+    if victim_ids:
+        for victim in db.victims.find({"_id": {"$in": list(victim_ids)}}, projection):
+            victims[str(victim["_id"])] = victim
+
+    unmatched = [
+        complaint for complaint in complaints
+        if str(complaint.get("complainantId")) not in victims and complaint.get("complainantPhone")
+    ]
+
+    pre_registered = {}
+    if unmatched:
+        phones = list({complaint["complainantPhone"] for complaint in unmatched})
+        for victim in db.pre_registered_victims.find({"phone": {"$in": phones}}, dict(projection, phone=1)):
+            pre_registered.setdefault(victim["phone"], victim)
+
+    for complaint in complaints:
+        if "complainantId" not in complaint:
+            continue
+        victim = victims.get(str(complaint["complainantId"]))
+        if not victim and complaint.get("complainantPhone"):
+            victim = pre_registered.get(complaint["complainantPhone"])
+        apply_victim_details(complaint, victim)
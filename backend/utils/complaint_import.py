@@ -0,0 +1,319 @@
+"""
+Streaming bulk import of historical complaints
+
+Uploads (CSV with a header row, or newline-delimited JSON) are parsed one
+row at a time and processed in chunks. For each chunk the victims are
+resolved with one `$in` query per victim collection, complainants not seen
+before are added to `pre_registered_victims` with a single unordered
+`bulk_write` of upserts, and the complaints are written with `insert_many`.
+Memory use therefore depends on the chunk size, not on the upload size.
+
+Rows that fail validation are reported individually and skipped. Imported
+complaints are historical, so no SMS notifications are queued for them.
+
+Columns / keys:
+    text (required), victim_phone (required), victim_name (required),
+    language (default "en"), filed_at (ISO 8601 date or time, default now),
+    status (default "pending"), fir_number, applied_sections (a list, or
+    ";"-separated in CSV)
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from utils.identity import normalize_phone, is_valid_phone, victim_resolver
+from utils.complaint_search import index_complaints, mark_pending
+from utils.near_duplicates import signature_fields
+from utils.integrity import record_complaints
+
+DEFAULT_IMPORT_CHUNK_SIZE = 500
+MAX_IMPORT_CHUNK_SIZE = 5000
+
+IMPORT_FORMATS = ["csv", "ndjson"]
+
+
+class RowError(ValueError):
+    """Raised when an imported row cannot be turned into a complaint"""
+
+
+def detect_format(filename=None, content_type=None):
+    """Guess the upload format from a file name or content type"""
+    name = (filename or "").lower()
+    kind = (content_type or "").lower()
+    if name.endswith(".csv") or "csv" in kind:
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in kind or "jsonl" in kind:
+        return "ndjson"
+    return None
+
+
+def _text_stream(stream):
+    if isinstance(stream, io.RawIOBase):
+        stream = io.BufferedReader(stream)
+    # utf-8-sig drops the byte order mark spreadsheet exports often start with
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+
+def iter_rows(stream, fmt):
+    """
+    Yield (row number, row) pairs from a binary upload stream
+
+    Row numbers are line numbers in the upload (the CSV header is line 1).
+    Unparseable lines are yielded as RowError instances instead of dicts.
+    """
+    text = _text_stream(stream)
+
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, RowError("Invalid JSON")
+            continue
+        if not isinstance(row, dict):
+            yield line_number, RowError("Each line must be a JSON object")
+            continue
+        yield line_number, row
+
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def parse_row(row, officer, imported_at):
+    """
+    Validate one row and build the complaint document for it
+
+    Returns:
+        tuple: (complaint without complainantId / complainantName, which are
+               filled in once the victim is resolved, or updatedAt /
+               importedAt, which are stamped when it is written; victim name)
+    """
+    text = _clean(row.get("text"))
+    raw_phone = _clean(row.get("victim_phone"))
+    victim_name = _clean(row.get("victim_name"))
+
+    if not text:
+        raise RowError("text is required")
+    if not raw_phone:
+        raise RowError("victim_phone is required")
+    if not victim_name:
+        raise RowError("victim_name is required")
+
+    phone = normalize_phone(raw_phone)
+    if not is_valid_phone(phone):
+        raise RowError(f"Invalid victim phone number format: {raw_phone}")
+
+    filed_at = imported_at
+    raw_filed_at = _clean(row.get("filed_at"))
+    if raw_filed_at:
+        try:
+            filed_at = datetime.fromisoformat(raw_filed_at)
+        except ValueError:
+            raise RowError(f"filed_at is not an ISO 8601 date: {raw_filed_at}")
+        if filed_at.tzinfo is None:
+            filed_at = filed_at.replace(tzinfo=timezone.utc)
+        # filedAt is sorted and paginated as a string, so every value must be UTC
+        filed_at = filed_at.astimezone(timezone.utc)
+
+    complaint = {
+        "text": text,
+        "language": _clean(row.get("language")) or "en",
+        "status": _clean(row.get("status")) or "pending",
+        "complainantPhone": phone,
+        "filedAt": filed_at.isoformat(),
+        "version": 1,
+        "filedBy": {
+            "id": officer["id"],
+            "name": officer["name"],
+            "role": "police"
+        }
+    }
+
+    fir_number = _clean(row.get("fir_number"))
+    if fir_number:
+        complaint["firNumber"] = fir_number
+
+    sections = row.get("applied_sections") or []
+    if isinstance(sections, str):
+        sections = sections.split(";")
+    if not isinstance(sections, list):
+        raise RowError("applied_sections must be a list or a ';'-separated string")
+    sections = [str(section).strip() for section in sections if str(section).strip()]
+    if sections:
+        complaint["appliedSections"] = sections
+
+    # Imported complaints take part in duplicate detection for later reports
+    complaint.update(signature_fields(text, complaint["language"]))
+
+    return complaint, victim_name
+
+
+def resolve_victims(db, names_by_phone, officer, now):
+    """
+    Map each phone number to (complainant id, complainant name), creating
+    pre-registered victims for numbers that are not known yet
+
+    Args:
+        names_by_phone: Phone number -> name given in the upload
+
+    Returns:
+        dict: Phone number -> (id string, name)
+    """
+    phones = list(names_by_phone)
+    resolved = {}
+
+    for victim in db.victims.find({"phone": {"$in": phones}}, {"phone": 1, "name": 1}):
+        resolved[victim["phone"]] = (str(victim["_id"]), victim.get("name"))
+
+    missing = [phone for phone in phones if phone not in resolved]
+    if not missing:
+        return resolved
+
+    # Upserts keep this safe against a concurrent import or registration
+    # creating the same pre-registered victim
+    db.pre_registered_victims.bulk_write([
+        UpdateOne(
+            {"phone": phone},
+            {"$setOnInsert": {
+                "name": names_by_phone[phone],
+                "phone": phone,
+                "created_at": now,
+                "registered_by": {"id": officer["id"], "name": officer["name"]}
+            }},
+            upsert=True
+        )
+        for phone in missing
+    ], ordered=False)
+    victim_resolver.invalidate(*missing)
+
+    for victim in db.pre_registered_victims.find({"phone": {"$in": missing}}, {"phone": 1, "name": 1}):
+        resolved.setdefault(victim["phone"], (str(victim["_id"]), victim.get("name")))
+
+    return resolved
+
+
+def _write_chunk(db, chunk, officer, now):
+    """
+    Resolve victims for a chunk of parsed rows and insert its complaints
+
+    Returns:
+        tuple: (inserted count, list of (row number, error message))
+    """
+    names_by_phone = {}
+    for _, complaint, victim_name in chunk:
+        names_by_phone.setdefault(complaint["complainantPhone"], victim_name)
+
+    resolved = resolve_victims(db, names_by_phone, officer, now)
+
+    documents, row_numbers, errors = [], [], []
+    for row_number, complaint, _ in chunk:
+        victim = resolved.get(complaint["complainantPhone"])
+        if not victim:
+            errors.append((row_number, "Could not resolve victim"))
+            continue
+        complaint["complainantId"], complaint["complainantName"] = victim
+        documents.append(complaint)
+        row_numbers.append(row_number)
+
+    if not documents:
+        return 0, errors
+
+    # Stamped when the chunk is written, not when the import started, so a
+    # delta sync that polls between chunks still picks later chunks up
+    written_at = datetime.now(timezone.utc).isoformat()
+
+    # Ids are assigned up front so the search markers are written before the
+    # complaints; `sync-search-index` indexes whatever the import leaves behind
+    for document in documents:
+        document.setdefault("_id", ObjectId())
+        document["updatedAt"] = written_at
+        document["importedAt"] = written_at
+    mark_pending(db, [document["_id"] for document in documents])
+
+    failed = set()
+    try:
+        inserted = len(db.complaints.insert_many(documents, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        inserted = e.details.get("nInserted", 0)
+        for write_error in e.details.get("writeErrors", []):
+            failed.add(write_error["index"])
+            errors.append((row_numbers[write_error["index"]], write_error.get("errmsg", "Insert failed")))
+
+    # Each document carries its _id, so the chunk is indexed without reading it back
+    stored = [document for index, document in enumerate(documents) if index not in failed]
+    try:
+        index_complaints(db, stored)
+    except Exception as e:
+        print(f"Error indexing imported complaints for search: {e}")
+    try:
+        record_complaints(db, stored)
+    except Exception as e:
+        # `anchor-integrity --backfill` records whatever is missed here
+        print(f"Error recording integrity hashes of imported complaints: {e}")
+
+    return inserted, errors
+
+
+def import_complaints(db, stream, fmt, officer, chunk_size=DEFAULT_IMPORT_CHUNK_SIZE):
+    """
+    Import complaints from an upload, yielding progress as it goes
+
+    Args:
+        db: PyMongo database handle
+        stream: Binary file-like object with the upload
+        fmt: "csv" or "ndjson"
+        officer: Parsed identity of the officer running the import
+        chunk_size: Rows resolved and inserted per round of writes
+
+    Yields:
+        dict: {"event": "error", "row", "error"} for each rejected row,
+              {"event": "progress", ...} after each chunk and a final
+              {"event": "done", ...} with the totals
+    """
+    now = datetime.now(timezone.utc)
+    totals = {"rows": 0, "inserted": 0, "failed": 0}
+    chunk = []
+
+    def flush():
+        inserted, errors = _write_chunk(db, chunk, officer, now)
+        totals["inserted"] += inserted
+        totals["failed"] += len(errors)
+        chunk.clear()
+        for row_number, error in errors:
+            yield {"event": "error", "row": row_number, "error": error}
+        yield dict(totals, event="progress")
+
+    for row_number, row in iter_rows(stream, fmt):
+        totals["rows"] += 1
+        try:
+            if isinstance(row, RowError):
+                raise row
+            complaint, victim_name = parse_row(row, officer, now)
+        except RowError as e:
+            totals["failed"] += 1
+            yield {"event": "error", "row": row_number, "error": str(e)}
+            continue
+
+        chunk.append((row_number, complaint, victim_name))
+        if len(chunk) >= chunk_size:
+            yield from flush()
+
+    if chunk:
+        yield from flush()
+
+    yield dict(totals, event="done")
@@ -0,0 +1,392 @@
+"""
+Full-text BM25 search over complaints, backed by an inverted index in MongoDB
+
+Complaint text, summary and explanation are tokenized with the same
+language-aware analyzer as the classifier (English and Hindi, routed by
+script), and Hindi legal terms are also indexed under their English
+equivalents, so "theft" finds a complaint that says "चोरी".
+
+The index lives in MongoDB so every worker shares it:
+
+- `complaint_search_postings`: one document per (term, complaint) with the
+  term's BM25 weight in that complaint, indexed on (term, weight desc),
+- `complaint_search_terms`: document frequency per term,
+- `complaint_search_docs`: the terms and length last indexed per complaint,
+  so a re-index only touches what changed,
+- `complaint_search_stats`: document count and total length of the corpus.
+
+Each update of the index (postings, term and document entries, corpus
+statistics) is written in one transaction. Writes to complaints also record
+a marker in `complaint_search_pending`, inside their own transaction where
+they have one, and the index update removes it. A marker left behind by a
+crash or failed update is picked up by `python manage.py sync-search-index`.
+
+Weights are computed with the average document length at indexing time,
+which drifts slowly as the corpus grows; `python manage.py
+rebuild-search-index` recomputes them. A query reads at most
+SEARCH_POSTINGS_PER_TERM postings per term in descending weight order, so
+its cost does not grow with the collection: rare terms are scored exactly,
+and very common terms (whose IDF is low) only for their best matches.
+"""
+import heapq
+import math
+import os
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo import DeleteMany, InsertOne, UpdateOne
+from utils.db_utils import run_in_transaction
+from utils.text_analysis import tokenize, expand_cross_lingual
+
+POSTINGS_COLLECTION = "complaint_search_postings"
+TERMS_COLLECTION = "complaint_search_terms"
+DOCS_COLLECTION = "complaint_search_docs"
+STATS_COLLECTION = "complaint_search_stats"
+PENDING_COLLECTION = "complaint_search_pending"
+STATS_ID = "corpus"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Field -> how many times its terms are counted
+FIELD_BOOSTS = {
+    "text": 1,
+    "summary": 2,
+    "explanation": 1,
+}
+
+SEARCH_POSTINGS_PER_TERM = int(os.getenv("SEARCH_POSTINGS_PER_TERM", "5000"))
+# Deepest result a client can page to
+MAX_SEARCH_RESULTS = 1000
+
+# Complaint fields the index is built from
+INDEXED_PROJECTION = {"text": 1, "summary": 1, "explanation": 1, "analysisResult": 1, "language": 1, "archived": 1}
+
+
+def _field_text(complaint, field):
+    value = complaint.get(field)
+    if not value and field in ("summary", "explanation"):
+        # Complaints filed by victims keep these inside the analysis result only
+        value = (complaint.get("analysisResult") or {}).get(field)
+    return value if isinstance(value, str) else ""
+
+
+def analyze_complaint(complaint):
+    """
+    Count the index terms of a complaint
+
+    Returns:
+        tuple: ({term: boosted term frequency}, document length)
+    """
+    counts = {}
+    language = complaint.get("language")
+    for field, boost in FIELD_BOOSTS.items():
+        for term in expand_cross_lingual(tokenize(_field_text(complaint, field), language)):
+            counts[term] = counts.get(term, 0) + boost
+    return counts, sum(counts.values())
+
+
+def analyze_query(query, language=None):
+    """Distinct query terms, with English equivalents of Hindi legal terms"""
+    return list(dict.fromkeys(expand_cross_lingual(tokenize(query, language))))
+
+
+def _bm25_weight(tf, length, avg_length):
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length) if avg_length else BM25_K1
+    return tf * (BM25_K1 + 1) / (tf + norm)
+
+
+def _corpus_stats(db, session=None):
+    stats = db[STATS_COLLECTION].find_one({"_id": STATS_ID}, session=session) or {}
+    doc_count = stats.get("docCount", 0)
+    avg_length = stats.get("totalLength", 0) / doc_count if doc_count else 0.0
+    return doc_count, avg_length
+
+
+def _write_index_changes(db, changes, session=None):
+    """
+    Apply (complaint ObjectId, new counts or None to remove, new length) changes
+
+    Returns:
+        int: Number of complaints whose index entry changed
+    """
+    if not changes:
+        return 0
+
+    ids = [object_id for object_id, _, _ in changes]
+    previous = {doc["_id"]: doc for doc in db[DOCS_COLLECTION].find({"_id": {"$in": ids}}, session=session)}
+    _, avg_length = _corpus_stats(db, session)
+
+    postings, doc_writes, df_delta = [], [], {}
+    doc_count_delta, length_delta, changed = 0, 0, 0
+
+    for object_id, counts, length in changes:
+        old = previous.get(object_id)
+        old_terms = old["terms"] if old else {}
+        new_terms = counts or {}
+        if old_terms == new_terms and (old is not None) == (counts is not None):
+            continue
+        changed += 1
+
+        for term in old_terms.keys() - new_terms.keys():
+            df_delta[term] = df_delta.get(term, 0) - 1
+        for term in new_terms.keys() - old_terms.keys():
+            df_delta[term] = df_delta.get(term, 0) + 1
+
+        if old is not None:
+            postings.append(DeleteMany({"complaintId": object_id}))
+            doc_count_delta -= 1
+            length_delta -= old.get("length", 0)
+
+        if counts is None:
+            doc_writes.append(DeleteMany({"_id": object_id}))
+            continue
+
+        weight_length = avg_length or length
+        for term, tf in counts.items():
+            postings.append(InsertOne({
+                "term": term,
+                "complaintId": object_id,
+                "w": _bm25_weight(tf, length, weight_length)
+            }))
+        doc_writes.append(UpdateOne(
+            {"_id": object_id},
+            {"$set": {"terms": counts, "length": length}},
+            upsert=True
+        ))
+        doc_count_delta += 1
+        length_delta += length
+
+    if not changed:
+        return 0
+
+    # Deletes must run before the inserts that replace them
+    if postings:
+        db[POSTINGS_COLLECTION].bulk_write(postings, ordered=True, session=session)
+    if doc_writes:
+        db[DOCS_COLLECTION].bulk_write(doc_writes, ordered=False, session=session)
+    df_writes = [
+        UpdateOne({"_id": term}, {"$inc": {"df": delta}}, upsert=True)
+        for term, delta in df_delta.items() if delta
+    ]
+    if df_writes:
+        db[TERMS_COLLECTION].bulk_write(df_writes, ordered=False, session=session)
+    db[STATS_COLLECTION].update_one(
+        {"_id": STATS_ID},
+        {"$inc": {"docCount": doc_count_delta, "totalLength": length_delta}},
+        upsert=True,
+        session=session
+    )
+    return changed
+
+
+def _apply_index_changes(db, changes):
+    # Postings, term and document entries, corpus statistics and the pending
+    # markers of the complaints all change together or not at all
+    def write_changes(session):
+        changed = _write_index_changes(db, changes, session)
+        db[PENDING_COLLECTION].delete_many({"_id": {"$in": [object_id for object_id, _, _ in changes]}}, session=session)
+        return changed
+
+    if not changes:
+        return 0
+    return run_in_transaction(db.client, write_changes)
+
+
+def _as_object_id(value):
+    return value if isinstance(value, ObjectId) else ObjectId(value)
+
+
+def mark_pending(db, complaint_ids, session=None):
+    """
+    Record that complaints must be (re)indexed
+
+    Call this in the transaction that writes the complaints; the marker is
+    removed when the index update commits, so a crash in between is repaired
+    by `sync_pending`.
+    """
+    now = datetime.now(timezone.utc)
+    writes = [
+        UpdateOne({"_id": _as_object_id(complaint_id)}, {"$set": {"queuedAt": now}}, upsert=True)
+        for complaint_id in complaint_ids
+    ]
+    if writes:
+        db[PENDING_COLLECTION].bulk_write(writes, ordered=False, session=session)
+
+
+def index_complaints(db, complaints):
+    """
+    Add or refresh complaints in the search index
+
+    Args:
+        db: PyMongo database handle
+        complaints: Complaint documents with `_id` and the indexed fields.
+                    Archived complaints are removed from the index.
+
+    Returns:
+        int: Number of complaints whose index entry changed
+    """
+    changes = []
+    for complaint in complaints:
+        object_id = _as_object_id(complaint["_id"])
+        if complaint.get("archived"):
+            changes.append((object_id, None, 0))
+        else:
+            counts, length = analyze_complaint(complaint)
+            changes.append((object_id, counts, length))
+    return _apply_index_changes(db, changes)
+
+
+def index_complaint(db, complaint):
+    """
+    Add or refresh one complaint; errors are logged, never raised to the
+    request, and the complaint's pending marker is left for `sync_pending`
+    """
+    try:
+        index_complaints(db, [complaint])
+    except Exception as e:
+        print(f"Error indexing complaint {complaint.get('_id')} for search: {e}")
+
+
+def remove_complaint(db, complaint_id):
+    """Drop a complaint from the search index"""
+    try:
+        _apply_index_changes(db, [(_as_object_id(complaint_id), None, 0)])
+    except Exception as e:
+        print(f"Error removing complaint {complaint_id} from search: {e}")
+
+
+def sync_pending(db, batch_size=500):
+    """
+    Index every complaint that still has a pending marker
+
+    Complaints that no longer exist, or are archived, are removed from the index.
+
+    Returns:
+        int: Number of complaints processed
+    """
+    processed = 0
+    while True:
+        markers = list(db[PENDING_COLLECTION].find({}, {"_id": 1}).sort("_id", 1).limit(batch_size))
+        if not markers:
+            return processed
+        ids = [marker["_id"] for marker in markers]
+        complaints = {
+            complaint["_id"]: complaint
+            for complaint in db.complaints.find({"_id": {"$in": ids}}, INDEXED_PROJECTION)
+        }
+        changes = []
+        for object_id in ids:
+            complaint = complaints.get(object_id)
+            if complaint is None or complaint.get("archived"):
+                changes.append((object_id, None, 0))
+            else:
+                counts, length = analyze_complaint(complaint)
+                changes.append((object_id, counts, length))
+        _apply_index_changes(db, changes)
+        processed += len(ids)
+
+
+def search(db, query, language=None, offset=0, limit=20):
+    """
+    Rank complaints against a query with BM25
+
+    Args:
+        db: PyMongo database handle
+        query: Search text in English and/or Hindi
+        language: Declared query language, passed to the tokenizer
+        offset: Number of ranked results to skip
+        limit: Page size
+
+    Returns:
+        tuple: ([(complaint ObjectId, score)] for the page, number of matches
+               found, capped at MAX_SEARCH_RESULTS)
+    """
+    terms = analyze_query(query, language)
+    if not terms:
+        return [], 0
+
+    doc_count, _ = _corpus_stats(db)
+    if not doc_count:
+        return [], 0
+
+    doc_freqs = {doc["_id"]: doc.get("df", 0) for doc in db[TERMS_COLLECTION].find({"_id": {"$in": terms}})}
+
+    scores = {}
+    for term in terms:
+        df = doc_freqs.get(term, 0)
+        if df <= 0:
+            continue
+        idf = math.log1p((doc_count - df + 0.5) / (df + 0.5))
+        postings = (
+            db[POSTINGS_COLLECTION]
+            .find({"term": term}, {"_id": 0, "complaintId": 1, "w": 1})
+            .sort("w", -1)
+            .limit(SEARCH_POSTINGS_PER_TERM)
+        )
+        for posting in postings:
+            complaint_id = posting["complaintId"]
+            scores[complaint_id] = scores.get(complaint_id, 0.0) + idf * posting["w"]
+
+    total = min(len(scores), MAX_SEARCH_RESULTS)
+    end = min(offset + limit, MAX_SEARCH_RESULTS)
+    if offset >= end:
+        return [], total
+
+    # Ties are broken by newest complaint first
+    ranked = heapq.nlargest(end, scores.items(), key=lambda item: (item[1], item[0]))
+    return ranked[offset:end], total
+
+
+def rebuild_index(db, batch_size=1000):
+    """
+    Rebuild the whole search index from the complaints collection
+
+    Complaints are read twice, once for the corpus statistics and once to
+    write postings weighted with the final average length, so memory use
+    does not depend on the number of complaints.
+
+    Returns:
+        int: Number of complaints indexed
+    """
+    # Markers queued before the rebuild are covered by it; later ones are kept
+    started_at = datetime.now(timezone.utc)
+    for name in (POSTINGS_COLLECTION, TERMS_COLLECTION, DOCS_COLLECTION, STATS_COLLECTION):
+        db[name].delete_many({})
+
+    query = {"archived": {"$ne": True}}
+    projection = INDEXED_PROJECTION
+
+    doc_count, total_length = 0, 0
+    for complaint in db.complaints.find(query, projection, batch_size=batch_size):
+        doc_count += 1
+        total_length += analyze_complaint(complaint)[1]
+    avg_length = total_length / doc_count if doc_count else 0.0
+
+    df = {}
+    postings, docs = [], []
+
+    def flush():
+        if postings:
+            db[POSTINGS_COLLECTION].insert_many(postings, ordered=False)
+        if docs:
+            db[DOCS_COLLECTION].insert_many(docs, ordered=False)
+        postings.clear()
+        docs.clear()
+
+    for complaint in db.complaints.find(query, projection, batch_size=batch_size):
+        counts, length = analyze_complaint(complaint)
+        for term, tf in counts.items():
+            postings.append({"term": term, "complaintId": complaint["_id"], "w": _bm25_weight(tf, length, avg_length)})
+            df[term] = df.get(term, 0) + 1
+        docs.append({"_id": complaint["_id"], "terms": counts, "length": length})
+        if len(docs) >= batch_size:
+            flush()
+    flush()
+
+    terms = [{"_id": term, "df": count} for term, count in df.items()]
+    for start in range(0, len(terms), batch_size):
+        db[TERMS_COLLECTION].insert_many(terms[start:start + batch_size], ordered=False)
+
+    db[STATS_COLLECTION].insert_one({"_id": STATS_ID, "docCount": doc_count, "totalLength": total_length})
+    db[PENDING_COLLECTION].delete_many({"queuedAt": {"$lte": started_at}})
+    return doc_count
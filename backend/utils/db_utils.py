@@ -1,4 +1,5 @@
 from bson import ObjectId
+from pymongo.errors import OperationFailure
 
 def prepare_mongo_document_for_json(document):
     """
@@ -30,3 +31,32 @@ def prepare_mongo_document_for_json(document):
             result[key] = str(value)
     
     return result
+
+# Whether the connected deployment supports multi-document transactions.
+# None until the first attempt; standalone servers only support them on replica sets.
+_transactions_supported = None
+
+def run_in_transaction(client, callback):
+    """
+    Run `callback(session)` inside a multi-document transaction when the
+    deployment supports it, otherwise run it once with `session=None`.
+
+    Standalone development servers reject transactions, so the first failure
+    is remembered and later calls go straight to the non-transactional path.
+    """
+    global _transactions_supported
+    
+    if _transactions_supported is not False:
+        try:
+            with client.start_session() as session:
+                result = session.with_transaction(callback)
+            _transactions_supported = True
+            return result
+        except OperationFailure as e:
+            # IllegalOperation: "Transaction numbers are only allowed on a replica set member or mongos"
+            if e.code != 20:
+                raise
+            print("MongoDB transactions not supported by this deployment, writing without a transaction")
+            _transactions_supported = False
+    
+    return callback(None)
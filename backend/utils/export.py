@@ -0,0 +1,62 @@
+"""
+Utility functions for streaming bulk exports of complaints and case notes
+"""
+from utils.bson_json import decode_batch, decode_batches, dumps_bytes
+from utils.near_duplicates import SIGNATURE_FIELDS
+
+DEFAULT_EXPORT_BATCH_SIZE = 500
+MAX_EXPORT_BATCH_SIZE = 5000
+
+# Duplicate detection signatures are derived data and are not exported
+EXPORT_PROJECTION = {field: 0 for field in SIGNATURE_FIELDS}
+
+
+def _attach_notes(db, batch):
+    """
+    Fetch the case notes for a batch of complaints with a single query and
+    attach them to each complaint under `case_notes`
+    """
+    complaint_ids = [complaint["id"] for complaint in batch]
+    notes_by_complaint = {complaint_id: [] for complaint_id in complaint_ids}
+
+    notes = decode_batches(db.case_notes.find_raw_batches(
+        {"complaint_id": {"$in": complaint_ids}}
+    ).sort("created_at", 1))
+
+    for note in notes:
+        notes_by_complaint.setdefault(note["complaint_id"], []).append(note)
+
+    for complaint in batch:
+        complaint["case_notes"] = notes_by_complaint.get(complaint["id"], [])
+
+
+def iter_complaint_export(db, batch_size=DEFAULT_EXPORT_BATCH_SIZE, include_notes=True):
+    """
+    Yield every complaint as one line of newline-delimited JSON
+
+    Complaints are read in `_id` order from a single server-side cursor that
+    returns raw BSON batches of `batch_size` documents. Each batch is decoded
+    in one call, joined with its notes and encoded, so memory use depends on
+    the batch size rather than on the size of the collection.
+
+    Args:
+        db: PyMongo database handle
+        batch_size: Number of complaints fetched and joined per round-trip
+        include_notes: Whether to join each complaint's case notes
+
+    Yields:
+        bytes: JSON documents, one per line
+    """
+    cursor = db.complaints.find_raw_batches({}, EXPORT_PROJECTION, batch_size=batch_size).sort("_id", 1)
+
+    try:
+        for raw_batch in cursor:
+            batch = decode_batch(raw_batch)
+            if not batch:
+                continue
+            if include_notes:
+                _attach_notes(db, batch)
+            yield b"".join(dumps_bytes(complaint) + b"\n" for complaint in batch)
+    finally:
+        # Release the server-side cursor if the client disconnects mid-export
+        cursor.close()
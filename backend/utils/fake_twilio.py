@@ -0,0 +1,59 @@
+"""
+Offline stand-in for the Twilio REST client
+
+Implements the small part of the Twilio API the backend uses
+(`client.messages.create(body=..., from_=..., to=...)`) so the notification
+worker can be exercised without credentials or network access.
+"""
+import itertools
+import random
+import time
+from types import SimpleNamespace
+
+
+class FakeTwilioError(Exception):
+    """Raised by the fake client to simulate a carrier or API failure"""
+
+
+class _FakeMessages:
+    def __init__(self, client):
+        self._client = client
+        self._counter = itertools.count(1)
+
+    def create(self, body, from_, to):
+        client = self._client
+
+        if client.latency:
+            time.sleep(client.latency)
+
+        client.calls += 1
+        if client.calls <= client.fail_first or random.random() < client.failure_rate:
+            raise FakeTwilioError(f"Simulated delivery failure to {to}")
+
+        message = SimpleNamespace(
+            sid=f"SMFAKE{next(self._counter):026d}",
+            body=body,
+            from_=from_,
+            to=to,
+            status="queued"
+        )
+        client.sent.append(message)
+        return message
+
+
+class FakeTwilioClient:
+    """
+    Records messages instead of sending them
+
+    Args:
+        fail_first: Number of initial calls that raise before any succeed
+        failure_rate: Probability (0-1) that any later call raises
+        latency: Seconds to sleep per call, to mimic a slow carrier
+    """
+    def __init__(self, fail_first=0, failure_rate=0.0, latency=0.0):
+        self.fail_first = fail_first
+        self.failure_rate = failure_rate
+        self.latency = latency
+        self.calls = 0
+        self.sent = []
+        self.messages = _FakeMessages(self)
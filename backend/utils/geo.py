@@ -0,0 +1,199 @@
+"""
+Spatial index for nearest police station lookups
+
+Stations are projected onto the unit sphere as 3D points and stored in a
+KD-tree. Straight-line (chord) distance between unit vectors increases
+monotonically with great-circle distance, so a Euclidean k-nearest search
+in 3D returns exactly the stations closest by haversine distance, with no
+distortion near the poles or the antimeridian.
+"""
+import heapq
+import json
+import math
+import os
+import threading
+import time
+
+EARTH_RADIUS_KM = 6371.0088
+
+STATIONS_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "police_stations.json")
+
+# How often (seconds) a worker checks whether the stations collection changed
+STATIONS_CHECK_INTERVAL = float(os.getenv("STATIONS_CHECK_SECONDS", "300"))
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _to_unit_vector(lat, lng):
+    phi, lam = math.radians(lat), math.radians(lng)
+    cos_phi = math.cos(phi)
+    return (cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi))
+
+
+def _chord_for_km(km):
+    """Chord length on the unit sphere corresponding to a great-circle distance"""
+    angle = min(km / EARTH_RADIUS_KM, math.pi)
+    return 2 * math.sin(angle / 2)
+
+
+class _Node:
+    __slots__ = ("point", "index", "axis", "left", "right")
+
+    def __init__(self, point, index, axis, left, right):
+        self.point = point
+        self.index = index
+        self.axis = axis
+        self.left = left
+        self.right = right
+
+
+class StationIndex:
+    """
+    Immutable KD-tree over station locations
+
+    Args:
+        stations: Station documents with `location: {"lat", "lng"}`
+    """
+
+    def __init__(self, stations):
+        self.stations = []
+        points = []
+        for station in stations:
+            location = station.get("location") or {}
+            try:
+                lat, lng = float(location["lat"]), float(location["lng"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.stations.append(station)
+            points.append((_to_unit_vector(lat, lng), len(points)))
+        self._root = self._build(points, 0)
+
+    def __len__(self):
+        return len(self.stations)
+
+    def _build(self, points, depth):
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda item: item[0][axis])
+        middle = len(points) // 2
+        point, index = points[middle]
+        return _Node(
+            point,
+            index,
+            axis,
+            self._build(points[:middle], depth + 1),
+            self._build(points[middle + 1:], depth + 1)
+        )
+
+    def nearest(self, lat, lng, k=5, radius_km=None):
+        """
+        Find the `k` stations closest to (lat, lng)
+
+        Args:
+            lat, lng: Query position in degrees
+            k: Maximum number of stations to return
+            radius_km: Optional maximum distance
+
+        Returns:
+            list: (distance_km, station) tuples, nearest first
+        """
+        if k <= 0 or self._root is None:
+            return []
+
+        target = _to_unit_vector(lat, lng)
+        max_sq = _chord_for_km(radius_km) ** 2 if radius_km is not None else float("inf")
+        # Max-heap of the best k candidates as (-squared chord, index)
+        best = []
+
+        # Each entry carries the squared distance to the splitting plane that
+        # separates it from the query; subtrees beyond the current bound are skipped
+        stack = [(self._root, 0.0)]
+        while stack:
+            node, plane_sq = stack.pop()
+            if node is None:
+                continue
+            bound = -best[0][0] if len(best) == k else max_sq
+            if plane_sq > bound:
+                continue
+
+            px, py, pz = node.point
+            dist_sq = (px - target[0]) ** 2 + (py - target[1]) ** 2 + (pz - target[2]) ** 2
+            if dist_sq <= max_sq:
+                if len(best) < k:
+                    heapq.heappush(best, (-dist_sq, node.index))
+                elif dist_sq < -best[0][0]:
+                    heapq.heapreplace(best, (-dist_sq, node.index))
+
+            diff = target[node.axis] - node.point[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+
+            # Near side is pushed last so it is explored first and tightens the bound
+            stack.append((far, diff * diff))
+            stack.append((near, 0.0))
+
+        results = []
+        for _, index in sorted(best, key=lambda item: -item[0]):
+            station = self.stations[index]
+            location = station["location"]
+            distance = haversine_km(lat, lng, float(location["lat"]), float(location["lng"]))
+            results.append((distance, station))
+        return results
+
+
+def load_station_data(path=STATIONS_DATA_PATH):
+    """Load the police stations bundled with the backend"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class StationDirectory:
+    """
+    Per-worker cache of all stations and their spatial index
+
+    Stations come from the `police_stations` collection, or from the bundled
+    data file when the collection is empty. The collection is re-read when its
+    document count changes, checked at most every STATIONS_CHECK_INTERVAL.
+    """
+
+    def __init__(self, check_interval=STATIONS_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._index = None
+        self._count = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db):
+        if self._index is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return self._index
+
+        with self._lock:
+            if self._index is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._index
+
+            count = db.police_stations.estimated_document_count()
+            if self._index is None or count != self._count:
+                stations = list(db.police_stations.find()) if count else load_station_data()
+                for station in stations:
+                    if "_id" in station:
+                        station["id"] = str(station.pop("_id"))
+                self._index = StationIndex(stations)
+                self._count = count
+                print(f"Loaded {len(self._index)} police stations into the spatial index")
+
+            self._checked_at = time.monotonic()
+            return self._index
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+
+
+station_directory = StationDirectory()
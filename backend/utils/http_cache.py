@@ -0,0 +1,155 @@
+"""
+HTTP caching and compression for API responses
+
+`init_http_cache` registers an after-request hook that
+
+- gives successful GET responses of complaint and case note reads a weak
+  ETag and answers a matching `If-None-Match` with 304 and no body. Routes
+  that know the versions of what they return set the ETag themselves (see
+  `documents_etag` / `not_modified`) and can answer 304 before serializing
+  anything; otherwise the ETag is a hash of the body,
+- compresses bodies of at least COMPRESS_MIN_BYTES with brotli when the
+  client accepts it and the `brotli` package is installed, else with gzip.
+
+ETags are weak because the same representation is sent with different
+content encodings; a strong ETag set by a route is made weak when the hook
+compresses its body. Routes serving cached bytes (reference data) compress
+them once with `negotiate_encoding` / `compress` and set the encoding on
+the response themselves, which the hook leaves alone. Streaming responses
+(SSE, NDJSON export and import) are left alone.
+"""
+import gzip
+import hashlib
+import os
+from flask import request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is used without it
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# GET responses under these paths get ETags and conditional handling
+CONDITIONAL_PREFIXES = ("/api/complaints",)
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/plain", "text/html", "text/csv"}
+
+
+def documents_etag(documents, *salt):
+    """
+    Weak ETag value derived from the ID, version and update time of each document
+
+    Args:
+        documents: Documents in response order (with `id` or `_id`)
+        salt: Anything else the representation depends on (role, query string)
+
+    Returns:
+        str
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in salt:
+        digest.update(str(part).encode("utf-8") + b"\0")
+    for document in documents:
+        document_id = document.get("id", document.get("_id"))
+        changed = document.get("updatedAt") or document.get("created_at") or ""
+        digest.update(f"{document_id}:{document.get('version', 0)}:{changed}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def not_modified(etag):
+    """
+    304 response if the request's If-None-Match already holds `etag`
+
+    Returns:
+        Response or None
+    """
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    return response
+
+
+def _add_vary(response, header):
+    if header not in response.vary:
+        response.vary.add(header)
+
+
+def negotiate_encoding(size):
+    """
+    Content encoding to send a body of `size` bytes with
+
+    Returns:
+        str or None: "br", "gzip", or None to send it uncompressed
+    """
+    if size < COMPRESS_MIN_BYTES:
+        return None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    """Compress bytes with an encoding returned by `negotiate_encoding`"""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _compress(response):
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    _add_vary(response, "Accept-Encoding")
+    encoding = negotiate_encoding(len(body))
+    if encoding is None:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    # A strong ETag promises identical bytes, which no longer holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def _make_conditional(response):
+    if (request.method not in ("GET", "HEAD") or not request.path.startswith(CONDITIONAL_PREFIXES)
+            or response.status_code != 200 or response.is_streamed or response.mimetype != "application/json"):
+        return response
+
+    if "ETag" not in response.headers:
+        response.set_etag(hashlib.blake2b(response.get_data(), digest_size=16).hexdigest(), weak=True)
+
+    # Responses depend on who is asking and must be revalidated before reuse
+    response.headers.setdefault("Cache-Control", "private, no-cache")
+    _add_vary(response, "Authorization")
+
+    return response.make_conditional(request)
+
+
+def init_http_cache(app):
+    """Register the ETag / compression hook on the Flask app"""
+
+    @app.after_request
+    def apply_http_cache(response):
+        response = _make_conditional(response)
+        if response.status_code == 304:
+            response.headers.setdefault("Cache-Control", "private, no-cache")
+            _add_vary(response, "Authorization")
+            return response
+        return _compress(response)
+
+    return app
@@ -0,0 +1,162 @@
+"""
+Idempotency-Key support for retried POST requests
+
+A client on a flaky network sends the same `Idempotency-Key` header with
+every retry of one logical request. The first request claims the key by
+inserting it into the `idempotency_keys` collection (unique per user and
+key), runs the view, and stores the response. Retries with the same key get
+the stored response back, without running the view's inserts or queueing
+another SMS. Keys expire through a TTL index after IDEMPOTENCY_TTL_HOURS.
+
+- A retry that arrives while the first request is still running gets 409.
+- Reusing a key for a different request body or route gets 422.
+- Server errors (5xx) release the key, so the client can retry the
+  operation for real.
+- If a worker dies mid-request, the claim expires after
+  IDEMPOTENCY_LOCK_SECONDS and the next retry takes it over.
+"""
+import hashlib
+import os
+from datetime import datetime, timezone, timedelta
+from functools import wraps
+from bson.binary import Binary
+from flask import request, jsonify, make_response
+from flask_jwt_extended import get_jwt_identity
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+IDEMPOTENCY_COLLECTION = "idempotency_keys"
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+IDEMPOTENCY_TTL = timedelta(hours=float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")))
+IDEMPOTENCY_LOCK = timedelta(seconds=float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60")))
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_COMPLETED = "completed"
+
+# Insert attempts when the record keeps disappearing between insert and read
+CLAIM_ATTEMPTS = 3
+
+
+def request_fingerprint():
+    """Hash of the parts of the request a retry must repeat exactly"""
+    digest = hashlib.sha256()
+    digest.update(request.method.encode("utf-8"))
+    digest.update(request.path.encode("utf-8"))
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def _claim(collection, user_id, key, fingerprint, attempts=CLAIM_ATTEMPTS):
+    """
+    Try to claim a key for this request
+
+    Returns:
+        dict or None: None if the key was claimed, otherwise the existing record
+    """
+    for _ in range(attempts):
+        now = datetime.now(timezone.utc)
+        try:
+            collection.insert_one({
+                "userId": user_id,
+                "key": key,
+                "fingerprint": fingerprint,
+                "status": STATUS_IN_PROGRESS,
+                "lockedAt": now,
+                "createdAt": now,
+                "expiresAt": now + IDEMPOTENCY_TTL
+            })
+            return None
+        except DuplicateKeyError:
+            pass
+
+        # Take over a claim abandoned by a worker that died mid-request
+        taken_over = collection.find_one_and_update(
+            {
+                "userId": user_id,
+                "key": key,
+                "fingerprint": fingerprint,
+                "status": STATUS_IN_PROGRESS,
+                "lockedAt": {"$lt": now - IDEMPOTENCY_LOCK}
+            },
+            {"$set": {"lockedAt": now}},
+            return_document=ReturnDocument.AFTER
+        )
+        if taken_over:
+            return None
+
+        existing = collection.find_one({"userId": user_id, "key": key})
+        if existing is not None:
+            return existing
+        # The record was released (a 5xx) or expired since the insert failed: claim again
+
+    # Still churning: report it as in progress so the client retries shortly
+    return {"fingerprint": fingerprint, "status": STATUS_IN_PROGRESS}
+
+
+def _replay(record):
+    stored = record["response"]
+    response = make_response(bytes(stored["body"]), stored["status"])
+    response.mimetype = stored.get("mimetype") or "application/json"
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+def idempotent(view):
+    """
+    Make a JWT-protected view replay its response for repeated Idempotency-Keys
+
+    Must be applied below `@jwt_required()` so the caller's identity is known.
+    Requests without the header run normally.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        from app import mongo
+
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(*args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({"error": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters"}), 400
+
+        collection = mongo.db[IDEMPOTENCY_COLLECTION]
+        user_id = (get_jwt_identity() or "").split(":", 1)[0]
+        fingerprint = request_fingerprint()
+
+        existing = _claim(collection, user_id, key, fingerprint)
+        if existing is not None:
+            if existing.get("fingerprint") != fingerprint:
+                return jsonify({"error": f"{IDEMPOTENCY_HEADER} was already used for a different request"}), 422
+            if existing.get("status") == STATUS_COMPLETED:
+                return _replay(existing)
+            response = jsonify({"error": "A request with this Idempotency-Key is still being processed"})
+            response.headers["Retry-After"] = "1"
+            return response, 409
+
+        release = {"userId": user_id, "key": key, "status": STATUS_IN_PROGRESS}
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            collection.delete_one(release)
+            raise
+
+        if response.status_code >= 500 or response.is_streamed:
+            # Nothing safe to replay; let a retry run the request again
+            collection.delete_one(release)
+            return response
+
+        collection.update_one(release, {"$set": {
+            "status": STATUS_COMPLETED,
+            "response": {
+                "status": response.status_code,
+                "mimetype": response.mimetype,
+                "body": Binary(response.get_data())
+            },
+            "completedAt": datetime.now(timezone.utc)
+        }})
+        return response
+
+    return wrapper
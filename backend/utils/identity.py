@@ -0,0 +1,160 @@
+"""
+Victim identity resolution by phone number
+
+A complainant is either a registered victim (`victims`) or someone a police
+officer filed a complaint for before they signed up (`pre_registered_victims`).
+`normalize_phone` is the one place phone numbers are brought to E.164, and
+`VictimResolver` looks a number up in both collections with a single
+aggregation (`$unionWith`) instead of two serial `find_one` calls.
+
+Results are kept in a bounded per-worker LRU cache. Routes that register or
+promote a victim call `invalidate`; other workers see the change once their
+entry is older than IDENTITY_CACHE_SECONDS. Routes that write based on the
+answer (OTP verification, pre-registration) pass `fresh=True` so they never
+act on a stale entry.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+PHONE_PATTERN = re.compile(r"^(\+91[\-\s]?)?[0]?(91)?[789]\d{9}$")
+
+SOURCE_VICTIMS = "victims"
+SOURCE_PRE_REGISTERED = "pre_registered_victims"
+
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+IDENTITY_CACHE_SECONDS = float(os.getenv("IDENTITY_CACHE_SECONDS", "30"))
+
+
+def normalize_phone(phone):
+    """
+    Format a phone number to E.164, assuming India (+91) when no country code is given
+
+    Args:
+        phone: Phone number as entered by the user
+
+    Returns:
+        str: The formatted number, or None if the input is empty
+    """
+    if not phone:
+        return None
+    phone = str(phone).strip()
+    if not phone.startswith('+'):
+        if phone.startswith('91'):
+            phone = '+' + phone
+        else:
+            phone = '+91' + phone
+    return phone
+
+
+def is_valid_phone(phone):
+    """Check a formatted phone number against the accepted Indian mobile formats"""
+    return bool(phone and PHONE_PATTERN.match(phone))
+
+
+class VictimIdentity:
+    """
+    What is known about a phone number
+
+    `victim` and `pre_registered` are the raw documents (or None) and are
+    shared with the cache, so callers must not modify them.
+    """
+
+    __slots__ = ("phone", "victim", "pre_registered")
+
+    def __init__(self, phone, victim=None, pre_registered=None):
+        self.phone = phone
+        self.victim = victim
+        self.pre_registered = pre_registered
+
+    @property
+    def complainant(self):
+        """The document complaints should be linked to: the victim if registered"""
+        return self.victim or self.pre_registered
+
+
+class VictimResolver:
+    """
+    Resolve phone numbers to victims with a bounded LRU cache
+
+    Args:
+        max_size: Maximum number of phone numbers kept in the cache
+        ttl: Seconds a cached entry is trusted before it is looked up again
+    """
+
+    def __init__(self, max_size=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def pipeline(phone):
+        """Aggregation on `victims` returning the victim and pre-registration for a phone"""
+        def source(name):
+            return [
+                {"$match": {"phone": phone}},
+                {"$limit": 1},
+                {"$addFields": {"_source": name}}
+            ]
+
+        return source(SOURCE_VICTIMS) + [
+            {"$unionWith": {"coll": SOURCE_PRE_REGISTERED, "pipeline": source(SOURCE_PRE_REGISTERED)}}
+        ]
+
+    def _lookup(self, db, phone):
+        identity = VictimIdentity(phone)
+        for doc in db[SOURCE_VICTIMS].aggregate(self.pipeline(phone)):
+            if doc.pop("_source") == SOURCE_VICTIMS:
+                identity.victim = doc
+            else:
+                identity.pre_registered = doc
+        return identity
+
+    def _store(self, phone, identity):
+        with self._lock:
+            self._entries[phone] = (time.monotonic(), identity)
+            self._entries.move_to_end(phone)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def resolve(self, db, phone, fresh=False):
+        """
+        Look up a formatted phone number in both victim collections
+
+        Args:
+            db: PyMongo database handle
+            phone: Phone number already passed through `normalize_phone`
+            fresh: Skip the cache (the result still refreshes it)
+
+        Returns:
+            VictimIdentity
+        """
+        if not fresh:
+            with self._lock:
+                entry = self._entries.get(phone)
+                if entry is not None:
+                    if time.monotonic() - entry[0] < self.ttl:
+                        self._entries.move_to_end(phone)
+                        return entry[1]
+                    del self._entries[phone]
+
+        identity = self._lookup(db, phone)
+        self._store(phone, identity)
+        return identity
+
+    def invalidate(self, *phones):
+        """Drop cached entries after a victim is registered, pre-registered or promoted"""
+        with self._lock:
+            for phone in phones:
+                self._entries.pop(phone, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by the auth and complaint routes
+victim_resolver = VictimResolver()
@@ -0,0 +1,219 @@
+"""
+Declarative registry of the MongoDB indexes used by the API routes
+
+Every hot lookup in the routes must be backed by an index declared here.
+`ensure_indexes` creates them idempotently (at boot and from manage.py),
+`index_drift` compares the declared indexes against what the server has, and
+`check_query_plans` runs `explain()` on each route's query shape and reports
+any that fall back to a collection scan.
+"""
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+# collection name -> list of index declarations
+INDEXES = {
+    "victims": [
+        {"keys": [("phone", ASCENDING)], "name": "phone_1"},
+    ],
+    "pre_registered_victims": [
+        {"keys": [("phone", ASCENDING)], "name": "phone_1"},
+    ],
+    "police": [
+        {"keys": [("email", ASCENDING)], "name": "email_1"},
+    ],
+    "complaints": [
+        # Victim listing and ownership lookups
+        {"keys": [("complainantId", ASCENDING), ("filedAt", DESCENDING)], "name": "complainantId_1_filedAt_-1"},
+        # OTP flow and victim promotion look complaints up by phone
+        {"keys": [("complainantPhone", ASCENDING)], "name": "complainantPhone_1"},
+        # Keyset pagination of the police listing
+        {"keys": [("filedAt", DESCENDING), ("_id", DESCENDING)], "name": "filedAt_-1__id_-1"},
+        # Delta sync (?since=) walks changes in (updatedAt, _id) order
+        {"keys": [("updatedAt", ASCENDING), ("_id", ASCENDING)], "name": "updatedAt_1__id_1"},
+        {"keys": [("complainantId", ASCENDING), ("updatedAt", ASCENDING), ("_id", ASCENDING)],
+         "name": "complainantId_1_updatedAt_1__id_1"},
+        # Near-duplicate lookup by LSH band key (multikey)
+        {"keys": [("lshBuckets", ASCENDING)], "name": "lshBuckets_1"},
+    ],
+    "case_notes": [
+        {"keys": [("complaint_id", ASCENDING), ("created_at", DESCENDING)], "name": "complaint_id_1_created_at_-1"},
+    ],
+    "notification_outbox": [
+        # Worker claims the oldest due entry
+        {"keys": [("status", ASCENDING), ("nextAttemptAt", ASCENDING)], "name": "status_1_nextAttemptAt_1"},
+    ],
+    "notifications": [
+        {"keys": [("outboxId", ASCENDING)], "name": "outboxId_1"},
+    ],
+    "otp_codes": [
+        # TTL: MongoDB removes codes once expires_at has passed
+        {"keys": [("expires_at", ASCENDING)], "name": "expires_at_1", "expireAfterSeconds": 0},
+    ],
+    "complaint_search_postings": [
+        # Search reads each query term's postings in descending weight order
+        {"keys": [("term", ASCENDING), ("w", DESCENDING)], "name": "term_1_w_-1"},
+        # Re-indexing a complaint replaces its postings
+        {"keys": [("complaintId", ASCENDING)], "name": "complaintId_1"},
+    ],
+    "integrity_leaves": [
+        # Next anchor batch: pending leaves in _id order
+        {"keys": [("batchId", ASCENDING), ("_id", ASCENDING)], "name": "batchId_1__id_1"},
+        # Leaves of a batch in tree order, for verification
+        {"keys": [("batchId", ASCENDING), ("index", ASCENDING)], "name": "batchId_1_index_1"},
+    ],
+    "integrity_batches": [
+        {"keys": [("status", ASCENDING)], "name": "status_1"},
+    ],
+    "idempotency_keys": [
+        # One claim per user and key; duplicate inserts identify a retry
+        {"keys": [("userId", ASCENDING), ("key", ASCENDING)], "name": "userId_1_key_1", "unique": True},
+        # TTL: stored responses are dropped once expiresAt has passed
+        {"keys": [("expiresAt", ASCENDING)], "name": "expiresAt_1", "expireAfterSeconds": 0},
+    ],
+}
+
+# Query shapes issued by the routes: (collection, filter, sort, description)
+# Values only need the right types; they do not have to match real documents.
+QUERY_SHAPES = [
+    ("victims", {"phone": "+919999999999"}, None, "victim lookup by phone"),
+    ("pre_registered_victims", {"phone": "+919999999999"}, None, "pre-registered victim lookup by phone"),
+    ("police", {"email": "officer@example.com"}, None, "police login by email"),
+    ("complaints", {"complainantId": "000000000000000000000000"}, None, "victim complaint listing"),
+    ("complaints", {"complainantPhone": "+919999999999"}, None, "complaints by phone"),
+    ("complaints", {"archived": {"$ne": True}}, [("filedAt", DESCENDING), ("_id", DESCENDING)], "police complaint listing"),
+    ("complaints", {"updatedAt": {"$gt": "2000-01-01T00:00:00+00:00"}}, [("updatedAt", ASCENDING), ("_id", ASCENDING)],
+     "police delta sync"),
+    ("complaints", {"complainantId": "000000000000000000000000", "updatedAt": {"$gt": "2000-01-01T00:00:00+00:00"}},
+     [("updatedAt", ASCENDING), ("_id", ASCENDING)], "victim delta sync"),
+    ("complaints", {"lshBuckets": {"$in": ["0:0000000000000000"]}, "archived": {"$ne": True}}, None,
+     "near-duplicate candidates"),
+    ("case_notes", {"complaint_id": "000000000000000000000000"}, [("created_at", DESCENDING)], "case notes for a complaint"),
+    ("case_notes", {"complaint_id": "000000000000000000000000", "visibility": "public"},
+     [("created_at", DESCENDING)], "public case notes for a complaint"),
+    ("notification_outbox", {"status": {"$in": ["pending", "processing"]}, "nextAttemptAt": {"$lte": datetime(2000, 1, 1)}},
+     [("nextAttemptAt", ASCENDING)], "notification worker claim"),
+    ("notifications", {"outboxId": ObjectId("000000000000000000000000")}, None, "notification history by outbox entry"),
+    ("complaint_search_postings", {"term": "theft"}, [("w", DESCENDING)], "search postings for a term"),
+    ("complaint_search_postings", {"complaintId": ObjectId("000000000000000000000000")}, None,
+     "search postings of a complaint"),
+    ("integrity_leaves", {"batchId": None}, [("_id", ASCENDING)], "pending integrity leaves"),
+    ("integrity_leaves", {"batchId": ObjectId("000000000000000000000000")}, [("index", ASCENDING)],
+     "integrity leaves of a batch"),
+    ("integrity_batches", {"status": "pending"}, None, "unanchored integrity batches"),
+    ("idempotency_keys", {"userId": "000000000000000000000000", "key": "retry-key"}, None, "idempotency key lookup"),
+]
+
+# Options that are reported by index_information() but are not part of a declaration
+_IGNORED_INDEX_FIELDS = {"key", "v", "ns", "name"}
+
+
+def _index_options(declaration):
+    return {k: v for k, v in declaration.items() if k not in ("keys", "name")}
+
+
+def ensure_indexes(db, registry=None):
+    """
+    Create every declared index. Safe to call repeatedly.
+
+    Args:
+        db: PyMongo database handle
+        registry: Optional registry to use instead of INDEXES
+
+    Returns:
+        dict: collection name -> list of index names that are in place
+    """
+    registry = registry or INDEXES
+    created = {}
+
+    for collection_name, declarations in registry.items():
+        models = [
+            IndexModel(declaration["keys"], name=declaration["name"], **_index_options(declaration))
+            for declaration in declarations
+        ]
+        created[collection_name] = db[collection_name].create_indexes(models)
+
+    return created
+
+
+def index_drift(db, registry=None):
+    """
+    Compare declared indexes with the indexes that exist on the server
+
+    Returns:
+        dict: {"missing": [...], "mismatched": [...], "unexpected": [...]}
+              Each entry is a (collection, index name) tuple, with the
+              existing definition appended for mismatches.
+    """
+    registry = registry or INDEXES
+    drift = {"missing": [], "mismatched": [], "unexpected": []}
+
+    for collection_name, declarations in registry.items():
+        existing = db[collection_name].index_information()
+        declared_names = set()
+
+        for declaration in declarations:
+            name = declaration["name"]
+            declared_names.add(name)
+
+            if name not in existing:
+                drift["missing"].append((collection_name, name))
+                continue
+
+            info = existing[name]
+            existing_keys = [
+                (field, int(direction) if isinstance(direction, (int, float)) else direction)
+                for field, direction in info["key"]
+            ]
+            existing_options = {k: v for k, v in info.items() if k not in _IGNORED_INDEX_FIELDS}
+            if existing_keys != list(declaration["keys"]) or existing_options != _index_options(declaration):
+                drift["mismatched"].append((collection_name, name, info))
+
+        for name in existing:
+            if name != "_id_" and name not in declared_names:
+                drift["unexpected"].append((collection_name, name))
+
+    return drift
+
+
+def _plan_stages(plan):
+    """Yield every stage name in an explain() plan tree"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+def check_query_plans(db, shapes=None):
+    """
+    Run explain() on every route query shape
+
+    Returns:
+        list: (collection, description, stages) for each shape whose winning
+              plan contains a COLLSCAN. An empty list means every shape is
+              served by an index.
+    """
+    shapes = shapes or QUERY_SHAPES
+    failures = []
+
+    for collection_name, query, sort, description in shapes:
+        cursor = db[collection_name].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+
+        try:
+            explanation = cursor.explain()
+        except OperationFailure as e:
+            failures.append((collection_name, description, [f"explain failed: {e}"]))
+            continue
+
+        stages = list(_plan_stages(explanation.get("queryPlanner", {}).get("winningPlan", {})))
+        if "COLLSCAN" in stages:
+            failures.append((collection_name, description, stages))
+
+    return failures
@@ -0,0 +1,616 @@
+"""
+Tamper evidence for complaints: canonical hashes, Merkle batches and anchors
+
+Every complaint gets a leaf in `integrity_leaves` when it is filed or
+imported, holding its canonical hash. The hash is byte-for-byte the one
+`blockchain_dev/blockchain/storeMongoData.js` computes (`hashComplaint`), so
+both tools agree on what a complaint's hash is.
+
+Instead of one chain transaction per complaint, `python manage.py
+anchor-integrity` groups pending leaves into Merkle trees of up to
+INTEGRITY_BATCH_SIZE leaves and anchors only each tree's root through an
+anchor backend. The default backend is a local SQLite file standing in for
+the chain; a contract backend (e.g. `storeHash(root)` on MongoDataStorage)
+plugs in through `register_anchor_backend`.
+
+An inclusion proof lists the sibling hash at each level of the tree, so a
+client checks it with log2(batch size) hashes (`verify_proof`):
+
+    leaf node     = keccak256(0x00 || complaint hash)
+    interior node = keccak256(0x01 || left || right)
+
+The prefixes keep a leaf from being passed off as an interior node. A node
+without a sibling is carried up to the next level unchanged.
+
+The hash covers `complainantId`, which is rewritten when a pre-registered
+victim registers (`relink_complaints`). The complaint's leaf is then
+re-hashed; if it was already sealed into a batch, the sealed leaf is kept as
+a history entry (`complaintId`, plus the `complainantId` it was hashed with)
+and the new leaf links to it through `previousLeafId`.
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from bson import ObjectId
+from Crypto.Hash import keccak
+from pymongo import InsertOne, UpdateOne
+from utils.db_utils import run_in_transaction
+
+LEAVES_COLLECTION = "integrity_leaves"
+BATCHES_COLLECTION = "integrity_batches"
+
+INTEGRITY_BATCH_SIZE = int(os.getenv("INTEGRITY_BATCH_SIZE", "1024"))
+INTEGRITY_ANCHOR_BACKEND = os.getenv("INTEGRITY_ANCHOR_BACKEND", "sqlite")
+INTEGRITY_ANCHOR_PATH = os.getenv("INTEGRITY_ANCHOR_PATH", "integrity_anchors.sqlite3")
+
+BATCH_PENDING = "pending"
+BATCH_ANCHORED = "anchored"
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+# Stands in for `undefined`: JSON.stringify leaves such keys out
+_MISSING = object()
+
+
+def keccak256(data):
+    """Keccak-256 digest (the Ethereum variant, not SHA3-256) of bytes"""
+    return keccak.new(digest_bits=256, data=data).digest()
+
+
+def _to_hex(digest):
+    return "0x" + digest.hex()
+
+
+def _from_hex(value):
+    return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+
+
+def _js_sort_key(value):
+    # Array.prototype.sort() compares the UTF-16 code units of String(value)
+    if isinstance(value, bool):
+        text = "true" if value else "false"
+    elif value is None:
+        text = "null"
+    else:
+        text = str(value)
+    return text.encode("utf-16-be")
+
+
+def _sort_arrays(value):
+    # The JSON.stringify replacer in hashComplaint sorts every array
+    if isinstance(value, list):
+        return sorted((_sort_arrays(item) for item in value), key=_js_sort_key)
+    if isinstance(value, dict):
+        return {key: _sort_arrays(item) for key, item in value.items()}
+    return value
+
+
+def _nested(value):
+    # mongoose leaves missing or empty nested objects out of the JSON
+    if not isinstance(value, dict) or not value:
+        return _MISSING
+    return value
+
+
+def canonical_complaint(complaint):
+    """
+    Serialize the hashed fields of a complaint exactly as `hashComplaint` does
+
+    Args:
+        complaint: Complaint document with `_id`
+
+    Returns:
+        str: Compact JSON with the fields in hashComplaint's order
+    """
+    legal_classification = complaint.get("legalClassification")
+    legal_sections = legal_classification.get("ipc_sections") if isinstance(legal_classification, dict) else None
+
+    fields = [
+        ("id", str(complaint["_id"])),
+        ("text", complaint.get("text", _MISSING)),
+        ("complainantId", complaint.get("complainantId", _MISSING)),
+        ("complainantName", complaint.get("complainantName", _MISSING)),
+        ("filedAt", complaint.get("filedAt", _MISSING)),
+        ("filedBy", _nested(complaint.get("filedBy"))),
+        ("incidentDetails", _nested(complaint.get("incidentDetails"))),
+        ("legalSections", legal_sections or []),
+        ("suggestedSections", complaint.get("suggestedSections") or []),
+    ]
+    normalized = {key: _sort_arrays(value) for key, value in fields if value is not _MISSING}
+    return json.dumps(normalized, ensure_ascii=False, separators=(",", ":"))
+
+
+def complaint_hash(complaint):
+    """
+    Canonical hash of a complaint, "0x"-prefixed like web3.utils.keccak256
+
+    Returns:
+        str
+    """
+    return _to_hex(keccak256(canonical_complaint(complaint).encode("utf-8")))
+
+
+def build_leaf(complaint):
+    """Pending `integrity_leaves` document for a newly stored complaint"""
+    return {
+        "_id": complaint["_id"],
+        "hash": complaint_hash(complaint),
+        "batchId": None,
+        "createdAt": datetime.now(timezone.utc)
+    }
+
+
+def record_complaints(db, complaints, session=None):
+    """
+    Record the canonical hashes of stored complaints for the next anchor batch
+
+    Args:
+        db: PyMongo database handle
+        complaints: Complaint documents with `_id`
+        session: Session of the transaction that stored the complaints
+    """
+    leaves = [build_leaf(complaint) for complaint in complaints]
+    if leaves:
+        db[LEAVES_COLLECTION].insert_many(leaves, ordered=False, session=session)
+
+
+def _as_hashed(complaint, leaf):
+    # History leaves were hashed with the complainantId the complaint had then
+    if "complaintId" not in leaf:
+        return complaint
+    recorded = dict(complaint)
+    recorded.pop("complainantId", None)
+    if "complainantId" in leaf:
+        recorded["complainantId"] = leaf["complainantId"]
+    return recorded
+
+
+def relink_complaints(db, complaints, complainant_id, session=None):
+    """
+    Re-record the hashes of complaints whose complainantId is being rewritten
+
+    Args:
+        db: PyMongo database handle
+        complaints: The complaints as stored before the rewrite, with `_id`
+        complainant_id: The complainantId they are given
+        session: Session of the transaction that rewrites them
+
+    Returns:
+        int: Number of leaves re-hashed
+    """
+    complaints = list(complaints)
+    leaves = {
+        leaf["_id"]: leaf
+        for leaf in db[LEAVES_COLLECTION].find({"_id": {"$in": [complaint["_id"] for complaint in complaints]}},
+                                               session=session)
+    }
+    now = datetime.now(timezone.utc)
+    writes = []
+    for complaint in complaints:
+        leaf = leaves.get(complaint["_id"])
+        if leaf is None:
+            # Not recorded yet; `anchor-integrity --backfill` hashes the rewritten complaint
+            continue
+        new_hash = complaint_hash(dict(complaint, complainantId=complainant_id))
+        if new_hash == leaf["hash"]:
+            continue
+        if leaf.get("batchId") is None:
+            writes.append(UpdateOne({"_id": leaf["_id"]}, {"$set": {"hash": new_hash, "createdAt": now}}))
+            continue
+
+        # The sealed leaf stays in its batch so the batch root still verifies
+        history = {
+            "_id": ObjectId(),
+            "complaintId": complaint["_id"],
+            "hash": leaf["hash"],
+            "batchId": leaf["batchId"],
+            "index": leaf["index"],
+            "createdAt": leaf["createdAt"],
+            "supersededAt": now
+        }
+        if "complainantId" in complaint:
+            history["complainantId"] = complaint["complainantId"]
+        writes.append(InsertOne(history))
+        writes.append(UpdateOne({"_id": leaf["_id"]}, {
+            "$set": {"hash": new_hash, "batchId": None, "createdAt": now, "previousLeafId": history["_id"]},
+            "$unset": {"index": ""}
+        }))
+    if writes:
+        db[LEAVES_COLLECTION].bulk_write(writes, ordered=True, session=session)
+    return sum(1 for write in writes if isinstance(write, UpdateOne))
+
+
+def merkle_levels(leaf_hashes):
+    """
+    Build a Merkle tree
+
+    Args:
+        leaf_hashes: Complaint hashes ("0x" hex) in leaf order
+
+    Returns:
+        list: Levels of node digests (bytes), from the leaves up to the root
+    """
+    level = [keccak256(LEAF_PREFIX + _from_hex(leaf)) for leaf in leaf_hashes]
+    levels = [level]
+    while len(level) > 1:
+        parents = [
+            keccak256(NODE_PREFIX + level[index] + level[index + 1])
+            for index in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            parents.append(level[-1])
+        level = parents
+        levels.append(level)
+    return levels
+
+
+def merkle_proof(levels, index):
+    """
+    Sibling hashes from leaf `index` up to the root
+
+    Returns:
+        list: [{"position": "left" | "right", "hash": "0x..."}], bottom-up
+    """
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({
+                "position": "left" if sibling < index else "right",
+                "hash": _to_hex(level[sibling])
+            })
+        index //= 2
+    return proof
+
+
+def verify_proof(leaf_hash, proof, root):
+    """
+    Check an inclusion proof in O(len(proof)) hashes
+
+    Args:
+        leaf_hash: The complaint's canonical hash
+        proof: Output of `merkle_proof`
+        root: Merkle root of the batch ("0x" hex)
+
+    Returns:
+        bool
+    """
+    try:
+        node = keccak256(LEAF_PREFIX + _from_hex(leaf_hash))
+        for step in proof:
+            sibling = _from_hex(step["hash"])
+            if step["position"] == "left":
+                node = keccak256(NODE_PREFIX + sibling + node)
+            else:
+                node = keccak256(NODE_PREFIX + node + sibling)
+        return _to_hex(node) == root
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+class AnchorBackend:
+    """
+    Where Merkle roots are anchored
+
+    Subclasses implement `anchor`, which stores a root and returns a reference
+    to the record (e.g. a transaction hash), and `lookup`, which returns the
+    reference for a stored root or None.
+    """
+
+    name = None
+
+    def anchor(self, root, size):
+        raise NotImplementedError
+
+    def lookup(self, root):
+        raise NotImplementedError
+
+
+class SqliteAnchorBackend(AnchorBackend):
+    """
+    Local stand-in for the chain: an append-only table of roots in a SQLite file
+
+    Args:
+        path: SQLite database file
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path=INTEGRITY_ANCHOR_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS anchors ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, root TEXT NOT NULL UNIQUE, "
+                "leaves INTEGER NOT NULL, anchored_at TEXT NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def _reference(self, row_id):
+        return f"sqlite:{os.path.basename(self.path)}#{row_id}"
+
+    def anchor(self, root, size):
+        with self._lock, self._connect() as connection:
+            # Anchoring the same root again returns the existing record
+            connection.execute(
+                "INSERT OR IGNORE INTO anchors (root, leaves, anchored_at) VALUES (?, ?, ?)",
+                (root, size, datetime.now(timezone.utc).isoformat())
+            )
+            row = connection.execute("SELECT id FROM anchors WHERE root = ?", (root,)).fetchone()
+        return self._reference(row[0])
+
+    def lookup(self, root):
+        with self._connect() as connection:
+            row = connection.execute("SELECT id FROM anchors WHERE root = ?", (root,)).fetchone()
+        return self._reference(row[0]) if row else None
+
+
+# Backend name -> factory taking no arguments
+ANCHOR_BACKENDS = {
+    SqliteAnchorBackend.name: SqliteAnchorBackend,
+}
+
+
+_backend_instances = {}
+_backend_lock = threading.Lock()
+
+
+def register_anchor_backend(name, factory):
+    """Make an anchor backend selectable with INTEGRITY_ANCHOR_BACKEND"""
+    ANCHOR_BACKENDS[name] = factory
+
+
+def get_anchor_backend(name=None):
+    """
+    The configured anchor backend, created once per process
+
+    Raises:
+        ValueError: If no backend is registered under the name
+    """
+    name = name or INTEGRITY_ANCHOR_BACKEND
+    if name not in ANCHOR_BACKENDS:
+        raise ValueError(f"Unknown integrity anchor backend: {name}")
+    with _backend_lock:
+        if name not in _backend_instances:
+            _backend_instances[name] = ANCHOR_BACKENDS[name]()
+        return _backend_instances[name]
+
+
+def _anchor_batch(db, backend, batch):
+    reference = backend.anchor(batch["root"], batch["size"])
+    anchor = {"backend": backend.name, "reference": reference, "anchoredAt": datetime.now(timezone.utc)}
+    db[BATCHES_COLLECTION].update_one(
+        {"_id": batch["_id"]},
+        {"$set": {"status": BATCH_ANCHORED, "anchor": anchor}}
+    )
+    return reference
+
+
+def seal_batch(db, client, batch_size=INTEGRITY_BATCH_SIZE):
+    """
+    Move up to `batch_size` pending leaves into a new Merkle batch
+
+    The leaves are claimed and the batch written in one transaction, so two
+    anchor runs never put a leaf in two batches.
+
+    Returns:
+        dict or None: The batch document, or None if nothing was pending
+    """
+    def write_batch(session):
+        leaves = list(
+            db[LEAVES_COLLECTION]
+            .find({"batchId": None}, {"hash": 1}, session=session)
+            .sort("_id", 1)
+            .limit(batch_size)
+        )
+        if not leaves:
+            return None
+
+        levels = merkle_levels([leaf["hash"] for leaf in leaves])
+        batch = {
+            "_id": ObjectId(),
+            "root": _to_hex(levels[-1][0]),
+            "size": len(leaves),
+            # Every level is kept so a proof is read, not recomputed
+            "levels": [[_to_hex(node) for node in level] for level in levels],
+            "status": BATCH_PENDING,
+            "anchor": None,
+            "createdAt": datetime.now(timezone.utc)
+        }
+        outcome = db[LEAVES_COLLECTION].bulk_write([
+            UpdateOne({"_id": leaf["_id"], "batchId": None}, {"$set": {"batchId": batch["_id"], "index": index}})
+            for index, leaf in enumerate(leaves)
+        ], ordered=False, session=session)
+        if outcome.modified_count != len(leaves):
+            raise RuntimeError("Integrity leaves were claimed by another anchor run")
+        db[BATCHES_COLLECTION].insert_one(batch, session=session)
+        return batch
+
+    return run_in_transaction(client, write_batch)
+
+
+def anchor_pending(db, client, backend, batch_size=INTEGRITY_BATCH_SIZE):
+    """
+    Anchor batches left pending by an earlier run, then seal and anchor new ones
+
+    Returns:
+        dict: {"batches": anchored batch count, "leaves": leaves they hold}
+    """
+    counts = {"batches": 0, "leaves": 0}
+
+    for batch in db[BATCHES_COLLECTION].find({"status": BATCH_PENDING}, {"root": 1, "size": 1}).sort("_id", 1):
+        _anchor_batch(db, backend, batch)
+        counts["batches"] += 1
+        counts["leaves"] += batch["size"]
+
+    while True:
+        batch = seal_batch(db, client, batch_size)
+        if batch is None:
+            return counts
+        reference = _anchor_batch(db, backend, batch)
+        print(f"Anchored {batch['size']} complaints under root {batch['root']} ({reference})")
+        counts["batches"] += 1
+        counts["leaves"] += batch["size"]
+
+
+def backfill_leaves(db, batch_size=1000):
+    """
+    Record hashes for complaints filed before integrity leaves existed
+
+    Returns:
+        int: Number of complaints recorded
+    """
+    recorded = 0
+    pipeline = [
+        {"$lookup": {"from": LEAVES_COLLECTION, "localField": "_id", "foreignField": "_id", "as": "_leaf"}},
+        {"$match": {"_leaf": {"$size": 0}}},
+        {"$project": {"_leaf": 0}}
+    ]
+    chunk = []
+    for complaint in db.complaints.aggregate(pipeline, batchSize=batch_size):
+        chunk.append(complaint)
+        if len(chunk) >= batch_size:
+            record_complaints(db, chunk)
+            recorded += len(chunk)
+            chunk = []
+    if chunk:
+        record_complaints(db, chunk)
+        recorded += len(chunk)
+    return recorded
+
+
+def _leaf_status(db, leaf, complaint, backend):
+    current_hash = complaint_hash(_as_hashed(complaint, leaf))
+    result = {
+        "hash": leaf["hash"],
+        "intact": current_hash == leaf["hash"],
+        "status": BATCH_PENDING,
+        "proof": None
+    }
+    if not result["intact"]:
+        result["currentHash"] = current_hash
+    if "complaintId" in leaf:
+        result["complainantId"] = leaf.get("complainantId")
+
+    batch = None
+    if leaf.get("batchId") is not None:
+        batch = db[BATCHES_COLLECTION].find_one({"_id": leaf["batchId"]})
+    if batch is None:
+        return result
+
+    levels = [[_from_hex(node) for node in level] for level in batch["levels"]]
+    proof = merkle_proof(levels, leaf["index"])
+    result.update({
+        "status": batch["status"],
+        "batchId": str(batch["_id"]),
+        "root": batch["root"],
+        "leafIndex": leaf["index"],
+        "batchSize": batch["size"],
+        "proof": proof,
+        "verified": verify_proof(leaf["hash"], proof, batch["root"]),
+        "anchor": batch.get("anchor")
+    })
+    if backend is not None and batch.get("anchor"):
+        result["anchorConfirmed"] = backend.lookup(batch["root"]) is not None
+    return result
+
+
+def inclusion_proof(db, complaint, backend=None):
+    """
+    Integrity status of a complaint with its Merkle inclusion proof
+
+    Args:
+        db: PyMongo database handle
+        complaint: The stored complaint, re-hashed to detect later edits
+        backend: Anchor backend to confirm the root against, if any
+
+    Returns:
+        dict or None: None if the complaint has no integrity record. Leaves
+                      it had before its complainantId was rewritten are
+                      listed, newest first, under "previous".
+    """
+    leaf = db[LEAVES_COLLECTION].find_one({"_id": complaint["_id"]})
+    if leaf is None:
+        return None
+
+    result = dict(_leaf_status(db, leaf, complaint, backend), complaintId=str(complaint["_id"]))
+    previous = []
+    previous_id = leaf.get("previousLeafId")
+    while previous_id is not None:
+        older = db[LEAVES_COLLECTION].find_one({"_id": previous_id})
+        if older is None:
+            break
+        previous.append(_leaf_status(db, older, complaint, backend))
+        previous_id = older.get("previousLeafId")
+    if previous:
+        result["previous"] = previous
+    return result
+
+
+def _altered(db, leaves):
+    # Complaint ids whose stored document no longer matches its leaf hash
+    complaint_ids = [leaf.get("complaintId", leaf["_id"]) for leaf in leaves]
+    complaints = {
+        complaint["_id"]: complaint
+        for complaint in db.complaints.find({"_id": {"$in": complaint_ids}})
+    }
+    altered, missing = [], []
+    for complaint_id, leaf in zip(complaint_ids, leaves):
+        complaint = complaints.get(complaint_id)
+        if complaint is None:
+            missing.append(str(complaint_id))
+        elif complaint_hash(_as_hashed(complaint, leaf)) != leaf["hash"]:
+            altered.append(str(complaint_id))
+    return altered, missing
+
+
+def verify_all(db, backend, batch_size=INTEGRITY_BATCH_SIZE):
+    """
+    Check the whole chain: complaint -> leaf hash -> batch root -> anchor
+
+    Every recorded complaint is re-hashed against each of its leaves, every
+    batch root is recomputed from its leaves and looked up in the anchor backend.
+
+    Returns:
+        dict: {"complaints": leaves checked, "altered": [ids], "missing": [ids],
+               "batches", "badRoots": [batch ids], "unanchored": [batch ids]}
+    """
+    report = {"complaints": 0, "altered": [], "missing": [], "batches": 0, "badRoots": [], "unanchored": []}
+
+    def check(leaves):
+        altered, missing = _altered(db, leaves)
+        report["complaints"] += len(leaves)
+        report["altered"].extend(altered)
+        report["missing"].extend(missing)
+
+    for batch in db[BATCHES_COLLECTION].find({}, {"root": 1, "status": 1}).sort("_id", 1):
+        leaves = list(
+            db[LEAVES_COLLECTION]
+            .find({"batchId": batch["_id"]}, {"hash": 1, "index": 1, "complaintId": 1, "complainantId": 1})
+            .sort("index", 1)
+        )
+        check(leaves)
+        report["batches"] += 1
+        batch_id = str(batch["_id"])
+        if not leaves or _to_hex(merkle_levels([leaf["hash"] for leaf in leaves])[-1][0]) != batch["root"]:
+            report["badRoots"].append(batch_id)
+        if batch["status"] == BATCH_ANCHORED and backend.lookup(batch["root"]) is None:
+            report["unanchored"].append(batch_id)
+
+    # Leaves not batched yet are checked against their complaints only
+    chunk = []
+    for leaf in db[LEAVES_COLLECTION].find({"batchId": None}, {"hash": 1}, batch_size=batch_size):
+        chunk.append(leaf)
+        if len(chunk) >= batch_size:
+            check(chunk)
+            chunk = []
+    if chunk:
+        check(chunk)
+
+    return report
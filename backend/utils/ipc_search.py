@@ -0,0 +1,240 @@
+"""
+In-memory typeahead index over IPC sections
+
+Sections are indexed by number, title, keywords and description. Query terms
+are matched against a prefix table (so "assa" finds "assault" and "49" finds
+"498A"), and terms with no prefix match fall back to trigram similarity over
+the indexed vocabulary, which tolerates typos such as "harrasment".
+
+The index is kept in sync with the reference data cache: `sync()` is given
+the current snapshot and only re-indexes sections whose content changed.
+"""
+import hashlib
+import heapq
+import re
+import threading
+import unicodedata
+
+MAX_PREFIX_LENGTH = 12
+MIN_TRIGRAM_SIMILARITY = 0.3
+
+# Field -> weight of a match in that field
+FIELD_WEIGHTS = {
+    "number": 8.0,
+    "title": 3.0,
+    "keywords": 3.0,
+    "description": 1.0,
+}
+
+# Words that add nothing to a section lookup
+QUERY_STOPWORDS = {"ipc", "section", "sec", "s", "u", "under", "of", "the", "and", "or", "a", "an", "to", "in"}
+
+_TOKEN_PATTERN = re.compile(r"[0-9a-z\u0900-\u097f]+")
+
+
+def tokenize(text):
+    """Lowercase, normalize and split text into index terms"""
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        text = " ".join(str(item) for item in text)
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    return _TOKEN_PATTERN.findall(text)
+
+
+def _trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _section_fields(section):
+    """Extract the searchable text of a section document"""
+    number = section.get("number") or section.get("section") or ""
+    return {
+        "number": [t for t in tokenize(number) if t not in QUERY_STOPWORDS],
+        "title": tokenize(section.get("title")),
+        "keywords": tokenize(section.get("keywords")),
+        "description": tokenize(section.get("description")),
+    }
+
+
+def _fingerprint(section):
+    raw = repr(sorted((key, repr(value)) for key, value in section.items()))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class IPCSearchIndex:
+    """Prefix + trigram index over IPC section documents"""
+
+    def __init__(self):
+        self._sections = {}      # id -> section document
+        self._fingerprints = {}  # id -> content fingerprint
+        self._postings = {}      # id -> {term: weight} contributed by the section
+        self._terms = {}         # term -> {id: weight}
+        self._prefixes = {}      # prefix -> {id: weight}
+        self._trigrams = {}      # trigram -> set of terms
+        self._snapshot_etag = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sections)
+
+    # Indexing
+
+    def _add(self, section_id, section):
+        postings = {}
+        for field, terms in _section_fields(section).items():
+            weight = FIELD_WEIGHTS[field]
+            for term in terms:
+                if weight > postings.get(term, 0):
+                    postings[term] = weight
+
+        for term, weight in postings.items():
+            docs = self._terms.setdefault(term, {})
+            if not docs:
+                for trigram in _trigrams(term):
+                    self._trigrams.setdefault(trigram, set()).add(term)
+            docs[section_id] = weight
+
+            for length in range(1, min(len(term), MAX_PREFIX_LENGTH) + 1):
+                prefix_docs = self._prefixes.setdefault(term[:length], {})
+                if weight > prefix_docs.get(section_id, 0):
+                    prefix_docs[section_id] = weight
+
+        self._sections[section_id] = section
+        self._fingerprints[section_id] = _fingerprint(section)
+        self._postings[section_id] = postings
+
+    def _remove(self, section_id):
+        postings = self._postings.pop(section_id, {})
+        for term in postings:
+            docs = self._terms.get(term, {})
+            docs.pop(section_id, None)
+            if not docs:
+                self._terms.pop(term, None)
+                for trigram in _trigrams(term):
+                    terms = self._trigrams.get(trigram)
+                    if terms is not None:
+                        terms.discard(term)
+                        if not terms:
+                            del self._trigrams[trigram]
+
+            for length in range(1, min(len(term), MAX_PREFIX_LENGTH) + 1):
+                prefix = term[:length]
+                prefix_docs = self._prefixes.get(prefix)
+                if prefix_docs is not None:
+                    prefix_docs.pop(section_id, None)
+                    if not prefix_docs:
+                        del self._prefixes[prefix]
+
+        self._sections.pop(section_id, None)
+        self._fingerprints.pop(section_id, None)
+
+    def update(self, sections):
+        """
+        Bring the index in line with `sections`, re-indexing only the
+        sections that were added, removed or changed
+
+        Returns:
+            tuple: (added or changed count, removed count)
+        """
+        with self._lock:
+            incoming = {}
+            for section in sections:
+                section_id = section.get("id") or str(section.get("_id"))
+                incoming[section_id] = section
+
+            removed = [section_id for section_id in self._sections if section_id not in incoming]
+            for section_id in removed:
+                self._remove(section_id)
+
+            changed = 0
+            for section_id, section in incoming.items():
+                if self._fingerprints.get(section_id) == _fingerprint(section):
+                    continue
+                if section_id in self._sections:
+                    self._remove(section_id)
+                self._add(section_id, section)
+                changed += 1
+
+            return changed, len(removed)
+
+    def sync(self, snapshot):
+        """Update the index from a reference cache snapshot if it changed"""
+        if snapshot.etag == self._snapshot_etag:
+            return
+        changed, removed = self.update(snapshot.documents)
+        self._snapshot_etag = snapshot.etag
+        print(f"IPC search index synced: {changed} sections indexed, {removed} removed")
+
+    # Querying
+
+    def _fuzzy_terms(self, token):
+        """Indexed terms whose trigram similarity to `token` is high enough"""
+        query_trigrams = _trigrams(token)
+        shared = {}
+        for trigram in query_trigrams:
+            for term in self._trigrams.get(trigram, ()):
+                shared[term] = shared.get(term, 0) + 1
+
+        matches = {}
+        for term, count in shared.items():
+            similarity = count / (len(query_trigrams) + len(_trigrams(term)) - count)
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                matches[term] = similarity
+        return matches
+
+    def _token_scores(self, token):
+        """Map section id -> score for a single query token"""
+        exact = self._terms.get(token, {})
+        # Prefixes are only stored up to MAX_PREFIX_LENGTH, so longer tokens
+        # can only match whole words (or fuzzily)
+        prefix = self._prefixes.get(token, {}) if len(token) <= MAX_PREFIX_LENGTH else {}
+
+        scores = {}
+        for section_id, weight in prefix.items():
+            scores[section_id] = weight
+        for section_id, weight in exact.items():
+            # Whole-word matches rank above prefix matches
+            scores[section_id] = weight * 2
+
+        if not scores and len(token) >= 3:
+            for term, similarity in self._fuzzy_terms(token).items():
+                for section_id, weight in self._terms[term].items():
+                    score = weight * similarity
+                    if score > scores.get(section_id, 0):
+                        scores[section_id] = score
+
+        return scores
+
+    def search(self, query, limit=10):
+        """
+        Return up to `limit` sections ranked by relevance to `query`
+
+        Every query token must match a section (by prefix, whole word or
+        fuzzily) for the section to be returned.
+        """
+        tokens = [token for token in tokenize(query) if token not in QUERY_STOPWORDS] or tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            totals = None
+            for token in tokens:
+                scores = self._token_scores(token)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {
+                        section_id: total + scores[section_id]
+                        for section_id, total in totals.items()
+                        if section_id in scores
+                    }
+                if not totals:
+                    return []
+
+            best = heapq.nlargest(limit, totals.items(), key=lambda item: item[1])
+            return [dict(self._sections[section_id], score=round(score, 3)) for section_id, score in best]
+
+
+ipc_search_index = IPCSearchIndex()
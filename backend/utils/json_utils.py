@@ -1,8 +1,15 @@
 from bson import ObjectId
+import base64
 import json
+import os
 from datetime import datetime
 from flask.json.provider import JSONProvider
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib provider is used without it
+    orjson = None
+
 class MongoJSONEncoder(json.JSONEncoder):
     """
     Custom JSONEncoder that handles MongoDB ObjectId and other non-serializable types
@@ -12,6 +19,8 @@ class MongoJSONEncoder(json.JSONEncoder):
             return str(obj)
         if isinstance(obj, datetime):
             return obj.isoformat()
+        if isinstance(obj, bytes):
+            return base64.b64encode(obj).decode("ascii")
         return super().default(obj)
 
 class MongoJSONProvider(JSONProvider):
@@ -21,13 +30,71 @@ class MongoJSONProvider(JSONProvider):
     def dumps(self, obj, **kwargs):
         kwargs.setdefault('cls', MongoJSONEncoder)
         return json.dumps(obj, **kwargs)
-    
+
     def loads(self, s, **kwargs):
         return json.loads(s, **kwargs)
 
+    def dumps_bytes(self, obj):
+        return self.dumps(obj).encode("utf-8")
+
+def _orjson_default(obj):
+    # orjson handles datetime itself and only calls back for the types below
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, bytes):
+        return base64.b64encode(obj).decode("ascii")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class OrjsonMongoJSONProvider(MongoJSONProvider):
+    """
+    JSON provider backed by orjson
+
+    Serialization runs in native code: datetimes are encoded by orjson itself
+    (in the same ISO 8601 form as `datetime.isoformat()`), and responses are
+    built straight from the encoded bytes. Calls with stdlib-only options such
+    as `indent`, or values orjson rejects (e.g. integers above 64 bits), fall
+    back to MongoJSONProvider.
+    """
+    OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps_bytes(self, obj):
+        try:
+            return orjson.dumps(obj, default=_orjson_default, option=self.OPTIONS)
+        except orjson.JSONEncodeError:
+            return MongoJSONProvider.dumps(self, obj).encode("utf-8")
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b"\n", mimetype="application/json")
+
+def select_json_provider():
+    """
+    Pick the JSON provider class from the JSON_PROVIDER environment variable:
+    "orjson", "stdlib", or "auto" (default, orjson when it is installed)
+    """
+    choice = os.getenv("JSON_PROVIDER", "auto").lower()
+    if choice == "stdlib":
+        return MongoJSONProvider
+    if orjson is None:
+        if choice == "orjson":
+            print("JSON_PROVIDER=orjson but orjson is not installed, using the stdlib provider")
+        return MongoJSONProvider
+    return OrjsonMongoJSONProvider
+
 def configure_json_encoding(app):
     """
-    Configure Flask app to use the custom JSONEncoder
+    Configure Flask app to use the custom JSON provider
     """
-    app.json_provider_class = MongoJSONProvider
+    app.json_provider_class = select_json_provider()
     app.json = app.json_provider_class(app)
+    print(f"Using JSON provider: {app.json_provider_class.__name__}")
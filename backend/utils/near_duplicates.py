@@ -0,0 +1,181 @@
+"""
+Near-duplicate complaint detection with MinHash and locality-sensitive hashing
+
+The same incident is often reported twice, by the victim and again by police
+on their behalf. Every complaint stores a MinHash signature of its text
+(`minhash`) and the LSH band keys derived from it (`lshBuckets`, indexed).
+Complaints whose texts overlap share at least one band key with high
+probability, so duplicates are found with one indexed `$in` query on the
+new complaint's band keys instead of comparing it against every complaint.
+Candidates are then confirmed by the similarity their signatures estimate.
+
+Text is shingled into pairs of consecutive tokens from the classifier's
+tokenizer (stopwords removed, stemmed, English and Hindi), so small wording
+changes still leave most shingles intact.
+
+With NUM_PERM = BANDS * ROWS_PER_BAND = 32 * 4, two complaints with Jaccard
+similarity 0.5 become candidates with probability ~0.87, and at 0.7 with
+~0.9996. Changing any of these constants or the seed changes every
+signature; run `python manage.py backfill-duplicate-signatures --all` after.
+"""
+import hashlib
+import os
+import numpy as np
+from pymongo import UpdateOne
+from utils.text_analysis import tokenize
+
+NUM_PERM = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 2
+
+# Hash functions are (a * x + b) mod p over 32-bit shingle hashes; p is the
+# Mersenne prime 2^31 - 1 so a * x + b stays within uint64
+_PRIME = np.uint64((1 << 31) - 1)
+_SEED = 20240601
+_random = np.random.RandomState(_SEED)
+_A = _random.randint(1, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+_B = _random.randint(0, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+
+# Estimated Jaccard similarity above which a candidate is reported
+DUPLICATE_SIMILARITY = float(os.getenv("DUPLICATE_SIMILARITY", "0.5"))
+# Candidates read per lookup, so a crowded bucket cannot make a lookup expensive
+MAX_DUPLICATE_CANDIDATES = 50
+# Duplicates reported per complaint
+MAX_DUPLICATES = 5
+
+SIGNATURE_FIELDS = ("minhash", "lshBuckets")
+
+# Complaint fields returned for each possible duplicate
+DUPLICATE_PROJECTION = {
+    "minhash": 1, "text": 1, "status": 1, "filedAt": 1, "complainantName": 1, "firNumber": 1
+}
+DUPLICATE_PREVIEW_LENGTH = 100
+
+
+def shingles(text, language=None):
+    """Set of token shingles of a text (single tokens for very short texts)"""
+    tokens = tokenize(text or "", language)
+    if len(tokens) < SHINGLE_SIZE:
+        return set(tokens)
+    return {
+        " ".join(tokens[start:start + SHINGLE_SIZE])
+        for start in range(len(tokens) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash_signature(text, language=None):
+    """
+    MinHash signature of a text
+
+    Returns:
+        list or None: NUM_PERM ints, or None if the text has no tokens
+    """
+    features = shingles(text, language)
+    if not features:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest(), "big")
+         for feature in features),
+        dtype=np.uint64,
+        count=len(features)
+    )
+    permuted = (np.outer(hashes, _A) + _B) % _PRIME
+    return permuted.min(axis=0).tolist()
+
+
+def lsh_buckets(signature):
+    """Band keys of a signature, one "<band>:<hash of its rows>" per band"""
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(repr(rows).encode("ascii"), digest_size=8).hexdigest()
+        buckets.append(f"{band}:{digest}")
+    return buckets
+
+
+def signature_fields(text, language=None):
+    """
+    Fields to store on a complaint for duplicate detection
+
+    Returns:
+        dict: {"minhash", "lshBuckets"}, empty if the text has no tokens
+    """
+    signature = minhash_signature(text, language)
+    if signature is None:
+        return {}
+    return {"minhash": signature, "lshBuckets": lsh_buckets(signature)}
+
+
+def estimate_similarity(signature, other):
+    """Estimated Jaccard similarity of the texts behind two signatures"""
+    if not signature or not other or len(signature) != len(other):
+        return 0.0
+    return float(np.mean(np.asarray(signature) == np.asarray(other)))
+
+
+def find_duplicates(db, complaint, exclude_id=None):
+    """
+    Find complaints that are probably the same report as `complaint`
+
+    Args:
+        db: PyMongo database handle
+        complaint: Complaint with `minhash` and `lshBuckets`
+        exclude_id: ObjectId of the complaint itself, once it is stored
+
+    Returns:
+        list: Up to MAX_DUPLICATES {"id", "similarity", "text", "status", ...},
+              most similar first
+    """
+    signature = complaint.get("minhash")
+    buckets = complaint.get("lshBuckets")
+    if not signature or not buckets:
+        return []
+
+    query = {"lshBuckets": {"$in": buckets}, "archived": {"$ne": True}}
+    if exclude_id is not None:
+        query["_id"] = {"$ne": exclude_id}
+
+    duplicates = []
+    for candidate in db.complaints.find(query, DUPLICATE_PROJECTION).limit(MAX_DUPLICATE_CANDIDATES):
+        similarity = estimate_similarity(signature, candidate.pop("minhash", None))
+        if similarity < DUPLICATE_SIMILARITY:
+            continue
+        candidate["id"] = str(candidate.pop("_id"))
+        candidate["similarity"] = round(similarity, 3)
+        text = candidate.get("text")
+        if text and len(text) > DUPLICATE_PREVIEW_LENGTH:
+            candidate["text"] = text[:DUPLICATE_PREVIEW_LENGTH] + "..."
+        duplicates.append(candidate)
+
+    duplicates.sort(key=lambda duplicate: duplicate["similarity"], reverse=True)
+    return duplicates[:MAX_DUPLICATES]
+
+
+def backfill_signatures(db, recompute=False, batch_size=1000):
+    """
+    Store signatures on complaints filed before duplicate detection existed
+
+    Args:
+        db: PyMongo database handle
+        recompute: Recompute every signature, not only missing ones
+        batch_size: Complaints updated per bulk write
+
+    Returns:
+        int: Number of complaints updated
+    """
+    query = {} if recompute else {"minhash": {"$exists": False}}
+    updated = 0
+    writes = []
+    for complaint in db.complaints.find(query, {"text": 1, "language": 1}, batch_size=batch_size):
+        fields = signature_fields(complaint.get("text"), complaint.get("language"))
+        if fields:
+            writes.append(UpdateOne({"_id": complaint["_id"]}, {"$set": fields}))
+        elif recompute:
+            writes.append(UpdateOne({"_id": complaint["_id"]}, {"$unset": {field: "" for field in SIGNATURE_FIELDS}}))
+        if len(writes) >= batch_size:
+            updated += db.complaints.bulk_write(writes, ordered=False).modified_count
+            writes = []
+    if writes:
+        updated += db.complaints.bulk_write(writes, ordered=False).modified_count
+    return updated
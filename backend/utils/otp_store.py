@@ -0,0 +1,239 @@
+"""
+Pluggable storage for one-time passwords
+
+Both backends implement the same semantics the auth routes have always used:
+a 6-digit code valid for 10 minutes, at most 3 verification attempts, and the
+code is consumed on successful verification.
+
+- InMemoryOTPStore keeps codes in a dict and sweeps expired entries with a
+  min-heap ordered by expiry. It is only correct with a single process.
+- MongoOTPStore keeps codes in the `otp_codes` collection with a TTL index and
+  counts attempts with an atomic `find_one_and_update`, so it works across any
+  number of workers and nodes.
+
+Select the backend with the OTP_STORE environment variable ("mongo" or
+"memory"); Mongo is the default.
+
+Codes are stored as an HMAC-SHA256 of the phone number and code, keyed with
+OTP_HASH_KEY (or JWT_SECRET_KEY when it is not set). With only a million
+possible codes a plain hash is brute-forced instantly, so the key is what
+keeps a database read from revealing live OTPs; every worker must share it.
+"""
+import hashlib
+import heapq
+import hmac
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from pymongo import ReturnDocument
+
+OTP_TTL_SECONDS = 600  # OTP valid for 10 minutes
+OTP_MAX_ATTEMPTS = 3
+OTP_COLLECTION = "otp_codes"
+
+
+def _new_code():
+    return f"{secrets.randbelow(10 ** 6):06d}"
+
+
+_hash_key = None
+_hash_key_lock = threading.Lock()
+
+
+def _get_hash_key():
+    global _hash_key
+
+    if _hash_key is None:
+        with _hash_key_lock:
+            if _hash_key is None:
+                key = os.getenv("OTP_HASH_KEY") or os.getenv("JWT_SECRET_KEY")
+                if not key:
+                    # Codes then only verify in the process that issued them
+                    print("OTP_HASH_KEY and JWT_SECRET_KEY are not set; using a per-process OTP key")
+                    key = secrets.token_hex(32)
+                _hash_key = key.encode("utf-8")
+
+    return _hash_key
+
+
+def _hash_code(phone, code):
+    """Keyed hash of a code; without the server key it cannot be brute-forced offline"""
+    return hmac.new(_get_hash_key(), f"{phone}:{code}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+class OTPStore:
+    """Interface shared by the OTP storage backends"""
+
+    def generate(self, phone):
+        """Generate a 6-digit OTP for `phone`, replacing any previous one"""
+        raise NotImplementedError
+
+    def verify(self, phone, entered_otp):
+        """
+        Verify an OTP
+
+        Returns:
+            tuple: (is_valid, message)
+        """
+        raise NotImplementedError
+
+
+class InMemoryOTPStore(OTPStore):
+    """Per-process OTP storage with a heap-based expiry sweeper"""
+
+    def __init__(self, ttl_seconds=OTP_TTL_SECONDS, max_attempts=OTP_MAX_ATTEMPTS):
+        self.ttl_seconds = ttl_seconds
+        self.max_attempts = max_attempts
+        self._entries = {}
+        self._expiry_heap = []
+        self._lock = threading.Lock()
+
+    def _sweep(self, now):
+        # Heap entries are not removed when a phone gets a new code, so only
+        # drop the dict entry if the heap entry still describes it
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expiry, phone = heapq.heappop(self._expiry_heap)
+            entry = self._entries.get(phone)
+            if entry and entry['expiry'] == expiry:
+                del self._entries[phone]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def generate(self, phone):
+        otp = _new_code()
+        now = time.time()
+        expiry = now + self.ttl_seconds
+
+        with self._lock:
+            self._sweep(now)
+            self._entries[phone] = {
+                'otp_hash': _hash_code(phone, otp),
+                'expiry': expiry,
+                'attempts': 0
+            }
+            heapq.heappush(self._expiry_heap, (expiry, phone))
+
+        return otp
+
+    def verify(self, phone, entered_otp):
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(phone)
+            if entry is None:
+                self._sweep(now)
+                return False, "OTP expired or not sent"
+
+            # Check if OTP has expired
+            if now > entry['expiry']:
+                del self._entries[phone]
+                self._sweep(now)
+                return False, "OTP has expired"
+
+            self._sweep(now)
+
+            # Check if too many attempts
+            if entry['attempts'] >= self.max_attempts:
+                del self._entries[phone]
+                return False, "Too many failed attempts. Please request a new OTP."
+
+            # Increment attempt counter
+            entry['attempts'] += 1
+
+            # Check if OTP matches
+            if hmac.compare_digest(entry['otp_hash'], _hash_code(phone, entered_otp)):
+                del self._entries[phone]  # Remove after successful verification
+                return True, "OTP verified"
+
+        return False, "Invalid OTP"
+
+
+class MongoOTPStore(OTPStore):
+    """OTP storage shared by all workers through MongoDB"""
+
+    def __init__(self, collection, ttl_seconds=OTP_TTL_SECONDS, max_attempts=OTP_MAX_ATTEMPTS):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.max_attempts = max_attempts
+
+    def generate(self, phone):
+        otp = _new_code()
+        now = datetime.now(timezone.utc)
+
+        # One document per phone: a new code replaces the old one and resets attempts
+        self.collection.replace_one(
+            {"_id": phone},
+            {
+                "otp_hash": _hash_code(phone, otp),
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                "attempts": 0
+            },
+            upsert=True
+        )
+        return otp
+
+    def verify(self, phone, entered_otp):
+        now = datetime.now(timezone.utc)
+
+        # Count the attempt atomically; only live codes with attempts left match
+        entry = self.collection.find_one_and_update(
+            {"_id": phone, "expires_at": {"$gt": now}, "attempts": {"$lt": self.max_attempts}},
+            {"$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+
+        if entry is None:
+            # The TTL monitor runs about once a minute, so the document may
+            # still exist after expiry; work out which rule rejected it
+            existing = self.collection.find_one({"_id": phone})
+            if existing is None:
+                return False, "OTP expired or not sent"
+
+            self.collection.delete_one({"_id": phone, "otp_hash": existing["otp_hash"]})
+
+            expires_at = existing["expires_at"]
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            if now >= expires_at:
+                return False, "OTP has expired"
+            return False, "Too many failed attempts. Please request a new OTP."
+
+        if not hmac.compare_digest(entry["otp_hash"], _hash_code(phone, entered_otp)):
+            return False, "Invalid OTP"
+
+        # Consume the code; if a concurrent request already did, this one loses
+        consumed = self.collection.find_one_and_delete({"_id": phone, "otp_hash": entry["otp_hash"]})
+        if consumed is None:
+            return False, "OTP expired or not sent"
+
+        return True, "OTP verified"
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_otp_store(db):
+    """
+    Return the process-wide OTP store configured by OTP_STORE
+
+    Args:
+        db: PyMongo database handle, used by the Mongo backend
+    """
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = os.getenv("OTP_STORE", "mongo").lower()
+                if backend == "memory":
+                    _store = InMemoryOTPStore()
+                else:
+                    _store = MongoOTPStore(db[OTP_COLLECTION])
+                print(f"Using {type(_store).__name__} for OTP storage")
+
+    return _store
@@ -0,0 +1,264 @@
+"""
+Transactional outbox for SMS notifications
+
+Routes never call Twilio directly. They write a pending entry to the
+`notification_outbox` collection alongside the complaint write, and a
+separate worker process (`python manage.py notification-worker`) drains the
+outbox, retrying failed sends with exponential backoff and dead-lettering
+entries that keep failing. The final outcome of every entry is recorded in
+the `notifications` collection.
+
+A claim is a lease: the entry gets a fresh `leaseToken` and is hidden from
+other workers until the lease expires. A worker checks that it still holds
+the lease right before sending, and writes the outcome only with its token
+in the filter, so a worker whose lease expired and was taken over neither
+sends again nor overwrites the other worker's outcome.
+"""
+import random
+import time
+from datetime import datetime, timezone, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from utils.notifications import send_complaint_confirmation_sms, send_status_update_sms
+
+OUTBOX_COLLECTION = "notification_outbox"
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"
+# Not stored: returned by `process_entry` when another worker took the entry over
+STATUS_LEASE_LOST = "lease_lost"
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 5          # seconds before the first retry
+DEFAULT_MAX_DELAY = 15 * 60     # upper bound for a single backoff
+DEFAULT_LEASE_SECONDS = 60      # how long a claimed entry is hidden from other workers
+
+
+def build_outbox_entry(notification_type, recipient_phone, complaint_id, params=None):
+    """
+    Build a pending outbox document
+
+    Args:
+        notification_type: "complaint_confirmation" or "status_update"
+        recipient_phone: Victim's phone number in E.164 format
+        complaint_id: ID of the complaint the notification is about
+        params: Extra arguments for the SMS template
+
+    Returns:
+        dict: Document ready to be inserted into the outbox
+    """
+    now = datetime.now(timezone.utc)
+    return {
+        "type": notification_type,
+        "complaintId": complaint_id,
+        "recipientPhone": recipient_phone,
+        "params": params or {},
+        "status": STATUS_PENDING,
+        "attempts": 0,
+        "nextAttemptAt": now,
+        "createdAt": now
+    }
+
+
+def enqueue_notification(db, notification_type, recipient_phone, complaint_id, params=None, session=None):
+    """Insert a pending notification into the outbox"""
+    entry = build_outbox_entry(notification_type, recipient_phone, complaint_id, params)
+    return db[OUTBOX_COLLECTION].insert_one(entry, session=session).inserted_id
+
+
+def enqueue_notifications(db, entries, session=None):
+    """
+    Insert several pending notifications with one round-trip
+
+    Args:
+        entries: Documents built with `build_outbox_entry`
+
+    Returns:
+        list: Inserted outbox IDs
+    """
+    if not entries:
+        return []
+    return db[OUTBOX_COLLECTION].insert_many(entries, ordered=False, session=session).inserted_ids
+
+
+def backoff_delay(attempts, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """
+    Delay before the next attempt: exponential in the number of attempts made
+    so far, capped at `max_delay`, with jitter so retries do not synchronise
+    """
+    delay = min(max_delay, base_delay * (2 ** max(attempts - 1, 0)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def claim_next(db, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Atomically claim the oldest due entry
+
+    The claimed entry's `nextAttemptAt` is pushed out by the lease, so if this
+    worker dies mid-send another worker picks the entry up once it expires.
+    Each claim gets a new `leaseToken`, which invalidates the previous one.
+    """
+    now = datetime.now(timezone.utc)
+    return db[OUTBOX_COLLECTION].find_one_and_update(
+        {"status": {"$in": [STATUS_PENDING, STATUS_PROCESSING]}, "nextAttemptAt": {"$lte": now}},
+        {"$set": {
+            "status": STATUS_PROCESSING,
+            "nextAttemptAt": now + timedelta(seconds=lease_seconds),
+            "claimedAt": now,
+            "leaseToken": ObjectId()
+        }},
+        sort=[("nextAttemptAt", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def deliver(entry, twilio_client, from_number):
+    """Send the SMS described by an outbox entry and return the send result"""
+    params = entry.get("params", {})
+
+    if entry["type"] == "complaint_confirmation":
+        return send_complaint_confirmation_sms(
+            twilio_client,
+            from_number,
+            entry["recipientPhone"],
+            entry["complaintId"],
+            params.get("is_cognizable")
+        )
+
+    if entry["type"] == "status_update":
+        return send_status_update_sms(
+            twilio_client,
+            from_number,
+            entry["recipientPhone"],
+            entry["complaintId"],
+            params.get("status"),
+            params.get("details")
+        )
+
+    return {"success": False, "error": f"Unknown notification type: {entry['type']}"}
+
+
+def _renew_lease(db, entry, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Extend this worker's lease on an entry; False if another worker took it over"""
+    now = datetime.now(timezone.utc)
+    result = db[OUTBOX_COLLECTION].update_one(
+        {"_id": entry["_id"], "leaseToken": entry["leaseToken"], "status": STATUS_PROCESSING},
+        {"$set": {"nextAttemptAt": now + timedelta(seconds=lease_seconds)}}
+    )
+    return result.matched_count == 1
+
+
+def _finish(db, entry, update):
+    """Write an attempt's outcome if this worker still holds the lease"""
+    update.setdefault("$unset", {})["leaseToken"] = ""
+    result = db[OUTBOX_COLLECTION].update_one(
+        {"_id": entry["_id"], "leaseToken": entry["leaseToken"]},
+        update
+    )
+    return result.matched_count == 1
+
+
+def _record_notification(db, entry, status, fields):
+    """Upsert the notification history document for an outbox entry"""
+    db.notifications.update_one(
+        {"outboxId": entry["_id"]},
+        {"$set": dict({
+            "complaintId": entry["complaintId"],
+            "recipientPhone": entry["recipientPhone"],
+            "type": entry["type"],
+            "status": status,
+            "attempts": entry["attempts"]
+        }, **fields)},
+        upsert=True
+    )
+
+
+def process_entry(db, entry, twilio_client, from_number,
+                  max_attempts=DEFAULT_MAX_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """
+    Attempt delivery of one claimed entry and record the outcome
+
+    Returns:
+        str: The entry's new status, or STATUS_LEASE_LOST if another worker
+             took the entry over (nothing is sent or written then)
+    """
+    if not _renew_lease(db, entry):
+        print(f"Notification {entry['_id']} was taken over by another worker; not sending")
+        return STATUS_LEASE_LOST
+
+    try:
+        result = deliver(entry, twilio_client, from_number)
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+
+    now = datetime.now(timezone.utc)
+    entry["attempts"] = entry.get("attempts", 0) + 1
+
+    if result["success"]:
+        if not _finish(db, entry, {
+            "$set": {"status": STATUS_SENT, "sentAt": now, "twilioSid": result.get("sid")},
+            "$inc": {"attempts": 1}
+        }):
+            print(f"Notification {entry['_id']} sent ({result.get('sid')}) after its lease was taken over")
+            return STATUS_LEASE_LOST
+        _record_notification(db, entry, "sent", {
+            "message": result["message"],
+            "sentAt": now.isoformat(),
+            "twilioSid": result.get("sid")
+        })
+        print(f"SMS notification sent: {result.get('sid')}")
+        return STATUS_SENT
+
+    if entry["attempts"] >= max_attempts:
+        if not _finish(db, entry, {
+            "$set": {"status": STATUS_DEAD, "lastError": result["error"], "deadAt": now},
+            "$inc": {"attempts": 1}
+        }):
+            return STATUS_LEASE_LOST
+        _record_notification(db, entry, "failed", {
+            "error": result["error"],
+            "attemptedAt": now.isoformat()
+        })
+        print(f"Notification {entry['_id']} dead-lettered after {entry['attempts']} attempts: {result['error']}")
+        return STATUS_DEAD
+
+    retry_at = now + timedelta(seconds=backoff_delay(entry["attempts"], base_delay, max_delay))
+    if not _finish(db, entry, {
+        "$set": {"status": STATUS_PENDING, "lastError": result["error"], "nextAttemptAt": retry_at},
+        "$inc": {"attempts": 1}
+    }):
+        return STATUS_LEASE_LOST
+    print(f"Notification {entry['_id']} failed (attempt {entry['attempts']}), retrying at {retry_at.isoformat()}")
+    return STATUS_PENDING
+
+
+def run_worker(db, twilio_client, from_number, poll_interval=2.0, once=False,
+               max_attempts=DEFAULT_MAX_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """
+    Drain the outbox until interrupted
+
+    Args:
+        db: PyMongo database handle
+        twilio_client: Twilio (or fake) client used to send messages
+        from_number: Sender phone number
+        poll_interval: Seconds to sleep when no entry is due
+        once: Stop as soon as no entry is due instead of polling
+
+    Returns:
+        dict: Count of entries per resulting status
+    """
+    counts = {STATUS_SENT: 0, STATUS_PENDING: 0, STATUS_DEAD: 0, STATUS_LEASE_LOST: 0}
+
+    while True:
+        entry = claim_next(db)
+
+        if entry is None:
+            if once:
+                return counts
+            time.sleep(poll_interval)
+            continue
+
+        status = process_entry(db, entry, twilio_client, from_number, max_attempts, base_delay, max_delay)
+        counts[status] += 1
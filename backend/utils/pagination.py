@@ -0,0 +1,124 @@
+"""
+Utility functions for keyset (cursor) pagination over MongoDB collections
+"""
+import base64
+import json
+from bson import ObjectId
+from bson.errors import InvalidId
+from utils.bson_json import decode_batches
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor that cannot be decoded"""
+
+
+def parse_limit(raw_limit, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """
+    Parse the `limit` query parameter, clamping it to [1, maximum]
+
+    Args:
+        raw_limit: Raw value from the query string (may be None)
+        default: Page size used when no limit is given
+        maximum: Largest page size a client may request
+
+    Returns:
+        int: The page size to use
+    """
+    if raw_limit in (None, ""):
+        return default
+    try:
+        limit = int(raw_limit)
+    except (TypeError, ValueError):
+        raise InvalidCursorError("limit must be an integer")
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(document, sort_field):
+    """
+    Build an opaque cursor pointing just after `document`
+
+    Args:
+        document: Last document of the current page (must contain `_id` or `id`)
+        sort_field: Name of the field the page is ordered by
+
+    Returns:
+        str: URL-safe cursor string
+    """
+    last_id = document["_id"] if "_id" in document else document["id"]
+    payload = {"v": document.get(sort_field), "id": str(last_id)}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by `encode_cursor`
+
+    Returns:
+        tuple: (sort value, ObjectId)
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(payload, dict):
+            raise ValueError("cursor payload is not an object")
+        return payload.get("v"), ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise InvalidCursorError("Invalid pagination cursor")
+
+
+def keyset_filter(cursor, sort_field):
+    """
+    Build the query that selects documents strictly after `cursor` when the
+    collection is ordered by (sort_field desc, _id desc).
+
+    Documents without a value for `sort_field` sort last in descending order,
+    so they are always "after" a cursor that carries a value.
+    """
+    value, last_id = decode_cursor(cursor)
+
+    if value is None:
+        return {sort_field: None, "_id": {"$lt": last_id}}
+
+    return {"$or": [
+        {sort_field: {"$lt": value}},
+        {sort_field: value, "_id": {"$lt": last_id}},
+        {sort_field: None}
+    ]}
+
+
+def fetch_page(collection, query, projection, sort_field, limit, cursor=None):
+    """
+    Fetch one page of documents ordered by (sort_field desc, _id desc)
+
+    Args:
+        collection: PyMongo collection to read from
+        query: Base filter for the listing
+        projection: Fields to return (None for full documents)
+        sort_field: Field used as the primary sort key
+        limit: Page size
+        cursor: Opaque cursor from a previous page, if any
+
+    Returns:
+        tuple: (list of documents with `_id` as a string `id`, next cursor or None)
+    """
+    if cursor:
+        query = {"$and": [query, keyset_filter(cursor, sort_field)]} if query else keyset_filter(cursor, sort_field)
+
+    # Fetch one extra document to know whether another page exists. The page
+    # arrives as raw BSON and is decoded in one call per server batch.
+    documents = decode_batches(
+        collection.find_raw_batches(query, projection)
+        .sort([(sort_field, -1), ("_id", -1)])
+        .limit(limit + 1)
+    )
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1], sort_field)
+
+    return documents, next_cursor
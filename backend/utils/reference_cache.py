@@ -0,0 +1,206 @@
+"""
+Per-worker read-through cache for near-static reference data
+
+IPC sections and legal rights change rarely but are fetched constantly by the
+Legal Guide page. Each worker keeps the serialized JSON for these collections
+in memory together with a strong ETag, and its gzip / brotli variants once a
+client has asked for them. Every CHECK_INTERVAL seconds it checks
+for changes with a few cheap reads and only reloads the collection when one
+is seen:
+
+- the collection's version stamp in `reference_versions`, bumped by the admin
+  reload endpoint and `python manage.py reload-reference-data`;
+- the estimated document count and the largest `_id`, which move when
+  documents are added or removed;
+- a change stream on the collection, which reports in-place edits made from
+  the mongo shell, import scripts or other services. Each check drains it
+  without waiting. Change streams need a replica set; on a standalone server
+  in-place edits are picked up only after a version bump.
+"""
+import hashlib
+import os
+import threading
+import time
+from flask import current_app
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure, PyMongoError
+from utils.bson_json import decode_batches
+from utils.http_cache import compress
+
+VERSIONS_COLLECTION = "reference_versions"
+
+# How often (seconds) a worker checks for changes; between checks the cached
+# bytes are served without touching MongoDB
+CHECK_INTERVAL = float(os.getenv("REFERENCE_CACHE_CHECK_SECONDS", "30"))
+
+# The deployment has no change streams (standalone server)
+_CHANGE_STREAMS_UNSUPPORTED = {40573}
+# The stream cannot be resumed, so writes may have been missed
+_CHANGE_STREAM_LOST = {280, 286}
+
+
+class CachedReferenceData:
+    """Snapshot of one reference collection"""
+
+    def __init__(self, version, documents, body):
+        # (version stamp, document count, largest _id) the snapshot was loaded at
+        self.version = version
+        self.documents = documents
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self._encoded = {}
+
+    def variant(self, encoding=None):
+        """
+        The snapshot in a content encoding, compressed once per snapshot
+
+        Returns:
+            tuple: (body, strong ETag of exactly those bytes)
+        """
+        if encoding is None:
+            return self.body, self.etag
+        body = self._encoded.get(encoding)
+        if body is None:
+            body = self._encoded[encoding] = compress(self.body, encoding)
+        return body, f"{self.etag}-{encoding}"
+
+
+class ReferenceDataCache:
+    """
+    Read-through cache for a single reference collection
+
+    Args:
+        collection_name: Collection holding the reference documents
+        check_interval: Seconds between change checks
+    """
+
+    def __init__(self, collection_name, check_interval=CHECK_INTERVAL):
+        self.collection_name = collection_name
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stream = None
+        self._resume_token = None
+        self._watch_supported = True
+
+    def _current_version(self, db):
+        collection = db[self.collection_name]
+        stamp = db[VERSIONS_COLLECTION].find_one({"_id": self.collection_name}, {"version": 1})
+        last = collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        return (
+            stamp["version"] if stamp else 0,
+            collection.estimated_document_count(),
+            last["_id"] if last else None
+        )
+
+    def _open_stream(self, db):
+        return db[self.collection_name].watch(resume_after=self._resume_token, max_await_time_ms=1)
+
+    def _close_stream(self):
+        if self._stream is not None:
+            try:
+                self._stream.close()
+            except PyMongoError:
+                pass
+            self._stream = None
+
+    def _edited(self, db):
+        """
+        Whether the change stream reported a write since the last check
+
+        The stream is opened on the first check, before the collection is
+        first loaded, and resumed from its last token after an error.
+        """
+        if not self._watch_supported:
+            return False
+        try:
+            if self._stream is None:
+                self._stream = self._open_stream(db)
+            edited = False
+            while self._stream.try_next() is not None:
+                edited = True
+            self._resume_token = self._stream.resume_token
+            return edited
+        except OperationFailure as e:
+            self._close_stream()
+            if e.code in _CHANGE_STREAMS_UNSUPPORTED:
+                print(f"No change streams for {self.collection_name}; in-place edits need a version bump")
+                self._watch_supported = False
+                return False
+            if e.code in _CHANGE_STREAM_LOST:
+                # Start a fresh stream and reload once, since writes may have been missed
+                self._resume_token = None
+                return True
+            print(f"Change stream on {self.collection_name} failed, resuming on the next check: {e}")
+            return False
+        except PyMongoError as e:
+            # Transient: the next check resumes from the last token, so nothing is missed
+            self._close_stream()
+            print(f"Change stream on {self.collection_name} failed, resuming on the next check: {e}")
+            return False
+
+    def _load(self, db, version):
+        documents = decode_batches(db[self.collection_name].find_raw_batches())
+        body = current_app.json.dumps_bytes(documents)
+        return CachedReferenceData(version, documents, body)
+
+    def get(self, db):
+        """
+        Return the current snapshot, reloading it if the collection changed
+
+        Returns:
+            CachedReferenceData
+        """
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._checked_at < self.check_interval:
+            return snapshot
+
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._snapshot
+
+            edited = self._edited(db)
+            version = self._current_version(db)
+            if self._snapshot is None or edited or self._snapshot.version != version:
+                self._snapshot = self._load(db, version)
+                print(f"Loaded {len(self._snapshot.documents)} {self.collection_name} (version {version[0]})")
+
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def invalidate(self):
+        """Drop the local snapshot so the next read goes back to MongoDB"""
+        with self._lock:
+            self._snapshot = None
+            self._checked_at = 0.0
+
+
+ipc_sections_cache = ReferenceDataCache("ipc_sections")
+legal_rights_cache = ReferenceDataCache("legal_rights")
+
+REFERENCE_CACHES = {
+    "ipc_sections": ipc_sections_cache,
+    "legal_rights": legal_rights_cache,
+}
+
+
+def bump_reference_version(db, collection_name):
+    """
+    Record that a reference collection changed. Every worker reloads it on its
+    next check; the calling worker reloads immediately.
+
+    Returns:
+        int: The new version stamp
+    """
+    stamp = db[VERSIONS_COLLECTION].find_one_and_update(
+        {"_id": collection_name},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    if collection_name in REFERENCE_CACHES:
+        REFERENCE_CACHES[collection_name].invalidate()
+    return stamp["version"]
@@ -0,0 +1,140 @@
+"""
+Everything the victim dashboard needs after login, in one aggregation
+
+A cold dashboard load used to verify the token, list the victim's complaints
+and then fetch the notes of every complaint just to show what is new. The
+bootstrap aggregation starts from the victim's profile, joins their complaint
+summaries and, for each complaint, counts the public case notes created after
+the client's last-seen timestamp. The notes themselves are never sent.
+
+Clients pass the `serverTime` of their previous bootstrap as `last_seen`.
+"""
+from datetime import datetime, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+
+# Victim fields returned as the profile
+PROFILE_PROJECTION = {
+    "name": 1, "phone": 1, "role": 1, "verified": 1, "pre_registered": 1, "address": 1
+}
+
+# Complaint fields returned in the dashboard summaries
+SUMMARY_PROJECTION = {
+    "text": 1, "status": 1, "filedAt": 1, "updatedAt": 1, "firNumber": 1,
+    "currentStage": 1, "complainantName": 1, "version": 1
+}
+
+# Summaries carry a preview of the complaint text, like the victim listing
+TEXT_PREVIEW_LENGTH = 100
+
+
+def parse_last_seen(value):
+    """
+    Parse a last-seen timestamp into the ISO format case notes are stored with
+
+    Args:
+        value: ISO 8601 timestamp from the client, or None
+
+    Returns:
+        str or None: UTC timestamp comparable with `created_at` on case notes
+
+    Raises:
+        ValueError: If the value is not an ISO 8601 timestamp
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError("last_seen must be an ISO 8601 timestamp")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+def bootstrap_pipeline(user_id, last_seen=None):
+    """
+    Aggregation on `victims` joining complaint summaries and unread note counts
+
+    Args:
+        user_id: Victim ObjectId
+        last_seen: Output of `parse_last_seen`; None counts every public note
+    """
+    note_conditions = [{"$eq": ["$complaint_id", "$$complaintId"]}]
+    if last_seen:
+        note_conditions.append({"$gt": ["$created_at", last_seen]})
+
+    return [
+        {"$match": {"_id": user_id}},
+        {"$project": PROFILE_PROJECTION},
+        {"$lookup": {
+            "from": "complaints",
+            "let": {"userId": {"$toString": "$_id"}},
+            "pipeline": [
+                {"$match": {"archived": {"$ne": True}, "$expr": {"$eq": ["$complainantId", "$$userId"]}}},
+                {"$sort": {"filedAt": -1}},
+                {"$project": SUMMARY_PROJECTION},
+                {"$lookup": {
+                    "from": "case_notes",
+                    "let": {"complaintId": {"$toString": "$_id"}},
+                    "pipeline": [
+                        {"$match": {"visibility": "public", "$expr": {"$and": note_conditions}}},
+                        {"$count": "count"}
+                    ],
+                    "as": "unreadNotes"
+                }}
+            ],
+            "as": "complaints"
+        }}
+    ]
+
+
+def _summary(complaint):
+    complaint["id"] = str(complaint.pop("_id"))
+    unread = complaint.pop("unreadNotes", None)
+    complaint["unreadNotes"] = unread[0]["count"] if unread else 0
+
+    text = complaint.get("text")
+    if text is not None:
+        complaint["textLength"] = len(text)
+        if len(text) > TEXT_PREVIEW_LENGTH:
+            complaint["text"] = text[:TEXT_PREVIEW_LENGTH] + "..."
+    return complaint
+
+
+def fetch_victim_bootstrap(db, user_id, last_seen=None):
+    """
+    Load a victim's profile, complaint summaries and unread public note counts
+
+    Args:
+        db: PyMongo database handle
+        user_id: Victim ID string from the JWT identity
+        last_seen: Output of `parse_last_seen`
+
+    Returns:
+        dict or None: {"user", "complaints", "unreadNotes", "serverTime"},
+                      or None if the victim does not exist
+    """
+    try:
+        object_id = ObjectId(user_id)
+    except (InvalidId, TypeError):
+        return None
+
+    # Taken before the query so nothing created during it is skipped next time
+    server_time = datetime.now(timezone.utc).isoformat()
+
+    result = next(db.victims.aggregate(bootstrap_pipeline(object_id, last_seen)), None)
+    if result is None:
+        return None
+
+    complaints = [_summary(complaint) for complaint in result.pop("complaints", [])]
+    result["id"] = str(result.pop("_id"))
+    result["role"] = "victim"
+    result["pre_registered"] = result.get("pre_registered", False)
+
+    return {
+        "user": result,
+        "complaints": complaints,
+        "unreadNotes": sum(complaint["unreadNotes"] for complaint in complaints),
+        "serverTime": server_time
+    }
@@ -0,0 +1,166 @@
+"""
+Language-aware tokenization for complaint text
+
+Complaints are filed in English and Hindi (often mixed, or Hindi written
+next to English legal terms), so tokens are handled by script rather than by
+the complaint's declared language: Devanagari tokens go through the Hindi
+stopword list and suffix stripper, everything else through the English ones.
+"""
+import re
+import unicodedata
+
+# Devanagari block minus the danda punctuation marks (U+0964, U+0965)
+_TOKEN_PATTERN = re.compile(r"[0-9a-z\u0900-\u0963\u0966-\u097f]+")
+_DEVANAGARI = re.compile(r"[\u0900-\u097f]")
+
+ENGLISH_STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your yours yourself yourselves also us told said went came got one two day days time
+""".split())
+
+HINDI_STOPWORDS = frozenset("""
+का की के है हैं में से को ने पर और या यह वह ये वे था थी थे हो होता होती होते रहा रही रहे एक भी
+तो कि जो इस उस इन उन मैं मेरे मेरी मेरा मुझे हम हमारे हमारी आप ही नहीं गया गई गए कर करके कुछ साथ
+लिए तक जब तब अब बहुत वाले वाली वाला द्वारा दिया दी दिए किया की कहा
+""".split())
+
+# English inflections mapped onto one form so "stole", "stolen" and "theft" meet
+ENGLISH_CANONICAL = {
+    "stole": "theft", "stolen": "theft", "steal": "theft", "stealing": "theft", "thief": "theft",
+    "thieves": "theft", "robbed": "robbery", "rob": "robbery", "robber": "robbery",
+    "beat": "hurt", "beaten": "hurt", "beating": "hurt", "hit": "hurt", "slapped": "hurt", "punched": "hurt",
+    "killed": "murder", "kill": "murder", "killing": "murder",
+    "raped": "rape", "molested": "molest", "molestation": "molest",
+    "threatened": "threat", "threatening": "threat", "threats": "threat", "intimidation": "threat",
+    "cheated": "cheat", "cheating": "cheat", "fraud": "cheat", "defrauded": "cheat",
+    "kidnapped": "kidnap", "abducted": "kidnap", "abduction": "kidnap",
+    "stalked": "stalk", "stalking": "stalk", "followed": "stalk", "following": "stalk",
+}
+
+# Hindi legal vocabulary and its English equivalents in the IPC corpus, so
+# Hindi complaints can be scored against English section text. Both sides are
+# stemmed when the module loads (see HINDI_TO_ENGLISH below).
+_HINDI_LEGAL_TERMS = {
+    "चोरी": ["theft"], "चुराया": ["theft"], "चोर": ["theft"],
+    "लूट": ["robbery"], "लूटा": ["robbery"], "डकैती": ["dacoity"],
+    "मारपीट": ["hurt", "assault"], "मारा": ["hurt"], "पीटा": ["hurt"], "चोट": ["hurt"],
+    "घायल": ["hurt", "grievous"],
+    "हत्या": ["murder"], "कत्ल": ["murder"],
+    "बलात्कार": ["rape"], "छेड़छाड़": ["molest", "modesty", "outrage"], "छेड़ा": ["molest", "modesty"],
+    "दहेज": ["dowry", "cruelty"], "प्रताड़ना": ["cruelty", "harass"], "प्रताड़ित": ["cruelty", "harass"],
+    "उत्पीड़न": ["harass"], "धमकी": ["threat"], "धमकाया": ["threat"],
+    "धोखा": ["cheat"], "धोखाधड़ी": ["cheat"], "ठगी": ["cheat"],
+    "अपहरण": ["kidnap"], "पीछा": ["stalk"], "अश्लील": ["obscene"], "गाली": ["insult", "obscene"],
+    "मानहानि": ["defamation"], "घर": ["house", "dwelling"], "संपत्ति": ["property"],
+    "पति": ["husband"], "ससुराल": ["husband", "relative"],
+}
+
+_ENGLISH_SUFFIXES = [
+    ("ational", "ate"), ("ization", "ize"), ("iveness", "ive"), ("fulness", "ful"),
+    ("ousness", "ous"), ("ments", ""), ("ment", ""), ("ings", ""), ("ing", ""), ("edly", ""),
+    ("ies", "y"), ("ied", "y"), ("ed", ""), ("es", ""), ("ly", ""), ("s", ""),
+]
+
+_HINDI_SUFFIXES = sorted([
+    "ियाँ", "ियां", "ियों", "ाया", "ाओं", "ाएं", "ाएँ", "ुओं", "ुएं", "ुएँ", "ाना", "ाने", "ानी", "ाता",
+    "ाती", "ाते", "कर", "ता", "ती", "ते", "ना", "ने", "नी", "ों", "ें", "ीं", "ां", "ाँ",
+    "ाए", "ाई", "ो", "े", "ू", "ु", "ी", "ि", "ा", "ए",
+], key=len, reverse=True)
+
+
+def is_hindi_token(token):
+    return bool(_DEVANAGARI.search(token))
+
+
+def stem_english(token):
+    """Light suffix stripping; not a full Porter stemmer but stable for legal vocabulary"""
+    if token in ENGLISH_CANONICAL:
+        return ENGLISH_CANONICAL[token]
+    if token.isdigit() or len(token) <= 3:
+        return token
+    for suffix, replacement in _ENGLISH_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            # Keep the final "s" of words such as "harass" or "grievous"
+            if suffix == "s" and token.endswith(("ss", "us", "is")):
+                return token
+            token = token[:-len(suffix)] + replacement
+            break
+    if token.endswith("e") and len(token) > 4:
+        token = token[:-1]
+    return token
+
+
+def stem_hindi(token):
+    """Strip the longest common inflectional suffix, keeping at least two characters"""
+    for suffix in _HINDI_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            return token[:-len(suffix)]
+    return token
+
+
+def normalize(text):
+    return unicodedata.normalize("NFKC", str(text or "")).lower()
+
+
+def raw_tokens(text):
+    """Split text into lowercase word tokens without stemming or stopword removal"""
+    return _TOKEN_PATTERN.findall(normalize(text))
+
+
+def tokenize(text, language=None):
+    """
+    Tokenize, drop stopwords and stem
+
+    Args:
+        text: Text in English, Hindi, or a mix of both
+        language: Declared language code ("en", "hi", ...). Tokens are routed
+                  by script, so this only matters for romanized input and is
+                  accepted for symmetry with the rest of the API.
+
+    Returns:
+        list: Stemmed terms in their original order
+    """
+    terms = []
+    for token in raw_tokens(text):
+        if is_hindi_token(token):
+            if token in HINDI_STOPWORDS:
+                continue
+            stem = stem_hindi(token)
+            if stem not in HINDI_STOPWORDS:
+                terms.append(stem)
+        else:
+            if token in ENGLISH_STOPWORDS or len(token) < 2:
+                continue
+            terms.append(stem_english(token))
+    return terms
+
+
+def expand_cross_lingual(terms):
+    """
+    Append English equivalents of known Hindi terms, so a Hindi complaint
+    matches English section text. Unknown terms are left as they are.
+    """
+    expanded = list(terms)
+    for term in terms:
+        if is_hindi_token(term):
+            expanded.extend(HINDI_TO_ENGLISH.get(term, ()))
+    return expanded
+
+
+def _build_hindi_to_english():
+    mapping = {}
+    for word, english_words in _HINDI_LEGAL_TERMS.items():
+        stems = mapping.setdefault(stem_hindi(normalize(word)), [])
+        for english in english_words:
+            stem = stem_english(english)
+            if stem not in stems:
+                stems.append(stem)
+    return mapping
+
+
+HINDI_TO_ENGLISH = _build_hindi_to_english()
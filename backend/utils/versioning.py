@@ -0,0 +1,72 @@
+"""
+Optimistic concurrency for complaint updates
+
+Every write to a complaint increments its `version` field. Clients send the
+version they last read, either as an `If-Match` header (the complaint's
+ETag) or as `version` in the request body, and the update only applies if
+the stored version still matches. Write responses carry the bare version as
+their ETag; reads carry a weak `<version>-<body hash>` ETag (see
+`representation_etag`), whose version prefix If-Match accepts as well. Complaints written before versioning was
+introduced have no `version` field and are treated as version 0.
+"""
+import hashlib
+
+
+class InvalidVersionError(ValueError):
+    """Raised when a client sends a version that is not a non-negative integer"""
+
+
+def version_etag(version):
+    """ETag value for a complaint version"""
+    return str(version or 0)
+
+
+def representation_etag(version, body):
+    """
+    Weak ETag value for a complaint as read: changes with the version and with
+    anything else in the body (e.g. joined data), so conditional GETs never
+    get a stale 304, while its version prefix still works in If-Match
+    """
+    return f"{version or 0}-{hashlib.blake2b(body, digest_size=16).hexdigest()}"
+
+
+def parse_expected_version(if_match=None, body_version=None):
+    """
+    Work out which version the client expects to be updating
+
+    Args:
+        if_match: werkzeug ETags parsed from the If-Match header
+        body_version: `version` from the request body, if any
+
+    Returns:
+        int or None: Expected version, or None for an unconditional update
+    """
+    raw = None
+    if if_match and not if_match.star_tag:
+        # A single-resource update only ever carries one entity tag
+        tags = list(if_match.as_set(include_weak=True))
+        # Read ETags are "<version>-<body hash>"; only the version matters here
+        raw = tags[0].split("-", 1)[0] if tags else None
+    elif body_version is not None:
+        raw = body_version
+
+    if raw is None:
+        return None
+
+    try:
+        version = int(raw)
+    except (TypeError, ValueError):
+        raise InvalidVersionError("If-Match / version must be a complaint version number")
+    if version < 0:
+        raise InvalidVersionError("If-Match / version must be a complaint version number")
+    return version
+
+
+def version_filter(expected_version):
+    """Query fragment matching documents at `expected_version`"""
+    if expected_version is None:
+        return {}
+    if expected_version == 0:
+        # Documents that predate versioning have no version field
+        return {"version": {"$in": [0, None]}}
+    return {"version": expected_version}